@@ -0,0 +1,104 @@
+import argparse
+import json
+
+from src.batch import run_batch
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Summarize a mailbox (directory, mbox or JSONL) into a JSONL file."
+    )
+    parser.add_argument("input", help="directory of emails, mbox file or .jsonl file")
+    parser.add_argument("output", help="output .jsonl (one result per email)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=8,
+                        help="emails per task, also the BART batch size")
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="inference threads per worker (default: CPUs / workers)")
+    parser.add_argument("--top-n", type=int, default=3,
+                        help="sentences in the extractive summary")
+    parser.add_argument("--backend", choices=["torch", "int8", "onnx"], default="torch",
+                        help="BART / MiniLM inference: fp32 torch, dynamic int8 or ONNX Runtime")
+    parser.add_argument("--extractive-only", action="store_true",
+                        help="skip BART and grounding (never loads them)")
+    parser.add_argument("--extractive-mode", choices=["spacy", "fast"], default="spacy",
+                        help="fast: parse-free TF-IDF scorer for triage workloads")
+    parser.add_argument("--chunked", action="store_true",
+                        help="rewrite long emails in chunks instead of truncating at 1024 tokens")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="latency budget per chunk for BART generation; "
+                             "decoding is cheapened or skipped to fit it")
+    parser.add_argument("--route", action="store_true",
+                        help="skip BART or decode greedily where it is unlikely to help")
+    parser.add_argument("--route-history", default=None,
+                        help="SQLite file recording fallbacks per input bucket (used by --route)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only summarize new or changed emails and append to output")
+    parser.add_argument("--manifest", default=None,
+                        help="processed-email manifest for --incremental (default: OUTPUT.manifest)")
+    parser.add_argument("--threads-db", default=None,
+                        help="thread store (SQLite): skip quoted history, reuse earlier summaries")
+    parser.add_argument("--boilerplate", default=None,
+                        help="boilerplate index (see build_boilerplate_index.py) to strip before preprocessing")
+    parser.add_argument("--boilerplate-min-docs", type=int, default=5,
+                        help="a unit is boilerplate once this many emails carry it")
+    parser.add_argument("--boilerplate-min-share", type=float, default=0.02,
+                        help="... and this share of the indexed emails (see build_boilerplate_index.py)")
+    parser.add_argument("--near-dup", default=None,
+                        help="near-duplicate index (SQLite): reuse summaries of near-identical emails")
+    parser.add_argument("--near-dup-threshold", type=float, default=0.85,
+                        help="estimated Jaccard similarity of word 5-grams needed to reuse a summary")
+    parser.add_argument("--near-dup-max-docs", type=int, default=200_000,
+                        help="index size bound; least recently matched emails are dropped")
+    parser.add_argument("--embedding-store", default=None,
+                        help="directory of the shared sentence-embedding store used by grounding")
+    parser.add_argument("--embedding-store-max-rows", type=int, default=1_000_000,
+                        help="store size bound; it is compacted to its most used rows past this")
+    parser.add_argument("--cache", default=None,
+                        help="on-disk result cache (SQLite file) shared by all workers")
+    parser.add_argument("--cache-max-mb", type=int, default=1024,
+                        help="cache size bound; least recently used entries are evicted")
+    parser.add_argument("--profile-report", default=None,
+                        help="record per-stage timings and write a p50/p95/p99 report here")
+    parser.add_argument("--cprofile-fraction", type=float, default=0.0,
+                        help="share of emails to run under cProfile (needs --profile-report)")
+    parser.add_argument("--cprofile-dir", default="profiles",
+                        help="where sampled cProfile stats are dumped")
+    args = parser.parse_args()
+
+    stats = run_batch(
+        args.input,
+        args.output,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        top_n=args.top_n,
+        threads_per_worker=args.threads_per_worker,
+        abstractive=not args.extractive_only,
+        chunked=args.chunked,
+        cache_path=args.cache,
+        cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+        profile_report=args.profile_report,
+        profile_fraction=args.cprofile_fraction,
+        profile_dir=args.cprofile_dir,
+        extractive_mode=args.extractive_mode,
+        route=args.route,
+        route_history=args.route_history,
+        budget_seconds=args.budget_ms / 1000 if args.budget_ms else None,
+        backend=args.backend,
+        incremental=args.incremental,
+        manifest_path=args.manifest,
+        threads_path=args.threads_db,
+        boilerplate_path=args.boilerplate,
+        boilerplate_min_docs=args.boilerplate_min_docs,
+        boilerplate_min_share=args.boilerplate_min_share,
+        near_dup_path=args.near_dup,
+        near_dup_threshold=args.near_dup_threshold,
+        near_dup_max_docs=args.near_dup_max_docs,
+        embedding_store_path=args.embedding_store,
+        embedding_store_max_rows=args.embedding_store_max_rows
+    )
+
+    print(json.dumps(stats))
+
+if __name__ == "__main__":
+    main()
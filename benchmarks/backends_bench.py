@@ -0,0 +1,180 @@
+"""
+Inference backends (fp32 torch, dynamic int8, ONNX Runtime) compared
+on a fixed synthetic corpus.
+
+Each backend runs in a fresh interpreter so memory figures are not
+shared. Reported per backend: model load time, BART and grounding
+latency, peak RSS, and agreement with fp32 torch: fact retention,
+fallback decisions, identical summaries and per-sentence grounding
+keep/drop decisions.
+
+    python -m benchmarks.backends_bench --backends torch int8 onnx --threads 4
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+# --------------------------------------------------
+# ✅ One backend (runs in a child process)
+# --------------------------------------------------
+def run_backend(backend: str, threads: int, size: int, sentences: int, seed: int, batch_size: int) -> dict:
+    import resource
+    import time
+
+    from benchmarks.synthetic import generate_corpus
+    from src import models
+    from src.preprocess import preprocess_email
+    from src.extractive import extractive_summarize
+    from src.abstractive import abstractive_rewrite_detailed
+    from src.evaluation import fact_retention_score
+    from src.grounding_filter import remove_ungrounded_lines, split_sentences
+
+    models.set_backend(backend, threads)
+
+    corpus = generate_corpus(size, sentences, seed=seed)
+    prepared = [preprocess_email(text) for text in corpus]
+    extractive = [extractive_summarize(r["sentences"], top_n=3) for r in prepared]
+
+    start = time.perf_counter()
+    models.warmup()
+    load_seconds = time.perf_counter() - start
+
+    items = [
+        (summary, r["cleaned_text"], r["entities"])
+        for summary, r in zip(extractive, prepared)
+    ]
+
+    start = time.perf_counter()
+    rewrites = abstractive_rewrite_detailed(items, batch_size=batch_size)
+    bart_seconds = time.perf_counter() - start
+
+    # grounding probe: each summary plus one sentence from the next email
+    probes = [
+        (summary + " " + split_sentences(extractive[(i + 1) % len(extractive)])[0], r["cleaned_text"])
+        for i, (summary, r) in enumerate(zip(extractive, prepared))
+    ]
+
+    start = time.perf_counter()
+    kept = [remove_ungrounded_lines(generated, source) for generated, source in probes]
+    grounding_seconds = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "bart_seconds_per_email": bart_seconds / len(items),
+        "grounding_seconds_per_email": grounding_seconds / len(items),
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "summaries": [r["summary"] for r in rewrites],
+        "fell_back": [r["fell_back"] for r in rewrites],
+        "fact_retention": [
+            fact_retention_score(r["entities"], rewrite["summary"])
+            for r, rewrite in zip(prepared, rewrites)
+        ],
+        "grounding": [
+            [sent in kept_text for sent in split_sentences(generated)]
+            for (generated, _), kept_text in zip(probes, kept)
+        ]
+    }
+
+# --------------------------------------------------
+# ✅ Agreement with the fp32 reference
+# --------------------------------------------------
+def agreement(result: dict, reference: dict) -> dict:
+    n = len(reference["summaries"])
+
+    decisions = [
+        (a, b)
+        for ours, ref in zip(result["grounding"], reference["grounding"])
+        for a, b in zip(ours, ref)
+    ]
+
+    return {
+        "identical_summaries": sum(a == b for a, b in zip(result["summaries"], reference["summaries"])) / n,
+        "same_fallback": sum(a == b for a, b in zip(result["fell_back"], reference["fell_back"])) / n,
+        "fact_retention_mean": sum(result["fact_retention"]) / n,
+        "fact_retention_mean_fp32": sum(reference["fact_retention"]) / n,
+        "fact_retention_max_abs_diff": max(
+            abs(a - b) for a, b in zip(result["fact_retention"], reference["fact_retention"])
+        ),
+        "grounding_decision_agreement": (
+            sum(a == b for a, b in decisions) / len(decisions) if decisions else 1.0
+        )
+    }
+
+def spawn(backend: str, args) -> dict:
+    proc = subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.backends_bench", "--child", backend,
+            "--threads", str(args.threads), "--size", str(args.size),
+            "--sentences", str(args.sentences), "--seed", str(args.seed),
+            "--batch-size", str(args.batch_size)
+        ],
+        capture_output=True,
+        text=True
+    )
+
+    if proc.returncode != 0:
+        return {"backend": backend, "error": proc.stderr.strip().splitlines()[-1:]}
+
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare BART / MiniLM inference backends.")
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--size", type=int, default=20, help="emails in the fixed corpus")
+    parser.add_argument("--sentences", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_backend(
+            args.child, args.threads, args.size, args.sentences, args.seed, args.batch_size
+        )))
+        return
+
+    # fp32 torch is the reference for agreement
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    results = {backend: spawn(backend, args) for backend in backends}
+    reference = results["torch"]
+
+    report = {}
+
+    for backend, result in results.items():
+        if "error" in result:
+            report[backend] = result
+            print(f"{backend:6s} failed: {result['error']}")
+            continue
+
+        row = {
+            key: result[key]
+            for key in ("load_seconds", "bart_seconds_per_email",
+                        "grounding_seconds_per_email", "max_rss_mb")
+        }
+        if "error" not in reference:
+            row.update(agreement(result, reference))
+        report[backend] = row
+
+        print(
+            f"{backend:6s} load {row['load_seconds']:6.1f}s "
+            f"bart {row['bart_seconds_per_email'] * 1e3:8.1f}ms/email "
+            f"grounding {row['grounding_seconds_per_email'] * 1e3:6.1f}ms/email "
+            f"rss {row['max_rss_mb']:7.0f}MB"
+            + (
+                f" | facts {row['fact_retention_mean']:.3f} (fp32 {row['fact_retention_mean_fp32']:.3f})"
+                f" grounding agree {row['grounding_decision_agreement']:.3f}"
+                f" same summary {row['identical_summaries']:.2f}"
+                if "grounding_decision_agreement" in row else ""
+            )
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Entity matching: the compiled matcher against the per-call loops.
+
+For synthetic emails of growing length and entity count, runs the
+entity work of one email (missing-entity injection plus the three
+fact retention scores of a pipeline run) with the old nested loops
+and with src.entity_matcher, checks both give the same answers and
+reports the time per email. The matcher cache is cleared per email,
+so its build cost is included.
+
+    python -m benchmarks.entity_bench --sentences 10 40 120
+"""
+import argparse
+import json
+import re
+import time
+
+from benchmarks.synthetic import ORGS, PLACES, generate_corpus
+
+# --------------------------------------------------
+# ✅ Previous implementations (reference)
+# --------------------------------------------------
+def _normalize(text: str) -> str:
+    return re.sub(r'[^a-z0-9]', '', text.lower())
+
+def reference_fact_retention(entities: dict, generated: str) -> float:
+    total = 0
+    found = 0
+    gen_norm = _normalize(generated)
+
+    for values in entities.values():
+        for v in values:
+            total += 1
+            if _normalize(v) in gen_norm:
+                found += 1
+
+    return found / total if total else 1.0
+
+def reference_missing(extractive: str, original_email: str, entities: dict) -> list:
+    from src.abstractive import split_sentences
+    from src.preprocess import clean_injected_sentence
+
+    extractive_norm = _normalize(extractive)
+    source_sentences = split_sentences(original_email)
+    additions = []
+
+    for values in entities.values():
+        for v in values:
+            if _normalize(v) in extractive_norm:
+                continue
+
+            for sent in source_sentences:
+                if _normalize(v) in _normalize(sent):
+                    cleaned = clean_injected_sentence(sent)
+                    if not cleaned:
+                        continue
+                    additions.append(cleaned)
+                    break
+
+    return list(dict.fromkeys(additions))
+
+# --------------------------------------------------
+# ✅ Workload
+# --------------------------------------------------
+def regex_entities(text: str) -> dict:
+    """spaCy-free stand-in for extract_entities on synthetic emails."""
+    return {
+        "DATE": re.findall(r"\b[A-Z][a-z]+ \d{1,2}(?:st|nd|rd|th)\b", text),
+        "TIME": re.findall(r"\b\d{1,2}:\d{2} [AP]M\b", text),
+        "MONEY": re.findall(r"\$[\d,]+", text),
+        "GPE": [place for place in PLACES if place in text],
+        "ORG": [org for org in ORGS if org in text]
+    }
+
+def email_work(text: str, entities: dict, missing, retention) -> tuple:
+    """The entity work of one pipeline run over an email."""
+    extractive = " ".join(text.split(". ")[:3])
+    injected = missing(extractive, text, entities)
+    scores = (
+        retention(entities, extractive),
+        retention(entities, extractive + " " + " ".join(injected)),
+        retention(entities, text)
+    )
+    return injected, scores
+
+def bench(corpus: list, repeat: int) -> dict:
+    from src.abstractive import collect_missing_entity_sentences
+    from src.entity_matcher import _cached_matcher
+    from src.evaluation import fact_retention_score
+
+    entities = [regex_entities(text) for text in corpus]
+
+    def run_reference():
+        return [
+            email_work(text, ents, reference_missing, reference_fact_retention)
+            for text, ents in zip(corpus, entities)
+        ]
+
+    def run_matcher():
+        outputs = []
+        for text, ents in zip(corpus, entities):
+            _cached_matcher.cache_clear()
+            outputs.append(email_work(text, ents, collect_missing_entity_sentences, fact_retention_score))
+        return outputs
+
+    timings = {}
+    outputs = {}
+
+    for name, fn in (("reference", run_reference), ("matcher", run_matcher)):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            outputs[name] = fn()
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best / len(corpus)
+
+    return {
+        "entities_per_email": sum(sum(map(len, e.values())) for e in entities) / len(corpus),
+        "reference_ms": timings["reference"] * 1000,
+        "matcher_ms": timings["matcher"] * 1000,
+        "speedup": timings["reference"] / timings["matcher"] if timings["matcher"] else 0.0,
+        "identical": outputs["reference"] == outputs["matcher"]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled entity matcher vs per-call loops.")
+    parser.add_argument("--sentences", type=int, nargs="+", default=[10, 40, 120])
+    parser.add_argument("--emails", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    results = []
+
+    for sentences in args.sentences:
+        cell = bench(generate_corpus(args.emails, sentences=sentences), args.repeat)
+        cell["sentences"] = sentences
+        results.append(cell)
+
+        print(
+            f"sentences={sentences:4d} entities={cell['entities_per_email']:6.1f} "
+            f"reference {cell['reference_ms']:8.3f} ms | matcher {cell['matcher_ms']:8.3f} ms | "
+            f"x{cell['speedup']:.1f} | identical {cell['identical']}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Closed-loop load test for the summarization service.
+
+Fires synthetic emails at the service from --concurrency clients
+and reports throughput, latency percentiles, 503 rejections and the
+server's own /stats. Without --port/--unix it starts the service
+in-process (with --stub-models it then needs no models at all).
+
+    python -m benchmarks.load_test --stub-models --requests 200 --concurrency 32
+    python -m benchmarks.load_test --port 8080 --requests 500
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.synthetic import generate_corpus
+
+async def request(host: str, port: int, unix_path: str, method: str, path: str, payload=None):
+    """One HTTP/1.1 request on a fresh connection. Returns (status, body)."""
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    head = (
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+
+    data = await reader.readexactly(length)
+    writer.close()
+
+    return status, json.loads(data)
+
+async def run_load(args, corpus: list) -> dict:
+    from src.profiling import percentile
+
+    queue = asyncio.Queue()
+    for i, text in enumerate(corpus):
+        queue.put_nowait((i, text))
+
+    latencies = []
+    statuses = {}
+
+    async def client():
+        while True:
+            try:
+                i, text = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            start = time.perf_counter()
+            status, _ = await request(
+                args.host, args.port, args.unix, "POST", "/summarize", {"id": i, "text": text}
+            )
+            statuses[status] = statuses.get(status, 0) + 1
+
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    _, server_stats = await request(args.host, args.port, args.unix, "GET", "/stats")
+
+    return {
+        "requests": len(corpus),
+        "concurrency": args.concurrency,
+        "seconds": elapsed,
+        "per_second": statuses.get(200, 0) / elapsed if elapsed else 0.0,
+        "statuses": statuses,
+        "latency_seconds": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99)
+        },
+        "server": server_stats
+    }
+
+async def main_async(args):
+    corpus = generate_corpus(args.requests, args.sentences, seed=args.seed)
+
+    if args.port or args.unix:
+        return await run_load(args, corpus)
+
+    # in-process service on an ephemeral port
+    from src.service import SummarizationService, start_server
+
+    service = SummarizationService(
+        max_batch=args.max_batch,
+        max_wait=args.max_wait_ms / 1000,
+        max_queue=args.max_queue,
+        preprocess_workers=args.preprocess_workers,
+        abstractive=not args.extractive_only
+    )
+    server = await start_server(service, args.host, 0)
+    args.port = server.sockets[0].getsockname()[1]
+
+    try:
+        return await run_load(args, corpus)
+    finally:
+        server.close()
+        await server.wait_closed()
+        await service.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the summarization service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="existing service (TCP)")
+    parser.add_argument("--unix", default=None, help="existing service (Unix socket)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--sentences", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stub-models", action="store_true",
+                        help="in-process service only: instant BART / MiniLM stand-ins")
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--max-queue", type=int, default=256)
+    parser.add_argument("--preprocess-workers", type=int, default=0,
+                        help="in-process service only (0: threads, so stubs apply)")
+    parser.add_argument("--extractive-only", action="store_true")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    if args.stub_models:
+        from benchmarks import stubs
+        stubs.install()
+
+    report = asyncio.run(main_async(args))
+
+    print(
+        f"{report['per_second']:.1f} req/s, p50 {report['latency_seconds']['p50'] * 1e3:.0f}ms "
+        f"p95 {report['latency_seconds']['p95'] * 1e3:.0f}ms "
+        f"p99 {report['latency_seconds']['p99'] * 1e3:.0f}ms, statuses {report['statuses']}"
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+src.ranking against networkx on random similarity graphs.
+
+Checks that the dense power iteration gives networkx's scores and
+ranking, and times dense, top-k sparse and networkx PageRank as
+the number of sentences grows.
+
+    python -m benchmarks.ranking_bench --sizes 10 50 200 500
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from src.ranking import pagerank, rank
+
+def random_similarity(n: int, rng) -> np.ndarray:
+    """Cosine matrix of random 96-d vectors, zero diagonal (like TextRank's)."""
+    vectors = rng.normal(size=(n, 96)) + 0.5
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    sim = unit @ unit.T
+    np.fill_diagonal(sim, 0.0)
+    return sim
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="PageRank engine vs networkx.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200, 500])
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    import networkx as nx
+
+    rng = np.random.default_rng(args.seed)
+    rows = []
+
+    for n in args.sizes:
+        sim = random_similarity(n, rng)
+
+        reference = nx.pagerank(nx.from_numpy_array(sim))
+        reference = np.array([reference[i] for i in range(n)])
+        ours = pagerank(sim)
+
+        row = {
+            "sentences": n,
+            "max_abs_diff": float(np.abs(ours - reference).max()),
+            "same_ranking": bool((np.argsort(-ours, kind="stable") == np.argsort(-reference, kind="stable")).all()),
+            "networkx_seconds": best_of(lambda: nx.pagerank(nx.from_numpy_array(sim)), args.repeat),
+            "dense_seconds": best_of(lambda: rank(sim), args.repeat),
+            "topk_seconds": best_of(lambda: rank(sim, top_k=args.top_k), args.repeat)
+        }
+        rows.append(row)
+
+        print(
+            f"n={n:4d} diff={row['max_abs_diff']:.2e} same_ranking={row['same_ranking']} "
+            f"networkx={row['networkx_seconds'] * 1e3:8.2f}ms "
+            f"dense={row['dense_seconds'] * 1e3:8.2f}ms "
+            f"top{args.top_k}={row['topk_seconds'] * 1e3:8.2f}ms"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+    main()
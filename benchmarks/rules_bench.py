@@ -0,0 +1,142 @@
+"""
+Compiled rules (src.rules) against the per-pattern loops they replaced.
+
+Times every rewritten heuristic against its previous implementation
+(the references of tests/test_rules.py, which checks they agree) on
+synthetic emails, and counts mismatches on those plus randomised
+edge cases. Exits non-zero on any mismatch.
+
+    python -m benchmarks.rules_bench --emails 200
+"""
+import argparse
+import json
+import sys
+import time
+
+from benchmarks.synthetic import generate_corpus
+from tests.test_rules import (
+    edge_cases,
+    ref_clean_email,
+    ref_clean_injected_sentence,
+    ref_contains_critical_info,
+    ref_filter_noise_sentences,
+    ref_has_critical_keyword,
+    ref_keyword_boost,
+    ref_normalize,
+    ref_remove_signature,
+    ref_separate_subject,
+    ref_split_sentences
+)
+
+# --------------------------------------------------
+# ✅ Checks
+# --------------------------------------------------
+def pairs():
+    """(name, reference, current, input kind: "text", "sentences" (a list) or "sentence")."""
+    from src.extractive import has_critical_keyword, keyword_boost
+    from src.grounding_filter import contains_critical_info
+    from src.preprocess import (
+        clean_email,
+        clean_injected_sentence,
+        filter_noise_sentences,
+        remove_signature,
+        separate_subject
+    )
+    from src.rules import normalize, split_sentences
+
+    return [
+        ("remove_signature", ref_remove_signature, remove_signature, "text"),
+        ("separate_subject", ref_separate_subject, separate_subject, "text"),
+        ("clean_email", ref_clean_email, clean_email, "text"),
+        ("split_sentences", ref_split_sentences, split_sentences, "text"),
+        ("normalize", ref_normalize, normalize, "text"),
+        ("filter_noise_sentences", ref_filter_noise_sentences, filter_noise_sentences, "sentences"),
+        ("clean_injected_sentence", ref_clean_injected_sentence, clean_injected_sentence, "sentence"),
+        ("contains_critical_info", ref_contains_critical_info, contains_critical_info, "sentence"),
+        ("keyword_boost", ref_keyword_boost, keyword_boost, "sentence"),
+        ("has_critical_keyword", ref_has_critical_keyword, has_critical_keyword, "sentence"),
+        # what scoring + grounding actually ask of each sentence
+        (
+            "all_sentence_flags",
+            lambda s: (ref_keyword_boost(s), ref_has_critical_keyword(s), ref_contains_critical_info(s)),
+            lambda s: (keyword_boost(s), has_critical_keyword(s), contains_critical_info(s)),
+            "sentence"
+        )
+    ]
+
+def inputs_for(per: str, texts: list, sentences: list) -> list:
+    if per == "text":
+        return texts
+    if per == "sentences":
+        return [ref_split_sentences(text) for text in texts]
+    return sentences
+
+def check(texts: list, sentences: list) -> dict:
+    """Mismatch count per function (0 everywhere means equivalent)."""
+    mismatches = {}
+
+    for name, reference, current, per in pairs():
+        bad = [x for x in inputs_for(per, texts, sentences) if reference(x) != current(x)]
+        mismatches[name] = len(bad)
+
+        if bad:
+            print(f"{name}: {len(bad)} mismatches, e.g. {bad[0]!r}", file=sys.stderr)
+
+    return mismatches
+
+def bench(texts: list, sentences: list, repeat: int) -> dict:
+    from src.rules import sentence_features
+
+    timings = {}
+
+    for name, reference, current, per in pairs():
+        items = inputs_for(per, texts, sentences)
+        best = {"reference": float("inf"), "rules": float("inf")}
+
+        for _ in range(repeat):
+            for label, fn in (("reference", reference), ("rules", current)):
+                # cold: real sentences are rarely seen twice
+                sentence_features.cache_clear()
+                start = time.perf_counter()
+                for item in items:
+                    fn(item)
+                best[label] = min(best[label], time.perf_counter() - start)
+
+        timings[name] = {
+            "reference_us": best["reference"] / len(items) * 1e6,
+            "rules_us": best["rules"] / len(items) * 1e6,
+            "speedup": best["reference"] / best["rules"] if best["rules"] else 0.0
+        }
+
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled rule engine vs per-pattern loops.")
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--edge-cases", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.emails, sentences=(5, 30))
+    texts = corpus + edge_cases(args.edge_cases)
+    sentences = [s for text in texts for s in ref_split_sentences(text)] + edge_cases(args.edge_cases, seed=1)
+
+    mismatches = check(texts, sentences)
+    timings = bench(corpus, [s for text in corpus for s in ref_split_sentences(text)], args.repeat)
+
+    for name, values in timings.items():
+        print(
+            f"{name:24s} reference {values['reference_us']:8.2f} us | rules {values['rules_us']:8.2f} us | "
+            f"x{values['speedup']:.1f} | mismatches {mismatches[name]}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"mismatches": mismatches, "timings": timings}, f, indent=2)
+
+    if any(mismatches.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
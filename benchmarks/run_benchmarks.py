@@ -0,0 +1,280 @@
+"""
+Throughput benchmark over a synthetic corpus.
+
+For every (corpus size, sentences per email) combination it times
+each stage on its own and the full pipeline end to end, and writes
+everything to one JSON file. Runs offline on CPU; --stub-models
+swaps BART and MiniLM for instant stand-ins so only the non-model
+stages are measured.
+
+    python -m benchmarks.run_benchmarks --stub-models --output bench.json
+    python -m benchmarks.run_benchmarks --stub-models --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from benchmarks.synthetic import generate_corpus
+
+# --------------------------------------------------
+# ✅ Timing helpers
+# --------------------------------------------------
+def timed_map(fn, items) -> tuple:
+    """Returns (outputs, seconds per item list)."""
+    outputs = []
+    seconds = []
+
+    for item in items:
+        start = time.perf_counter()
+        outputs.append(fn(item))
+        seconds.append(time.perf_counter() - start)
+
+    return outputs, seconds
+
+def summarize_seconds(seconds: list) -> dict:
+    from src.profiling import percentile
+
+    total = sum(seconds)
+
+    return {
+        "total": total,
+        "mean": total / len(seconds) if seconds else 0.0,
+        "p50": percentile(seconds, 50),
+        "p95": percentile(seconds, 95),
+        "per_second": len(seconds) / total if total else 0.0
+    }
+
+def summary_overlap(prepared: list, reference: list, candidate: list) -> float:
+    """Share of the reference summaries' sentences the candidate also picked."""
+    picked = 0
+    matched = 0
+
+    for result, ref, cand in zip(prepared, reference, candidate):
+        for sent in result["sentences"]:
+            if sent in ref:
+                picked += 1
+                matched += sent in cand
+
+    return matched / picked if picked else 1.0
+
+# --------------------------------------------------
+# ✅ One benchmark cell
+# --------------------------------------------------
+def bench_cell(corpus: list, top_n: int, batch_size: int) -> dict:
+    from src import profiling
+    from src.preprocess import preprocess_email, preprocess_emails
+    from src.extractive import extractive_summarize
+    from src.abstractive import abstractive_rewrite_batch
+    from src.grounding_filter import encode_source, remove_ungrounded_lines
+    from src.pipeline import summarize_emails
+
+    stages = {}
+
+    # ---------- stage by stage ----------
+    prepared, seconds = timed_map(preprocess_email, corpus)
+    stages["preprocess"] = summarize_seconds(seconds)
+
+    start = time.perf_counter()
+    batched = list(preprocess_emails(corpus, batch_size=batch_size * 8))
+    elapsed = time.perf_counter() - start
+    stages["preprocess_batched"] = {
+        "total": elapsed,
+        "mean": elapsed / len(corpus),
+        "per_second": len(corpus) / elapsed if elapsed else 0.0
+    }
+    batched_identical = sum(a == b for a, b in zip(prepared, batched)) / len(corpus)
+
+    extractive, seconds = timed_map(
+        lambda r: extractive_summarize(r["sentences"], top_n=top_n),
+        prepared
+    )
+    stages["extractive"] = summarize_seconds(seconds)
+
+    fast, seconds = timed_map(
+        lambda r: extractive_summarize(r["sentences"], top_n=top_n, mode="fast"),
+        prepared
+    )
+    stages["fast_extractive"] = summarize_seconds(seconds)
+    fast_overlap = summary_overlap(prepared, extractive, fast)
+
+    items = [
+        (summary, result["cleaned_text"], result["entities"])
+        for summary, result in zip(extractive, prepared)
+    ]
+
+    encode_source.cache_clear()
+    start = time.perf_counter()
+    rewrites = abstractive_rewrite_batch(items, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    stages["abstractive"] = {
+        "total": elapsed,
+        "mean": elapsed / len(items),
+        "per_second": len(items) / elapsed if elapsed else 0.0
+    }
+
+    _, seconds = timed_map(
+        lambda pair: remove_ungrounded_lines(pair[0], pair[1][1]),
+        list(zip(rewrites, items))
+    )
+    stages["grounding"] = summarize_seconds(seconds)
+
+    # ---------- end to end (instrumented) ----------
+    encode_source.cache_clear()
+    profiling.enable()
+
+    start = time.perf_counter()
+    results = []
+    for i in range(0, len(corpus), batch_size):
+        results.extend(summarize_emails(corpus[i:i + batch_size], top_n=top_n, batch_size=batch_size))
+    elapsed = time.perf_counter() - start
+
+    profiling.disable()
+
+    return {
+        "stages": stages,
+        "end_to_end": {
+            "total": elapsed,
+            "mean": elapsed / len(corpus),
+            "per_second": len(corpus) / elapsed if elapsed else 0.0
+        },
+        "instrumented": profiling.aggregate([r.get("timings") for r in results]),
+        "preprocess_batched_identical": batched_identical,
+        "preprocess_batched_speedup": (
+            stages["preprocess_batched"]["per_second"] / stages["preprocess"]["per_second"]
+            if stages["preprocess"]["per_second"] else 0.0
+        ),
+        "fast_extractive_overlap": fast_overlap,
+        "fast_extractive_speedup": (
+            stages["fast_extractive"]["per_second"] / stages["extractive"]["per_second"]
+            if stages["extractive"]["per_second"] else 0.0
+        )
+    }
+
+# --------------------------------------------------
+# ✅ Regression check
+# --------------------------------------------------
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Cells whose end-to-end or per-stage throughput dropped by more than tolerance."""
+    regressions = []
+    previous = {(c["corpus_size"], c["sentences"]): c for c in baseline["cells"]}
+
+    for cell in current["cells"]:
+        old = previous.get((cell["corpus_size"], cell["sentences"]))
+        if old is None:
+            continue
+
+        checks = [("end_to_end", cell["end_to_end"], old["end_to_end"])]
+        checks += [
+            (name, values, old["stages"][name])
+            for name, values in cell["stages"].items()
+            if name in old["stages"]
+        ]
+
+        for name, new_values, old_values in checks:
+            new_rate = new_values["per_second"]
+            old_rate = old_values["per_second"]
+
+            if old_rate and new_rate < old_rate * (1 - tolerance):
+                regressions.append({
+                    "corpus_size": cell["corpus_size"],
+                    "sentences": cell["sentences"],
+                    "stage": name,
+                    "baseline_per_second": old_rate,
+                    "current_per_second": new_rate
+                })
+
+    return regressions
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline throughput benchmark.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--sentences", type=int, nargs="+", default=[5, 20, 60],
+                        help="body sentences per email, one cell per value")
+    parser.add_argument("--top-n", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stub-models", action="store_true",
+                        help="replace BART and MiniLM with instant stand-ins")
+    parser.add_argument("--threads", type=int, default=None, help="torch threads")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", default=None,
+                        help="earlier results file; exit 1 on a throughput regression")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed throughput drop before --compare fails")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.stub_models:
+        from benchmarks import stubs
+        stubs.install()
+
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "stub_models": args.stub_models,
+            "seed": args.seed,
+            "top_n": args.top_n,
+            "batch_size": args.batch_size
+        },
+        "cells": []
+    }
+
+    for sentences in args.sentences:
+        for size in args.sizes:
+            corpus = generate_corpus(size, sentences, seed=args.seed)
+            cell = bench_cell(corpus, args.top_n, args.batch_size)
+            cell.update(corpus_size=size, sentences=sentences)
+            results["cells"].append(cell)
+
+            print(
+                f"size={size:5d} sentences={sentences:4d} "
+                f"end-to-end {cell['end_to_end']['per_second']:8.2f} emails/s | "
+                + " ".join(
+                    f"{name} {values['per_second']:.1f}/s"
+                    for name, values in cell["stages"].items()
+                )
+                + f" | fast overlap {cell['fast_extractive_overlap']:.2f}"
+                + f" | batched preprocess identical {cell['preprocess_batched_identical']:.2f}"
+            )
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+
+        for r in regressions:
+            print(
+                f"REGRESSION size={r['corpus_size']} sentences={r['sentences']} "
+                f"{r['stage']}: {r['baseline_per_second']:.2f} → {r['current_per_second']:.2f} /s"
+            )
+
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
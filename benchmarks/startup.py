@@ -0,0 +1,78 @@
+"""
+Startup time and resident memory per scenario.
+
+Each scenario runs in a fresh interpreter so nothing is
+shared between them. Run from the repo root, e.g. once on
+the old commit and once on the new one:
+
+    python -m benchmarks.startup --output startup.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+SAMPLE = "data/raw_emails.txt"
+
+SCENARIOS = {
+    "import_evaluation": "import src.evaluation",
+    "import_pipeline": "import src.pipeline",
+    "extractive_only": f"""
+from src.preprocess import preprocess_email
+from src.extractive import extractive_summarize
+text = open({SAMPLE!r}, encoding="utf-8").read()
+result = preprocess_email(text)
+extractive_summarize(result["sentences"], top_n=3)
+""",
+    "full_pipeline": f"""
+from src.pipeline import summarize_email
+summarize_email(open({SAMPLE!r}, encoding="utf-8").read())
+"""
+}
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+exec(compile({code!r}, "<scenario>", "exec"))
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "transformers_imported": "transformers" in sys.modules,
+    "torch_imported": "torch" in sys.modules
+}}))
+"""
+
+def run_scenario(code: str) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE.format(code=code)],
+        capture_output=True,
+        text=True
+    )
+
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1:]}
+
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    parser.add_argument("--only", nargs="*", default=None, choices=sorted(SCENARIOS))
+    args = parser.parse_args()
+
+    results = {}
+
+    for name, code in SCENARIOS.items():
+        if args.only and name not in args.only:
+            continue
+
+        results[name] = run_scenario(code)
+        print(f"{name:20s} {json.dumps(results[name])}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
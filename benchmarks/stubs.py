@@ -0,0 +1,133 @@
+"""
+Offline stand-ins for MiniLM and BART.
+
+They keep the interfaces the pipeline uses but do almost no work,
+so the non-model stages (spaCy, TextRank, grounding bookkeeping,
+dedup, metrics) can be benchmarked on their own.
+"""
+import re
+import zlib
+from types import SimpleNamespace
+
+import numpy as np
+
+from src import models
+from src.grounding_filter import encode_source
+
+# --------------------------------------------------
+# ✅ MiniLM stand-in: hashed bag-of-words embeddings
+# --------------------------------------------------
+class StubSentenceModel:
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, sentences, convert_to_numpy=True, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        vectors = np.zeros((len(sentences), self.dim), dtype=np.float32)
+
+        for row, sent in enumerate(sentences):
+            for word in re.findall(r"[a-z0-9]+", sent.lower()):
+                vectors[row, zlib.crc32(word.encode()) % self.dim] += 1.0
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1.0, norms)
+
+        return vectors[0] if single else vectors
+
+# --------------------------------------------------
+# ✅ BART stand-in: word-level tokenizer + echo "generation"
+# --------------------------------------------------
+BOS, PAD, EOS = 0, 1, 2
+
+class _Encoding(dict):
+
+    def to(self, device):
+        return self
+
+class StubTokenizer:
+
+    pad_token_id = PAD
+    eos_token_id = EOS
+
+    def __init__(self):
+        self.vocab = {}
+        self.words = {}
+
+    def _ids(self, text: str) -> list:
+        ids = []
+
+        for word in text.split():
+            if word not in self.vocab:
+                token_id = len(self.vocab) + 3
+                self.vocab[word] = token_id
+                self.words[token_id] = word
+            ids.append(self.vocab[word])
+
+        return ids
+
+    def __call__(self, text, max_length=None, truncation=False, padding=False,
+                 return_tensors=None, add_special_tokens=True, **kwargs):
+        single = isinstance(text, str)
+        texts = [text] if single else list(text)
+
+        batch = []
+        for t in texts:
+            ids = self._ids(t)
+            if add_special_tokens:
+                ids = [BOS] + ids + [EOS]
+            if truncation and max_length:
+                ids = ids[:max_length]
+            batch.append(ids)
+
+        if return_tensors is None:
+            return _Encoding(input_ids=batch[0] if single else batch)
+
+        width = max(len(ids) for ids in batch)
+        input_ids = np.full((len(batch), width), PAD, dtype=np.int64)
+        attention_mask = np.zeros((len(batch), width), dtype=np.int64)
+
+        for row, ids in enumerate(batch):
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+
+        return _Encoding(input_ids=input_ids, attention_mask=attention_mask)
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(self.words[i] for i in np.asarray(ids).tolist() if i in self.words)
+
+    def batch_decode(self, sequences, skip_special_tokens=True):
+        return [self.decode(ids, skip_special_tokens) for ids in sequences]
+
+class StubSeq2Seq:
+    """generate() returns its input: a perfect, instant paraphrase."""
+
+    config = SimpleNamespace(eos_token_id=EOS, pad_token_id=PAD)
+
+    def generate(self, input_ids, max_length=None, **kwargs):
+        output = np.asarray(input_ids).copy()
+
+        if max_length:
+            output = output[:, :max_length]
+
+        return output
+
+# --------------------------------------------------
+# ✅ Install / remove
+# --------------------------------------------------
+def install(sentence: bool = True, bart: bool = True):
+    if sentence:
+        models.override("sentence", StubSentenceModel())
+    if bart:
+        models.override("bart", (StubTokenizer(), StubSeq2Seq(), "cpu"))
+
+    # source embeddings cached under the previous model are stale now
+    encode_source.cache_clear()
+
+def uninstall():
+    models.clear_overrides()
+    encode_source.cache_clear()
@@ -0,0 +1,124 @@
+"""
+Deterministic synthetic email corpus.
+
+Emails look like data/raw_emails.txt: a subject line, a greeting,
+body sentences mixing dates, times, money amounts, locations and
+action items with plain filler, and a signature.
+"""
+import random
+
+TOPICS = [
+    "Quarterly Budget Review", "Project Kickoff", "Annual Strategy Workshop",
+    "Vendor Contract Renewal", "Team Offsite Planning", "Security Audit",
+    "Product Launch Readiness", "Hiring Committee Update", "Client Onboarding",
+    "Infrastructure Migration"
+]
+
+NAMES = ["Team", "All", "Priya", "John", "Anita", "Rahul", "Maria", "Chen", "Fatima", "David"]
+
+PLACES = [
+    "Chavara Hall", "the Main Auditorium", "Conference Room B", "the Kochi office",
+    "RSET Campus", "the Bangalore office", "Meeting Room 4", "the Innovation Lab"
+]
+
+ORGS = ["Finance", "HR", "Operations", "the Procurement Office", "Acme Corp", "Globex", "IT Services"]
+
+MONTHS = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December"
+]
+
+ACTIONS = [
+    "submit", "review", "complete", "send", "prepare", "approve", "confirm", "provide"
+]
+
+DOCUMENTS = [
+    "the budget proposal", "your department report", "the risk mitigation plan",
+    "the vendor quotes", "the updated timeline", "the presentation slides",
+    "the signed contract", "the test results"
+]
+
+FILLER = [
+    "I hope everyone is doing well.",
+    "Thank you all for your continued support.",
+    "We look forward to your active participation.",
+    "This has been a productive quarter for the whole group.",
+    "Lunch and refreshments will be provided during the sessions.",
+    "The feedback from last year was very positive.",
+    "Several teams have already shared their initial thoughts.",
+    "We appreciate the effort everyone has put in so far.",
+    "Further details will be shared as the plans are finalised.",
+    "Let us keep the discussion focused on the key outcomes."
+]
+
+GREETINGS = ["Dear {name},", "Hi {name},", "Hello {name},"]
+CLOSINGS = ["Best regards,", "Regards,", "Thanks,", "Sincerely,"]
+SIGNERS = ["Operations Manager", "Project Lead", "Finance Team", "HR Department"]
+
+def _date(rng) -> str:
+    day = rng.randint(1, 28)
+    suffix = "th" if 10 <= day % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(day % 10, "th")
+    return f"{rng.choice(MONTHS)} {day}{suffix}"
+
+def _time(rng) -> str:
+    return f"{rng.randint(8, 11)}:{rng.choice(['00', '15', '30', '45'])} {rng.choice(['AM', 'PM'])}"
+
+def _money(rng) -> str:
+    return f"${rng.randint(1, 250) * 1000:,}"
+
+def _informative_sentence(rng) -> str:
+    kind = rng.randrange(6)
+
+    if kind == 0:
+        return f"Kindly {rng.choice(ACTIONS)} {rng.choice(DOCUMENTS)} by {_date(rng)}."
+    if kind == 1:
+        return f"The session will begin at {_time(rng)} on {_date(rng)} at {rng.choice(PLACES)}."
+    if kind == 2:
+        return f"The proposed budget for this initiative is {_money(rng)}, subject to approval by {rng.choice(ORGS)}."
+    if kind == 3:
+        return f"Please inform {rng.choice(ORGS)} before {_date(rng)} if you cannot attend."
+    if kind == 4:
+        return f"All revisions must be completed before the deadline on {_date(rng)}."
+    return f"The meeting with {rng.choice(ORGS)} is scheduled for {_time(rng)} in {rng.choice(PLACES)}."
+
+def generate_email(rng: random.Random, n_sentences: int) -> str:
+    """One email with n_sentences body sentences (about 40% informative)."""
+    body = []
+
+    for _ in range(n_sentences):
+        if rng.random() < 0.4:
+            body.append(_informative_sentence(rng))
+        else:
+            body.append(rng.choice(FILLER))
+
+    # wrap into short paragraphs like a real email
+    paragraphs = []
+    i = 0
+    while i < len(body):
+        size = rng.randint(1, 3)
+        paragraphs.append(" ".join(body[i:i + size]))
+        i += size
+
+    return "\n\n".join([
+        f"Subject: {rng.choice(TOPICS)} - {_date(rng)}",
+        rng.choice(GREETINGS).format(name=rng.choice(NAMES)),
+        *paragraphs,
+        f"{rng.choice(CLOSINGS)}\n{rng.choice(SIGNERS)}"
+    ])
+
+def generate_corpus(size: int,
+                    sentences=(5, 30),
+                    seed: int = 0) -> list:
+    """
+    size emails; sentences is a fixed count or a (min, max) range.
+    Same arguments always give the same corpus.
+    """
+    rng = random.Random(seed)
+
+    if isinstance(sentences, int):
+        sentences = (sentences, sentences)
+
+    return [
+        generate_email(rng, rng.randint(*sentences))
+        for _ in range(size)
+    ]
@@ -0,0 +1,47 @@
+import argparse
+import json
+
+from src.boilerplate import BoilerplateIndex
+from src.batch import iter_chunks
+from src.email_sources import iter_emails
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build or update the boilerplate index from a mailbox (directory, mbox or JSONL)."
+    )
+    parser.add_argument("input", help="directory of emails, mbox file or .jsonl file")
+    parser.add_argument("index", help="index file (SQLite); updated in place if it exists")
+    parser.add_argument("--min-docs", type=int, default=5,
+                        help="a unit is boilerplate once at least this many emails carry it")
+    parser.add_argument("--min-share", type=float, default=0.02,
+                        help="... and at least this share of the indexed emails. Higher keeps "
+                             "recurring real sentences (reminders, requests) but misses footers "
+                             "of senders with few emails in the corpus; sentences with dates, "
+                             "times, money or deadlines are never stripped either way")
+    parser.add_argument("--max-units", type=int, default=2_000_000,
+                        help="index size bound; the rarest units are forgotten first")
+    parser.add_argument("--top", type=int, default=10, help="print the most widespread units")
+    args = parser.parse_args()
+
+    index = BoilerplateIndex(
+        args.index, min_docs=args.min_docs, min_share=args.min_share, max_units=args.max_units
+    )
+
+    seen = 0
+    added = 0
+    for chunk in iter_chunks(iter_emails(args.input), 1000):
+        seen += len(chunk)
+        added += index.add_documents(text for _, text in chunk)
+
+    for docs, sample in index.top(args.top):
+        print(f"{docs:8d}  {sample}")
+
+    print(json.dumps({
+        "emails_seen": seen,
+        "emails_added": added,
+        "boilerplate_units": len(index.known()),
+        "threshold_docs": index.threshold()
+    }))
+
+if __name__ == "__main__":
+    main()
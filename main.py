@@ -10,12 +10,16 @@ with open("data/raw_emails.txt", "r", encoding="utf-8") as f:
     text = f.read()
 
 # ---------- Preprocessing ----------
-result = preprocess_email(text)
+result = preprocess_email(text, keep_doc=True)
 
 print("\n📌 SUBJECT:\n", result["subject"])
 
 # ---------- Extractive ----------
-extractive_summary = extractive_summarize(result["sentences"], top_n=3)
+extractive_summary = extractive_summarize(
+    result["sentences"],
+    top_n=3,
+    doc=result["doc"]
+)
 
 print("\n✨ EXTRACTIVE SUMMARY:\n")
 print(extractive_summary)
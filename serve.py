@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import logging
+
+from src.service import SummarizationService, start_server
+
+async def serve(args):
+    from src import models
+
+    models.set_backend(args.backend, args.threads)
+    if args.embedding_store and not args.extractive_only:
+        from src.embedding_store import EmbeddingStore
+        from src.grounding_filter import use_embedding_store
+
+        use_embedding_store(EmbeddingStore(args.embedding_store, args.embedding_store_max_rows))
+
+    router = None
+    if args.route:
+        from src.routing import Router
+
+        router = Router(args.route_history)
+
+    service = SummarizationService(
+        top_n=args.top_n,
+        max_batch=args.max_batch,
+        max_wait=args.max_wait_ms / 1000,
+        max_queue=args.max_queue,
+        preprocess_workers=args.preprocess_workers,
+        abstractive=not args.extractive_only,
+        chunked=args.chunked,
+        extractive_mode=args.extractive_mode,
+        router=router,
+        budget_seconds=args.budget_ms / 1000 if args.budget_ms else None
+    )
+
+    server = await start_server(service, args.host, args.port, args.unix)
+    where = args.unix or f"http://{args.host}:{args.port}"
+    logging.getLogger(__name__).info("serving on %s", where)
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local email summarization service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", default=None, help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--top-n", type=int, default=3)
+    parser.add_argument("--max-batch", type=int, default=8,
+                        help="largest BART / MiniLM micro-batch")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0,
+                        help="how long a request may wait for its batch to fill")
+    parser.add_argument("--max-queue", type=int, default=256,
+                        help="requests in flight before new ones get 503")
+    parser.add_argument("--preprocess-workers", type=int, default=2,
+                        help="processes for preprocess + extractive (0: threads)")
+    parser.add_argument("--backend", choices=["torch", "int8", "onnx"], default="torch")
+    parser.add_argument("--threads", type=int, default=None, help="inference threads")
+    parser.add_argument("--extractive-only", action="store_true")
+    parser.add_argument("--extractive-mode", choices=["spacy", "fast"], default="spacy")
+    parser.add_argument("--chunked", action="store_true")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="latency budget per BART micro-batch")
+    parser.add_argument("--route", action="store_true")
+    parser.add_argument("--route-history", default=None)
+    parser.add_argument("--embedding-store", default=None,
+                        help="directory of the shared sentence-embedding store used by grounding")
+    parser.add_argument("--embedding-store-max-rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,23 @@
-import re
-from transformers import BartTokenizer, BartForConditionalGeneration
-import torch
+import logging
+import time
 
 from src.grounding_filter import remove_ungrounded_lines
 from src.evaluation import fact_retention_score
+from src.entity_matcher import matcher_for
 from src.preprocess import clean_injected_sentence
+from src.models import get_bart, get_tokenizer
+from src import budget, profiling
+from src.rules import normalize, split_sentences
 
-MODEL_NAME = "facebook/bart-large-cnn"
+MAX_INPUT_TOKENS = 1024
 
-tokenizer = BartTokenizer.from_pretrained(MODEL_NAME)
-model = BartForConditionalGeneration.from_pretrained(MODEL_NAME)
+# beam width per routing decision (see src.routing)
+ROUTE_BEAMS = {"full": 2, "fast": 1}
 
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model = model.to(device)
+# decode paths from most to least faithful
+_PATH_ORDER = {plan["path"]: rank for rank, plan in enumerate(budget.DECODING_PLANS)}
 
-# --------------------------------------------------
-# ✅ Normalize helper
-# --------------------------------------------------
-def normalize(text: str) -> str:
-    return re.sub(r'[^a-z0-9]', '', text.lower())
-
-# --------------------------------------------------
-# ✅ Sentence split helper
-# --------------------------------------------------
-def split_sentences(text: str):
-    return [s.strip() for s in re.split(r'(?<=[.!?])\s+|\n+', text) if s.strip()]
+logger = logging.getLogger(__name__)
 
 # --------------------------------------------------
 # ✅ Deduplicate
@@ -49,27 +42,28 @@ def collect_missing_entity_sentences(extractive: str,
                                      original_email: str,
                                      entities: dict):
 
-    extractive_norm = normalize(extractive)
+    matcher = matcher_for(entities)
+    in_extractive = matcher.present(extractive)
     source_sentences = split_sentences(original_email)
 
-    additions = []
+    # one scan over the source finds every value's sentences
+    located = matcher.locate(source_sentences)
 
-    for label, values in entities.items():
-        for v in values:
+    additions = []
 
-            # already present in extractive → skip
-            if normalize(v) in extractive_norm:
-                continue
+    for _, _, norm in matcher.values:
 
-            for sent in source_sentences:
-                if normalize(v) in normalize(sent):
+        # already present in extractive → skip
+        if norm in in_extractive:
+            continue
 
-                    cleaned = clean_injected_sentence(sent)
-                    if not cleaned:
-                        continue
+        for i in located.get(norm, []):
+            cleaned = clean_injected_sentence(source_sentences[i])
+            if not cleaned:
+                continue
 
-                    additions.append(cleaned)
-                    break
+            additions.append(cleaned)
+            break
 
     return list(dict.fromkeys(additions))
 
@@ -92,13 +86,286 @@ def build_full_rewrite_input(extractive_summary,
 
     return " ".join(full_text)
 
+# --------------------------------------------------
+# ✅ Per-item length limits for batched generation
+# --------------------------------------------------
+def length_limits(input_len: int, min_scale: float = 0.9, max_scale: float = 1.2):
+    """Output length stays close to the input (paraphrase, not summary)."""
+    return int(input_len * min_scale), int(input_len * max_scale)
+
+class PerItemLengthLogitsProcessor:
+    """
+    generate() only takes one min/max length per call.
+    This applies a min/max per batch item instead: EOS is
+    banned below an item's min length and forced at its
+    max length, exactly as the built-in scalar limits do.
+    """
+
+    def __init__(self, min_lengths, max_lengths, eos_token_id, num_beams):
+        import torch
+
+        self.min_lengths = torch.tensor(min_lengths)
+        self.max_lengths = torch.tensor(max_lengths)
+        self.eos_token_id = eos_token_id
+        self.num_beams = num_beams
+
+    def __call__(self, input_ids, scores):
+        import torch
+
+        cur_len = input_ids.shape[-1]
+
+        # beam rows are laid out item-major: row // num_beams = item
+        item = torch.arange(scores.shape[0], device=scores.device) // self.num_beams
+        min_lengths = self.min_lengths.to(scores.device)[item]
+        max_lengths = self.max_lengths.to(scores.device)[item]
+
+        too_short = cur_len < min_lengths
+        scores[too_short, self.eos_token_id] = -float("inf")
+
+        at_limit = cur_len >= max_lengths - 1
+        if at_limit.any():
+            forced = torch.full_like(scores[at_limit], -float("inf"))
+            forced[:, self.eos_token_id] = 0
+            scores[at_limit] = forced
+
+        return scores
+
+# --------------------------------------------------
+# ✅ Batched generation (length-bucketed, padded)
+# --------------------------------------------------
+def generate_rewrites(texts: list,
+                      batch_size: int = 8,
+                      num_beams: int = 2) -> list:
+    """
+    Paraphrase many texts with as few generate() calls as possible.
+    Texts are sorted by token length and grouped into padded batches
+    so that padding stays small; results come back in input order.
+    """
+    return [
+        result["text"]
+        for result in generate_rewrites_detailed(texts, batch_size, num_beams)
+    ]
+
+def generate_rewrites_detailed(texts: list,
+                               batch_size: int = 8,
+                               num_beams: int = 2,
+                               deadline: float = None) -> list:
+    """
+    generate_rewrites, returning one dict per text: text, path
+    (decoding setting used) and seconds (its batch's generate time).
+
+    deadline: optional time.perf_counter() value. Each batch then
+    decodes with the most faithful src.budget plan expected to fit
+    the time left (at most num_beams wide). A batch with no plan
+    that fits gets path "skipped", one cut off at the deadline gets
+    "timed_out"; both come back with text None.
+    """
+    if not texts:
+        return []
+
+    from transformers import LogitsProcessorList, StoppingCriteriaList
+
+    tokenizer, model, device = get_bart()
+
+    lengths = [
+        len(ids)
+        for ids in tokenizer(
+            list(texts),
+            max_length=MAX_INPUT_TOKENS,
+            truncation=True
+        )["input_ids"]
+    ]
+
+    order = sorted(range(len(texts)), key=lambda i: lengths[i])
+    outputs = [None] * len(texts)
+
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+
+        if deadline is None:
+            decoding = {"path": "beam" if num_beams > 1 else "greedy",
+                        "num_beams": num_beams, "min_scale": 0.9, "max_scale": 1.2}
+        else:
+            decoding = budget.plan(
+                max(lengths[i] for i in bucket),
+                deadline - time.perf_counter(),
+                max_beams=num_beams
+            )
+
+            if decoding is None:
+                for i in bucket:
+                    outputs[i] = {"text": None, "path": "skipped", "seconds": 0.0}
+                continue
+
+        inputs = tokenizer(
+            [texts[i] for i in bucket],
+            max_length=MAX_INPUT_TOKENS,
+            truncation=True,
+            padding=True,
+            return_tensors="pt"
+        ).to(device)
+
+        limits = [
+            length_limits(lengths[i], decoding["min_scale"], decoding["max_scale"])
+            for i in bucket
+        ]
+        min_lengths = [lo for lo, _ in limits]
+        max_lengths = [hi for _, hi in limits]
+
+        stopping = StoppingCriteriaList()
+        stop = None
+        if deadline is not None:
+            stop = budget.DeadlineCriteria(deadline)
+            stopping.append(stop)
+
+        began = time.perf_counter()
+
+        with profiling.stage("generate"):
+            profiling.count("generate_calls")
+            profiling.count("input_tokens", int(inputs["attention_mask"].sum()))
+
+            summary_ids = model.generate(
+                inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                num_beams=decoding["num_beams"],
+                max_length=max(max_lengths),
+                min_length=0,
+                length_penalty=1.0,
+                repetition_penalty=1.05,
+                early_stopping=False,
+                logits_processor=LogitsProcessorList([
+                    PerItemLengthLogitsProcessor(
+                        min_lengths,
+                        max_lengths,
+                        model.config.eos_token_id,
+                        decoding["num_beams"]
+                    )
+                ]),
+                stopping_criteria=stopping
+            )
+
+            pad = tokenizer.pad_token_id
+            profiling.count("output_tokens", int((summary_ids != pad).sum()))
+
+        elapsed = time.perf_counter() - began
+        budget.observe(decoding["num_beams"], elapsed, summary_ids.shape[1])
+
+        if stop is not None and stop.fired:
+            for i in bucket:
+                outputs[i] = {"text": None, "path": "timed_out", "seconds": elapsed}
+            continue
+
+        decoded = tokenizer.batch_decode(
+            summary_ids,
+            skip_special_tokens=True
+        )
+
+        for i, text in zip(bucket, decoded):
+            outputs[i] = {"text": text, "path": decoding["path"], "seconds": elapsed}
+
+    return outputs
+
+# --------------------------------------------------
+# ✅ Token budgeting (chunked mode + truncation report)
+# --------------------------------------------------
+def count_tokens(text: str) -> int:
+    """Model input length of text, special tokens included, untruncated."""
+    tokenizer = get_tokenizer()
+    return len(tokenizer(text, add_special_tokens=True)["input_ids"])
+
+def chunk_rewrite_input(text: str, max_tokens: int = MAX_INPUT_TOKENS):
+    """
+    Split text on sentence boundaries into chunks that each fit
+    max_tokens (special tokens included). A single sentence longer
+    than the budget becomes its own chunk and is truncated.
+
+    Returns (chunks, total_tokens, covered_tokens).
+    """
+    tokenizer = get_tokenizer()
+
+    sentences = split_sentences(text)
+    if not sentences:
+        return [], 0, 0
+
+    # <s> ... </s>
+    budget = max_tokens - 2
+
+    # leading space: counted the way the sentence tokenizes once joined
+    lengths = [
+        len(ids)
+        for ids in tokenizer(
+            [" " + sent for sent in sentences],
+            add_special_tokens=False
+        )["input_ids"]
+    ]
+
+    chunks = []
+    current = []
+    current_len = 0
+    covered = 0
+
+    for sent, length in zip(sentences, lengths):
+        if current and current_len + length > budget:
+            chunks.append(" ".join(current))
+            current = []
+            current_len = 0
+
+        current.append(sent)
+        current_len += length
+        covered += min(length, budget)
+
+    if current:
+        chunks.append(" ".join(current))
+
+    return chunks, sum(lengths) + 2, covered + 2
+
+# --------------------------------------------------
+# ✅ Grounding + dedup + safety fallback
+# --------------------------------------------------
+def _finalize(rewritten: str,
+              original_email: str,
+              extractive_summary: str,
+              entities: dict) -> tuple:
+    """Returns (summary, fell_back)."""
+
+    # 🔹 Remove hallucinated content
+    grounded = remove_ungrounded_lines(
+        rewritten,
+        original_email
+    )
+
+    # 🔹 Remove duplicates
+    grounded = deduplicate_sentences(grounded)
+
+    # 🔹 Safety fallback
+    if fact_retention_score(entities, grounded) < 0.6:
+        return extractive_summary, True
+
+    return grounded, False
+
+def finalize_rewrite(rewritten: str,
+                     original_email: str,
+                     extractive_summary: str,
+                     entities: dict) -> str:
+    return _finalize(rewritten, original_email, extractive_summary, entities)[0]
+
 # --------------------------------------------------
 # ✅ Abstractive rewrite (PURE PARAPHRASE MODE)
 # --------------------------------------------------
 def abstractive_rewrite(prompt: str,
                         original_email: str,
                         extractive_summary: str,
-                        entities: dict) -> str:
+                        entities: dict,
+                        budget_seconds: float = None) -> str:
+
+    # 🔹 Latency budget: decoding is planned to fit it
+    #    (abstractive_rewrite_detailed also reports the path taken)
+    if budget_seconds is not None:
+        return abstractive_rewrite_detailed(
+            [(extractive_summary, original_email, entities)],
+            batch_size=1,
+            budget_seconds=budget_seconds
+        )[0]["summary"]
 
     # 🔹 Build FULL text that must appear in output
     full_input = build_full_rewrite_input(
@@ -107,45 +374,255 @@ def abstractive_rewrite(prompt: str,
         entities
     )
 
+    tokenizer, model, device = get_bart()
+
     # 🔹 Send THAT to the model (not just prompt)
     inputs = tokenizer(
         full_input,
-        max_length=1024,
+        max_length=MAX_INPUT_TOKENS,
         truncation=True,
         return_tensors="pt"
     ).to(device)
 
     input_len = inputs["input_ids"].shape[1]
 
-    min_len = int(input_len * 0.9)
-    max_len = int(input_len * 1.2)
-
-    summary_ids = model.generate(
-        inputs["input_ids"],
-        num_beams=2,
-        max_length=max_len,
-        min_length=min_len,
-        length_penalty=1.0,
-        repetition_penalty=1.05,
-        early_stopping=False
-    )
+    total_len = count_tokens(full_input)
+    if total_len > input_len:
+        logger.warning(
+            "rewrite input truncated to %d of %d tokens (coverage %.0f%%); "
+            "use chunked mode to keep the rest",
+            input_len, total_len, 100 * input_len / total_len
+        )
+
+    min_len, max_len = length_limits(input_len)
+
+    with profiling.stage("generate"):
+        profiling.count("generate_calls")
+        profiling.count("input_tokens", input_len)
+
+        summary_ids = model.generate(
+            inputs["input_ids"],
+            num_beams=2,
+            max_length=max_len,
+            min_length=min_len,
+            length_penalty=1.0,
+            repetition_penalty=1.05,
+            early_stopping=False
+        )
+
+        profiling.count("output_tokens", int(summary_ids.shape[1]))
 
     rewritten = tokenizer.decode(
         summary_ids[0],
         skip_special_tokens=True
     )
 
-    # 🔹 Remove hallucinated content
-    grounded = remove_ungrounded_lines(
+    return finalize_rewrite(
         rewritten,
-        original_email
+        original_email,
+        extractive_summary,
+        entities
     )
 
-    # 🔹 Remove duplicates
-    grounded = deduplicate_sentences(grounded)
-
-    # 🔹 Safety fallback
-    if fact_retention_score(entities, grounded) < 0.6:
-        return extractive_summary
-
-    return grounded
+# --------------------------------------------------
+# ✅ Abstractive rewrite for many emails at once
+# --------------------------------------------------
+def abstractive_rewrite_detailed(items,
+                                 batch_size: int = 8,
+                                 chunked: bool = False,
+                                 chunk_tokens: int = MAX_INPUT_TOKENS,
+                                 router=None,
+                                 budget_seconds: float = None) -> list:
+    """
+    items: iterable of (extractive_summary, cleaned_text, entities).
+
+    Generation is batched across emails; grounding, dedup and the
+    fact-retention fallback still run per item. Input order is kept.
+
+    chunked=True is the map-reduce mode for inputs past BART's window:
+    each rewrite input is split on sentence boundaries into
+    chunk_tokens-sized chunks, all chunks of all emails are rewritten
+    as one batched job, and each email's chunk rewrites are merged and
+    grounded against its full source.
+
+    router: optional src.routing.Router. Each item is then sent
+    through beam search ("full"), greedy decoding ("fast") or not
+    to BART at all ("extractive"), and its outcome is reported back.
+
+    budget_seconds: optional latency budget for the whole call.
+    Decoding settings are then chosen to fit it (see src.budget);
+    items whose generation is skipped or cut off by the deadline get
+    their extractive summary back.
+
+    Returns one dict per item: summary, chunks, input_tokens,
+    covered_tokens and coverage (share of the rewrite input the model
+    actually saw; below 1.0 means truncation), route, fell_back
+    (None when BART was skipped), bart_seconds_saved, decode_path
+    ("beam", "greedy", "greedy_short", "skipped", "timed_out" or
+    "none" when routed past BART) and generate_seconds.
+    """
+    deadline = None
+    if budget_seconds is not None:
+        deadline = time.perf_counter() + budget_seconds
+
+    items = list(items)
+
+    full_inputs = [
+        build_full_rewrite_input(extractive_summary, original_email, entities)
+        for extractive_summary, original_email, entities in items
+    ]
+
+    features = [None] * len(items)
+    routes = ["full"] * len(items)
+    saved = [0.0] * len(items)
+
+    if router is not None:
+        for i, (item, full_input) in enumerate(zip(items, full_inputs)):
+            features[i] = router.features(*item, full_input=full_input)
+            routes[i], _ = router.decide(features[i])
+            saved[i] = router.estimate_saved(features[i], routes[i])
+
+    texts = []
+    owners = []
+    infos = []
+
+    for i, full_input in enumerate(full_inputs):
+        if routes[i] == "extractive":
+            total = features[i]["tokens"]
+            infos.append({
+                "chunks": 0,
+                "input_tokens": total,
+                "covered_tokens": 0,
+                "coverage": 1.0
+            })
+            continue
+
+        if chunked:
+            chunks, total, covered = chunk_rewrite_input(full_input, chunk_tokens)
+        else:
+            chunks = [full_input]
+            total = features[i]["tokens"] if features[i] else count_tokens(full_input)
+            covered = min(total, MAX_INPUT_TOKENS)
+
+        texts.extend(chunks)
+        owners.extend([i] * len(chunks))
+        infos.append({
+            "chunks": len(chunks),
+            "input_tokens": total,
+            "covered_tokens": covered,
+            "coverage": covered / total if total else 1.0
+        })
+
+    # one generate() job per decoding setting
+    rewrites = [None] * len(texts)
+
+    for route, num_beams in ROUTE_BEAMS.items():
+        picked = [j for j, owner in enumerate(owners) if routes[owner] == route]
+        if not picked:
+            continue
+
+        start = time.perf_counter()
+        outputs = generate_rewrites_detailed(
+            [texts[j] for j in picked],
+            batch_size=batch_size,
+            num_beams=num_beams,
+            deadline=deadline
+        )
+        elapsed = time.perf_counter() - start
+
+        for j, rewritten in zip(picked, outputs):
+            rewrites[j] = rewritten
+
+        if router is not None:
+            tokens = sum(infos[i]["covered_tokens"] for i in set(owners[j] for j in picked))
+            router.observe_speed(route, elapsed, tokens)
+
+    merged = [[] for _ in items]
+    for owner, rewritten in zip(owners, rewrites):
+        merged[owner].append(rewritten)
+
+    results = []
+
+    for i, (parts, info, (extractive_summary, original_email, entities)) in enumerate(zip(merged, infos, items)):
+        if routes[i] == "extractive":
+            results.append(dict(
+                summary=extractive_summary,
+                route="extractive",
+                fell_back=None,
+                bart_seconds_saved=saved[i],
+                decode_path="none",
+                generate_seconds=0.0,
+                **info
+            ))
+            continue
+
+        generate_seconds = sum(part["seconds"] for part in parts)
+        missed = [part["path"] for part in parts if part["text"] is None]
+
+        if missed:
+            # over budget: nothing usable to ground, keep the extractive summary
+            logger.info(
+                "rewrite %s after %.2fs, returning the extractive summary",
+                missed[0], generate_seconds
+            )
+            results.append(dict(
+                summary=extractive_summary,
+                route=routes[i],
+                fell_back=True,
+                bart_seconds_saved=saved[i],
+                decode_path=missed[0],
+                generate_seconds=generate_seconds,
+                **info
+            ))
+            continue
+
+        if info["coverage"] < 1.0:
+            logger.warning(
+                "rewrite input truncated: %d of %d tokens seen (coverage %.0f%%)",
+                info["covered_tokens"], info["input_tokens"], 100 * info["coverage"]
+            )
+
+        summary, fell_back = _finalize(
+            " ".join(part["text"] for part in parts),
+            original_email,
+            extractive_summary,
+            entities
+        )
+
+        if router is not None:
+            router.observe(features[i], routes[i], fell_back)
+
+        results.append(dict(
+            summary=summary,
+            route=routes[i],
+            fell_back=fell_back,
+            bart_seconds_saved=saved[i],
+            # a chunked rewrite is as degraded as its worst chunk
+            decode_path=max(
+                (part["path"] for part in parts), key=_PATH_ORDER.get, default="none"
+            ),
+            generate_seconds=generate_seconds,
+            **info
+        ))
+
+    return results
+
+def abstractive_rewrite_batch(items,
+                              batch_size: int = 8,
+                              chunked: bool = False) -> list:
+    """Same as abstractive_rewrite_detailed, returning only the summaries."""
+    return [
+        result["summary"]
+        for result in abstractive_rewrite_detailed(items, batch_size, chunked)
+    ]
+
+def abstractive_rewrite_chunked(original_email: str,
+                                extractive_summary: str,
+                                entities: dict,
+                                chunk_tokens: int = MAX_INPUT_TOKENS) -> dict:
+    """Map-reduce rewrite of one email; see abstractive_rewrite_detailed."""
+    return abstractive_rewrite_detailed(
+        [(extractive_summary, original_email, entities)],
+        chunked=True,
+        chunk_tokens=chunk_tokens
+    )[0]
@@ -0,0 +1,414 @@
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+
+from src.email_sources import iter_emails
+
+# --------------------------------------------------
+# ✅ Worker side
+#    Models are loaded once per worker (in the initializer)
+#    and the worker stays alive for the whole run.
+# --------------------------------------------------
+_settings = {}
+
+def init_worker(threads: int,
+                top_n: int,
+                batch_size: int,
+                abstractive: bool,
+                chunked: bool = False,
+                cache_path: str = None,
+                cache_max_bytes: int = None,
+                profile: dict = None,
+                extractive_mode: str = "spacy",
+                route: bool = False,
+                route_history: str = None,
+                budget_seconds: float = None,
+                backend: str = "torch",
+                threads_path: str = None,
+                boilerplate_path: str = None,
+                boilerplate_min_docs: int = 5,
+                boilerplate_min_share: float = 0.02,
+                near_dup_path: str = None,
+                near_dup_threshold: float = 0.85,
+                near_dup_max_docs: int = 200_000,
+                embedding_store_path: str = None,
+                embedding_store_max_rows: int = 1_000_000):
+    from src import models, profiling
+    from src.boilerplate import BoilerplateIndex
+    from src.cache import ResultCache
+    from src.routing import Router
+    from src.threads import ThreadStore
+
+    if abstractive:
+        models.set_backend(backend, max(1, threads))
+
+    models.warmup(abstractive=abstractive)
+
+    if embedding_store_path and abstractive:
+        from src.embedding_store import EmbeddingStore
+        from src.grounding_filter import use_embedding_store
+
+        use_embedding_store(EmbeddingStore(embedding_store_path, embedding_store_max_rows))
+
+    if profile is not None:
+        profiling.enable(seed=os.getpid(), **profile)
+
+    _settings["top_n"] = top_n
+    _settings["batch_size"] = batch_size
+    _settings["abstractive"] = abstractive
+    _settings["chunked"] = chunked
+    _settings["extractive_mode"] = extractive_mode
+    _settings["cache"] = (
+        ResultCache(cache_path, cache_max_bytes) if cache_path else None
+    )
+    _settings["budget_seconds"] = budget_seconds
+    _settings["threads"] = ThreadStore(threads_path) if threads_path else None
+    _settings["boilerplate"] = (
+        BoilerplateIndex(boilerplate_path, min_docs=boilerplate_min_docs, min_share=boilerplate_min_share)
+        if boilerplate_path else None
+    )
+    _settings["router"] = (
+        Router(route_history) if route and abstractive else None
+    )
+    _settings["near_duplicates"] = None
+
+    if near_dup_path and abstractive:
+        from src.near_duplicates import NearDuplicateIndex
+
+        _settings["near_duplicates"] = NearDuplicateIndex(
+            near_dup_path, threshold=near_dup_threshold, max_docs=near_dup_max_docs
+        )
+
+def summarize_one(email_id: str, text: str) -> dict:
+    from src.pipeline import summarize_email
+
+    try:
+        result = summarize_email(
+            text,
+            email_id=email_id,
+            top_n=_settings["top_n"],
+            abstractive=_settings["abstractive"],
+            chunked=_settings["chunked"],
+            cache=_settings["cache"],
+            extractive_mode=_settings["extractive_mode"],
+            router=_settings["router"],
+            budget_seconds=_settings["budget_seconds"],
+            threads=_settings["threads"],
+            boilerplate=_settings["boilerplate"],
+            near_duplicates=_settings["near_duplicates"]
+        )
+        return dict(id=email_id, **result)
+    except Exception as exc:
+        return {"id": email_id, "error": f"{type(exc).__name__}: {exc}"}
+
+def summarize_chunk(chunk: list) -> list:
+    """
+    chunk: list of (email_id, text), or (email_id, text, content_hash)
+    in incremental runs; the hash comes back on the result. Never raises.
+    """
+    from src.pipeline import summarize_emails
+
+    try:
+        results = summarize_emails(
+            [item[1] for item in chunk],
+            ids=[item[0] for item in chunk],
+            top_n=_settings["top_n"],
+            batch_size=_settings["batch_size"],
+            abstractive=_settings["abstractive"],
+            chunked=_settings["chunked"],
+            cache=_settings["cache"],
+            extractive_mode=_settings["extractive_mode"],
+            router=_settings["router"],
+            budget_seconds=_settings["budget_seconds"],
+            threads=_settings["threads"],
+            boilerplate=_settings["boilerplate"],
+            near_duplicates=_settings["near_duplicates"]
+        )
+        results = [dict(id=item[0], **result) for item, result in zip(chunk, results)]
+    except Exception:
+        # one bad email must not take the whole chunk down
+        results = [summarize_one(item[0], item[1]) for item in chunk]
+
+    finally:
+        # lookups are written in batches; the driver reads the stats
+        if _settings["cache"] is not None:
+            _settings["cache"].flush()
+
+    for item, result in zip(chunk, results):
+        if len(item) > 2:
+            result["content_hash"] = item[2]
+
+    return results
+
+# --------------------------------------------------
+# ✅ Driver side
+# --------------------------------------------------
+def iter_chunks(emails, chunk_size: int):
+    chunk = []
+
+    for item in emails:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+def run_batch(input_path: str,
+              output_path: str,
+              workers: int = None,
+              chunk_size: int = 8,
+              top_n: int = 3,
+              threads_per_worker: int = None,
+              abstractive: bool = True,
+              chunked: bool = False,
+              cache_path: str = None,
+              cache_max_bytes: int = 1 << 30,
+              profile_report: str = None,
+              profile_fraction: float = 0.0,
+              profile_dir: str = None,
+              extractive_mode: str = "spacy",
+              route: bool = False,
+              route_history: str = None,
+              budget_seconds: float = None,
+              backend: str = "torch",
+              incremental: bool = False,
+              manifest_path: str = None,
+              threads_path: str = None,
+              boilerplate_path: str = None,
+              boilerplate_min_docs: int = 5,
+              boilerplate_min_share: float = 0.02,
+              near_dup_path: str = None,
+              near_dup_threshold: float = 0.85,
+              near_dup_max_docs: int = 200_000,
+              embedding_store_path: str = None,
+              embedding_store_max_rows: int = 1_000_000) -> dict:
+    """
+    Summarize every email under input_path with a pool of
+    long-lived workers and stream one JSON line per email
+    to output_path (in completion order, each line has "id").
+
+    cache_path: optional on-disk result cache shared by all
+    workers; its hit/miss statistics are included in the result.
+
+    profile_report: turn on per-stage instrumentation; every output
+    line gets a "timings" record and the aggregate p50/p95/p99
+    report is written to this path. profile_fraction of the emails
+    are also run under cProfile, dumped into profile_dir.
+
+    route: let src.routing.Router skip or cheapen BART per email;
+    route_history is the SQLite file its fallback history is shared
+    through. Route counts and estimated BART seconds saved are
+    included in the result.
+
+    budget_seconds: latency budget per chunk's BART generation;
+    decode path counts are included in the result.
+
+    backend: "torch", "int8" or "onnx" (see src.models.set_backend);
+    threads_per_worker applies to whichever is chosen.
+
+    incremental: only summarize emails that are new, changed, or
+    were summarized under other models/parameters, according to the
+    manifest at manifest_path (default: output_path + ".manifest"),
+    and append to output_path instead of overwriting it. A changed
+    email gets a new line; the last line per id is current. Safe to
+    re-run after a crash, and input_path may still be growing.
+
+    threads_path: SQLite thread store (src.threads); quoted history
+    is then cut before preprocessing and earlier messages' summaries
+    are read from the store. Quoted history of a message not in the
+    store yet (workers run in parallel) is summarized with the reply.
+
+    boilerplate_path: boilerplate index (src.boilerplate, built with
+    build_boilerplate_index.py); units seen in boilerplate_min_docs
+    emails, and in boilerplate_min_share of the indexed ones, are
+    dropped before preprocessing. Hit rates are included
+    in the result.
+
+    near_dup_path: near-duplicate index (src.near_duplicates) shared
+    by all workers; emails whose shingles overlap a summarized one by
+    near_dup_threshold (estimated Jaccard) reuse its summary instead
+    of running BART. Emails within one chunk do not see each other.
+
+    embedding_store_path: directory of the shared MiniLM sentence
+    embedding store (src.embedding_store); grounding then only
+    encodes sentences no worker has encoded before.
+    """
+    from src import profiling
+
+    profile = None
+    if profile_report:
+        profile = {"profile_fraction": profile_fraction, "profile_dir": profile_dir}
+    timings = []
+    routes = {}
+    decode_paths = {}
+    boilerplate = {"emails": 0, "emails_with_hits": 0, "units": 0, "units_removed": 0, "chars_removed": 0}
+    saved_seconds = 0.0
+    reused = 0
+
+    workers = workers or os.cpu_count() or 1
+    threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+
+    emails = iter_emails(input_path, live=incremental)
+
+    manifest = None
+    counts = {"skipped": 0}
+    recovered = 0
+
+    if incremental:
+        from src.manifest import Manifest, config_fingerprint
+
+        boilerplate = None
+        if boilerplate_path:
+            from src.boilerplate import BoilerplateIndex
+
+            index = BoilerplateIndex(boilerplate_path, min_docs=boilerplate_min_docs, min_share=boilerplate_min_share)
+            # the stripped units, so a rebuilt index re-runs affected emails
+            boilerplate = {
+                "index": index.fingerprint(),
+                "min_docs": boilerplate_min_docs,
+                "min_share": boilerplate_min_share
+            }
+            index.close()
+
+        config = config_fingerprint({
+            "top_n": top_n,
+            "abstractive": abstractive,
+            "chunked": chunked,
+            "extractive_mode": extractive_mode,
+            "route": route,
+            "budget_seconds": budget_seconds,
+            "backend": backend,
+            "near_dup_threshold": near_dup_threshold if near_dup_path else None,
+            "boilerplate": boilerplate,
+            "threads": threads_path is not None
+        })
+        manifest = Manifest(manifest_path or output_path + ".manifest")
+        recovered = manifest.reconcile(output_path, config)
+        emails = manifest.iter_pending(emails, config, counts)
+
+    chunks = iter_chunks(emails, chunk_size)
+
+    done = 0
+    failed = 0
+    start = time.perf_counter()
+
+    with open(output_path, "a" if incremental else "w", encoding="utf-8") as out, mp.Pool(
+        processes=workers,
+        initializer=init_worker,
+        initargs=(
+            threads_per_worker,
+            top_n,
+            chunk_size,
+            abstractive,
+            chunked,
+            cache_path,
+            cache_max_bytes,
+            profile,
+            extractive_mode,
+            route,
+            route_history,
+            budget_seconds,
+            backend,
+            threads_path,
+            boilerplate_path,
+            boilerplate_min_docs,
+            boilerplate_min_share,
+            near_dup_path,
+            near_dup_threshold,
+            near_dup_max_docs,
+            embedding_store_path,
+            embedding_store_max_rows
+        )
+    ) as pool:
+
+        for results in pool.imap_unordered(summarize_chunk, chunks):
+            finished = []
+
+            for result in results:
+                if manifest is not None and "content_hash" in result:
+                    result["config"] = config
+
+                    if "error" not in result:
+                        finished.append((result["id"], result["content_hash"]))
+
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                done += 1
+                failed += "error" in result
+
+                if "timings" in result:
+                    timings.append(result["timings"])
+
+                if "boilerplate_removed" in result:
+                    removed = result["boilerplate_removed"]
+                    boilerplate["emails"] += 1
+                    boilerplate["emails_with_hits"] += removed["removed"] > 0
+                    boilerplate["units"] += removed["units"]
+                    boilerplate["units_removed"] += removed["removed"]
+                    boilerplate["chars_removed"] += removed["chars"]
+
+                reused += "near_duplicate_of" in result
+
+                if "decode_path" in result:
+                    path = result["decode_path"]
+                    decode_paths[path] = decode_paths.get(path, 0) + 1
+
+                if "route" in result:
+                    routes[result["route"]] = routes.get(result["route"], 0) + 1
+                    saved_seconds += result["bart_seconds_saved"]
+
+            out.flush()
+
+            # mark only what is durably in the output
+            if finished:
+                os.fsync(out.fileno())
+                manifest.mark(finished, config)
+
+            print(f"\r{done} emails summarized", end="", file=sys.stderr)
+
+    print(file=sys.stderr)
+
+    stats = {
+        "emails": done,
+        "errors": failed,
+        "seconds": time.perf_counter() - start
+    }
+
+    if profile_report:
+        report = profiling.aggregate(timings)
+        with open(profile_report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        stats["profile"] = report["email_seconds"]
+
+    if manifest is not None:
+        manifest.close()
+        stats["skipped_unchanged"] = counts["skipped"]
+        stats["recovered_from_output"] = recovered
+
+    if decode_paths:
+        stats["decode_paths"] = decode_paths
+
+    if boilerplate_path:
+        boilerplate["email_hit_rate"] = (
+            boilerplate["emails_with_hits"] / boilerplate["emails"] if boilerplate["emails"] else 0.0
+        )
+        boilerplate["unit_hit_rate"] = (
+            boilerplate["units_removed"] / boilerplate["units"] if boilerplate["units"] else 0.0
+        )
+        stats["boilerplate"] = boilerplate
+
+    if near_dup_path and abstractive:
+        stats["near_duplicates"] = {"reused": reused, "rate": reused / done if done else 0.0}
+
+    if route:
+        stats["routing"] = {"routes": routes, "bart_seconds_saved": saved_seconds}
+
+    if cache_path:
+        from src.cache import ResultCache
+
+        stats["cache"] = ResultCache(cache_path, cache_max_bytes).stats()
+
+    return stats
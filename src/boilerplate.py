@@ -0,0 +1,273 @@
+"""
+Corpus-level boilerplate index.
+
+Legal disclaimers, confidentiality footers, invite templates and
+newsletter chrome recur across thousands of emails. The index keeps,
+for every hashed text unit (a sentence, or a line of a list-like
+block), the number of distinct emails it appeared in. Units seen in
+at least min_docs emails and in at least min_share of all indexed
+emails are boilerplate, and preprocessing drops them before sentence
+splitting, so no later stage sees them. Units the sentence rules
+mark as critical (dates, times, money, deadlines...) are never
+dropped, however common.
+
+Units are normalised (case, punctuation, line wrapping) before
+hashing, so a footer matches however it was wrapped. Digits are
+kept, so template lines carrying different dates or amounts are
+never mistaken for boilerplate. The index lives in SQLite, is
+updated incrementally (an email is only counted once), and is
+bounded: past max_units the rarest, least recently seen units are
+forgotten.
+"""
+import hashlib
+import math
+import os
+import re
+import time
+
+from src.rules import sentence_features
+from src.sqlite_util import ProcessConnection, hash64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    hash INTEGER PRIMARY KEY,
+    docs INTEGER NOT NULL,
+    last_seen REAL NOT NULL,
+    sample TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS units_rarest ON units (docs, last_seen);
+CREATE TABLE IF NOT EXISTS documents (
+    hash INTEGER PRIMARY KEY
+);
+"""
+
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+# --------------------------------------------------
+# ✅ Units
+# --------------------------------------------------
+def _normalize(unit: str) -> str:
+    # digits are kept: a template line with other dates or amounts is content
+    return re.sub(r"[^a-z0-9]+", " ", unit.lower()).strip()
+
+def _is_list_like(lines: list) -> bool:
+    """Short lines without sentence punctuation: keep them as separate units."""
+    return all(len(line) < 80 and not line.rstrip().endswith((".", "!", "?")) for line in lines)
+
+def iter_units(text: str):
+    """
+    Yield (paragraph_index, unit_text, joiner) for a body: paragraphs
+    are separated by blank lines, and split into sentences (soft line
+    wraps joined, joiner " ") or, for list-like blocks, into lines
+    (joiner "\n").
+    "Subject:" lines are never units.
+    """
+    paragraphs = re.split(r"\n\s*\n", text.replace("\r", ""))
+
+    for p, paragraph in enumerate(paragraphs):
+        lines = [
+            line.strip()
+            for line in paragraph.split("\n")
+            if line.strip() and not line.lower().lstrip().startswith("subject:")
+        ]
+
+        if not lines:
+            continue
+
+        if _is_list_like(lines):
+            units, joiner = lines, "\n"
+        else:
+            units, joiner = SENTENCE_END_RE.split(" ".join(lines)), " "
+
+        for unit in units:
+            if unit.strip():
+                yield p, unit.strip(), joiner
+
+def unit_hash(unit: str, min_words: int = 4):
+    """Hash of a unit, or None for units too short to judge."""
+    normalized = _normalize(unit)
+
+    if len(normalized.split()) < min_words:
+        return None
+
+    return hash64(normalized)
+
+def is_protected(unit: str) -> bool:
+    """Units later stages must see (critical keyword or info), never boilerplate."""
+    features = sentence_features(unit)
+    return features["critical_keyword"] or features["critical_info"]
+
+# --------------------------------------------------
+# ✅ Index
+# --------------------------------------------------
+class BoilerplateIndex:
+
+    def __init__(self, path: str, min_docs: int = 5, min_share: float = 0.02,
+                 max_units: int = 2_000_000, min_words: int = 4):
+        self.path = path
+        self.min_docs = min_docs
+        self.min_share = min_share
+        self.max_units = max_units
+        self.min_words = min_words
+        self._db = ProcessConnection(path)
+        self._known = None
+        self._fingerprint = None
+
+        self.stats_counts = {
+            "emails": 0,
+            "emails_with_hits": 0,
+            "units": 0,
+            "units_removed": 0,
+            "chars_removed": 0
+        }
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        return self._db.connect()
+
+    # ---------- building ----------
+    def add_documents(self, texts) -> int:
+        """Count every unit of every not-yet-seen email. Returns emails added."""
+        conn = self._connection()
+        added = 0
+        now = time.time()
+
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+
+            for text in texts:
+                doc_hash = hash64(" ".join(text.split()))
+                if conn.execute("SELECT 1 FROM documents WHERE hash = ?", (doc_hash,)).fetchone():
+                    continue
+
+                conn.execute("INSERT INTO documents VALUES (?)", (doc_hash,))
+                added += 1
+
+                units = {}
+                for _, unit, _ in iter_units(text):
+                    h = unit_hash(unit, self.min_words)
+                    if h is not None:
+                        units.setdefault(h, unit)
+
+                conn.executemany(
+                    "INSERT INTO units VALUES (?, 1, ?, ?) "
+                    "ON CONFLICT(hash) DO UPDATE SET docs = docs + 1, last_seen = excluded.last_seen",
+                    [(h, now, unit[:200]) for h, unit in units.items()]
+                )
+
+            self._prune(conn)
+
+        self.reload()
+        return added
+
+    def _prune(self, conn):
+        total = conn.execute("SELECT COUNT(*) FROM units").fetchone()[0]
+        excess = total - self.max_units
+
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM units WHERE hash IN "
+                "(SELECT hash FROM units ORDER BY docs, last_seen LIMIT ?)",
+                (excess,)
+            )
+
+    # ---------- stripping ----------
+    def threshold(self) -> int:
+        """Emails a unit must appear in: min_docs, or min_share of the indexed emails if more."""
+        documents = self._connection().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return max(self.min_docs, math.ceil(self.min_share * documents))
+
+    def known(self) -> frozenset:
+        """Snapshot of boilerplate hashes (loaded once, refreshed by reload())."""
+        if self._known is None:
+            self._known = frozenset(
+                h for (h,) in self._connection().execute(
+                    "SELECT hash FROM units WHERE docs >= ?", (self.threshold(),)
+                )
+            )
+
+        return self._known
+
+    def reload(self):
+        self._known = None
+        self._fingerprint = None
+
+    def fingerprint(self) -> str:
+        """Identifies the current snapshot (for cache keys)."""
+        if self._fingerprint is None:
+            # salted: snapshots from before protected units were kept differ
+            digest = hashlib.sha256(b"protected")
+            for h in sorted(self.known()):
+                digest.update(h.to_bytes(8, "big", signed=True))
+            self._fingerprint = digest.hexdigest()[:16]
+
+        return self._fingerprint
+
+    def strip(self, text: str) -> tuple:
+        """
+        Remove boilerplate units from text. Returns (text, info),
+        info holding units (checked), removed and chars (removed).
+        Text without boilerplate comes back unchanged. Protected
+        units (see is_protected) are kept even when known.
+        """
+        known = self.known()
+        counts = self.stats_counts
+        counts["emails"] += 1
+        info = {"units": 0, "removed": 0, "chars": 0}
+
+        if not known:
+            return text, info
+
+        lines = text.replace("\r", "").split("\n")
+        subject = [line for line in lines[:3] if line.lower().lstrip().startswith("subject:")]
+
+        paragraphs = {}
+        removed = 0
+        removed_chars = 0
+
+        for p, unit, joiner in iter_units(text):
+            info["units"] += 1
+
+            if unit_hash(unit, self.min_words) in known and not is_protected(unit):
+                removed += 1
+                removed_chars += len(unit)
+                continue
+
+            paragraphs.setdefault(p, (joiner, []))[1].append(unit)
+
+        counts["units"] += info["units"]
+
+        if not removed:
+            return text, info
+
+        info["removed"] = removed
+        info["chars"] = removed_chars
+
+        counts["emails_with_hits"] += 1
+        counts["units_removed"] += removed
+        counts["chars_removed"] += removed_chars
+
+        body = "\n\n".join(joiner.join(units) for _, (joiner, units) in sorted(paragraphs.items()))
+        stripped = "\n\n".join(subject + [body]) if subject else body
+
+        return stripped, info
+
+    def stats(self) -> dict:
+        counts = dict(self.stats_counts)
+        counts["email_hit_rate"] = counts["emails_with_hits"] / counts["emails"] if counts["emails"] else 0.0
+        counts["unit_hit_rate"] = counts["units_removed"] / counts["units"] if counts["units"] else 0.0
+        counts["boilerplate_units"] = len(self.known())
+        return counts
+
+    def top(self, n: int = 20) -> list:
+        """Most widespread units, with how many emails carry them."""
+        return self._connection().execute(
+            "SELECT docs, sample FROM units ORDER BY docs DESC LIMIT ?", (n,)
+        ).fetchall()
+
+    def close(self):
+        self._db.close()
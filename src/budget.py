@@ -0,0 +1,75 @@
+"""
+Latency budgets for BART generation.
+
+Decoding cost is tracked as an EWMA of seconds per decoding step
+(one step = one output token for every row of the batch), per beam
+width, measured on real generate() calls. Given the time left, the
+planner picks the most faithful decoding setting expected to fit:
+
+    "beam"          2 beams, output 0.9×–1.2× the input
+    "greedy"        1 beam,  same lengths
+    "greedy_short"  1 beam,  output 0.5×–1.0× the input
+
+If none fits, generation is skipped. A stopping criterion also
+enforces the deadline inside generate(); a rewrite cut off that
+way is discarded and the extractive summary is used instead.
+"""
+import time
+
+DECODING_PLANS = (
+    {"path": "beam", "num_beams": 2, "min_scale": 0.9, "max_scale": 1.2},
+    {"path": "greedy", "num_beams": 1, "min_scale": 0.9, "max_scale": 1.2},
+    {"path": "greedy_short", "num_beams": 1, "min_scale": 0.5, "max_scale": 1.0}
+)
+
+# CPU bart-large priors until the first generate() call is measured
+_step_seconds = {1: 0.02, 2: 0.035}
+
+def step_seconds(num_beams: int) -> float:
+    return _step_seconds.get(num_beams, _step_seconds[2] * num_beams / 2)
+
+def observe(num_beams: int, seconds: float, steps: int, alpha: float = 0.3):
+    """Fold a measured generate() call into the per-step estimate."""
+    if steps <= 0:
+        return
+
+    rate = seconds / steps
+    previous = _step_seconds.get(num_beams)
+    _step_seconds[num_beams] = rate if previous is None else previous + alpha * (rate - previous)
+
+def plan(input_len: int, remaining: float, max_beams: int = 2):
+    """
+    The first plan (most faithful first) whose estimated time fits
+    remaining seconds, with its min/max lengths filled in; None if
+    even the cheapest one does not fit.
+    """
+    for candidate in DECODING_PLANS:
+        if candidate["num_beams"] > max_beams:
+            continue
+
+        min_len = int(input_len * candidate["min_scale"])
+        max_len = int(input_len * candidate["max_scale"])
+        estimate = max_len * step_seconds(candidate["num_beams"])
+
+        if estimate <= remaining:
+            return dict(candidate, min_length=min_len, max_length=max_len, estimate=estimate)
+
+    return None
+
+class DeadlineCriteria:
+    """
+    Stops generate() once time.perf_counter() passes deadline.
+    fired tells the caller the output was cut short.
+    """
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.fired = False
+
+    def __call__(self, input_ids, scores, **kwargs):
+        import torch
+
+        if time.perf_counter() >= self.deadline:
+            self.fired = True
+
+        return torch.full((input_ids.shape[0],), self.fired, dtype=torch.bool, device=input_ids.device)
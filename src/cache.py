@@ -0,0 +1,268 @@
+"""
+Content-addressed on-disk cache for pipeline stage outputs.
+
+Entries are keyed by a hash of the stage name, its exact inputs,
+its parameters and the model versions, so re-sent and
+re-processed emails skip straight to the stored result. Backed by
+SQLite in WAL mode, which makes it safe to share between many
+worker processes; eviction is least-recently-used once the stored
+payload exceeds max_bytes. Lookups only read; their access times
+and hit / miss counts are written in batches (with the next put, or
+every flush_every lookups), so workers do not queue on the write
+lock to read.
+"""
+import hashlib
+import json
+import os
+import time
+
+from src import models
+from src.sqlite_util import ProcessConnection
+
+# Bump when a stage's logic changes in a way that alters its output.
+CACHE_VERSION = 5
+
+MODEL_VERSIONS = {
+    "cache": CACHE_VERSION,
+    "spacy": models.SPACY_MODEL,
+    "sentence": models.SENTENCE_MODEL,
+    "bart": models.BART_MODEL
+}
+
+def _versions() -> dict:
+    """MODEL_VERSIONS, plus the inference backend when it is not the default."""
+    if models.backend() == "torch":
+        return MODEL_VERSIONS
+
+    return dict(MODEL_VERSIONS, backend=models.backend())
+
+def make_key(stage: str, inputs, params: dict = None) -> str:
+    """
+    Inputs are hashed as given, never normalised: the subject and
+    signature are read from the raw text, so two texts differing
+    only in whitespace may still preprocess differently.
+    """
+    material = json.dumps(
+        {
+            "stage": stage,
+            "inputs": inputs,
+            "params": params or {},
+            "versions": _versions()
+        },
+        sort_keys=True,
+        ensure_ascii=False
+    )
+
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    stage TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    compute_seconds REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+CREATE TABLE IF NOT EXISTS stats (
+    stage TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    saved_seconds REAL NOT NULL DEFAULT 0,
+    computed_seconds REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+INSERT OR IGNORE INTO meta (name, value) VALUES ('total_bytes', 0);
+"""
+
+class ResultCache:
+
+    def __init__(self, path: str, max_bytes: int = 1 << 30, flush_every: int = 256):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self._db = ProcessConnection(path, synchronous="NORMAL")
+        self._pending_access = {}
+        self._pending_stats = {}
+        self._pending_lookups = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._connection().executescript(_SCHEMA)
+
+    # ---------- connection (one per process, fork-safe) ----------
+    def _connection(self):
+        if not self._db.is_open():
+            # a forked worker does not inherit its parent's unwritten lookups
+            self._pending_access = {}
+            self._pending_stats = {}
+            self._pending_lookups = 0
+
+        return self._db.connect()
+
+    def _record(self, conn, stage: str, column: str, seconds_column: str = None, seconds: float = 0.0):
+        conn.execute("INSERT OR IGNORE INTO stats (stage) VALUES (?)", (stage,))
+
+        if column:
+            conn.execute(f"UPDATE stats SET {column} = {column} + 1 WHERE stage = ?", (stage,))
+
+        if seconds_column:
+            conn.execute(
+                f"UPDATE stats SET {seconds_column} = {seconds_column} + ? WHERE stage = ?",
+                (seconds, stage)
+            )
+
+    def _flush(self, conn):
+        """Write pending access times and lookup counts (inside a write transaction)."""
+        if self._pending_access:
+            conn.executemany(
+                "UPDATE entries SET last_access = ? WHERE key = ?",
+                [(t, key) for key, t in self._pending_access.items()]
+            )
+            self._pending_access = {}
+
+        for stage, (hits, misses, saved) in self._pending_stats.items():
+            conn.execute("INSERT OR IGNORE INTO stats (stage) VALUES (?)", (stage,))
+            conn.execute(
+                "UPDATE stats SET hits = hits + ?, misses = misses + ?, "
+                "saved_seconds = saved_seconds + ? WHERE stage = ?",
+                (hits, misses, saved, stage)
+            )
+        self._pending_stats = {}
+        self._pending_lookups = 0
+
+    # ---------- public API ----------
+    def get(self, stage: str, key: str):
+        """Returns (found, value)."""
+        conn = self._connection()
+
+        # a plain (deferred) read: no write lock taken
+        row = conn.execute(
+            "SELECT value, compute_seconds FROM entries WHERE key = ?",
+            (key,)
+        ).fetchone()
+
+        hits, misses, saved = self._pending_stats.get(stage, (0, 0, 0.0))
+        if row is None:
+            self._pending_stats[stage] = (hits, misses + 1, saved)
+        else:
+            self._pending_stats[stage] = (hits + 1, misses, saved + row[1])
+            self._pending_access[key] = time.time()
+
+        self._pending_lookups += 1
+        if self._pending_lookups >= self.flush_every:
+            self.flush()
+
+        if row is None:
+            return False, None
+
+        return True, json.loads(row[0])
+
+    def flush(self):
+        """Write the lookups recorded since the last write."""
+        if not self._pending_stats:
+            return
+
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._flush(conn)
+
+    def put(self, stage: str, key: str, value, compute_seconds: float = 0.0):
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        conn = self._connection()
+
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+
+            old = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (key, stage, payload, size, compute_seconds, time.time())
+            )
+            conn.execute(
+                "UPDATE meta SET value = value + ? WHERE name = 'total_bytes'",
+                (size - (old[0] if old else 0),)
+            )
+            self._record(conn, stage, None, "computed_seconds", compute_seconds)
+            self._flush(conn)
+            self._evict(conn)
+
+    def get_or_compute(self, stage: str, inputs, fn, params: dict = None):
+        key = make_key(stage, inputs, params)
+
+        found, value = self.get(stage, key)
+        if found:
+            return value
+
+        start = time.perf_counter()
+        value = fn()
+        self.put(stage, key, value, time.perf_counter() - start)
+
+        return value
+
+    def _evict(self, conn):
+        """Drop least-recently-used entries until under 90% of max_bytes."""
+        total = conn.execute("SELECT value FROM meta WHERE name = 'total_bytes'").fetchone()[0]
+
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * 0.9
+        freed = 0
+
+        while total - freed > target:
+            oldest = conn.execute(
+                "SELECT key, size FROM entries ORDER BY last_access LIMIT 256"
+            ).fetchall()
+
+            if not oldest:
+                break
+
+            for key, size in oldest:
+                if total - freed <= target:
+                    break
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                freed += size
+
+        conn.execute(
+            "UPDATE meta SET value = value - ? WHERE name = 'total_bytes'",
+            (freed,)
+        )
+
+    def stats(self) -> dict:
+        """Per-stage hits, misses, hit rate and compute time saved by hits."""
+        self.flush()
+        conn = self._connection()
+        report = {}
+
+        for stage, hits, misses, saved, computed in conn.execute(
+            "SELECT stage, hits, misses, saved_seconds, computed_seconds FROM stats"
+        ):
+            lookups = hits + misses
+            report[stage] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "saved_seconds": saved,
+                "computed_seconds": computed
+            }
+
+        entries, total = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        report["_store"] = {"entries": entries, "bytes": total, "max_bytes": self.max_bytes}
+
+        return report
+
+    def close(self):
+        if self._db.is_open():
+            self.flush()
+        self._db.close()
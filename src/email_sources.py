@@ -0,0 +1,152 @@
+import json
+import logging
+import mailbox
+import os
+import time
+from email import policy
+from email.parser import BytesParser
+
+# --------------------------------------------------
+# ✅ Email message → pipeline text
+# --------------------------------------------------
+# kept for src.threads, which links replies to their parents by them
+THREAD_HEADERS = ("Message-ID", "In-Reply-To", "References")
+
+def message_to_text(msg) -> str:
+    """
+    Flatten a parsed email into the plain-text layout the
+    pipeline expects: a "Subject:" line and the threading headers
+    (preprocessing drops them), then the body.
+    """
+    subject = msg.get("Subject", "") or ""
+    headers = [
+        f"{name}: {' '.join(str(msg.get(name)).split())}"
+        for name in THREAD_HEADERS
+        if msg.get(name)
+    ]
+    body_parts = []
+
+    for part in msg.walk():
+        if part.get_content_maintype() == "multipart":
+            continue
+        if part.get_content_type() != "text/plain":
+            continue
+        if part.get_content_disposition() == "attachment":
+            continue
+
+        payload = part.get_payload(decode=True)
+        if payload is None:
+            continue
+
+        charset = part.get_content_charset() or "utf-8"
+        body_parts.append(payload.decode(charset, errors="replace"))
+
+    body = "\n".join(body_parts)
+
+    if subject:
+        headers.insert(0, f"Subject: {subject}")
+
+    if headers:
+        return "\n".join(headers) + "\n\n" + body
+
+    return body
+
+def message_id(msg, fallback: str) -> str:
+    return (msg.get("Message-ID") or "").strip() or fallback
+
+logger = logging.getLogger(__name__)
+
+# Files younger than this may still be being written (live=True)
+SETTLE_SECONDS = 5.0
+
+# --------------------------------------------------
+# ✅ Readers (each yields (email_id, text))
+# --------------------------------------------------
+def iter_directory(path: str, live: bool = False):
+    """
+    One email per file. .eml files are parsed as MIME,
+    anything else is read as plain text.
+
+    live=True: the directory may still be written to, so files
+    modified in the last SETTLE_SECONDS are left for a later run.
+    """
+    settled_before = time.time() - SETTLE_SECONDS
+
+    for name in sorted(os.listdir(path)):
+        file_path = os.path.join(path, name)
+
+        if not os.path.isfile(file_path) or name.startswith("."):
+            continue
+
+        if live and os.path.getmtime(file_path) > settled_before:
+            continue
+
+        if name.lower().endswith(".eml"):
+            with open(file_path, "rb") as f:
+                msg = BytesParser(policy=policy.default).parse(f)
+            yield message_id(msg, name), message_to_text(msg)
+        else:
+            with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+                yield name, f.read()
+
+def iter_mbox(path: str, live: bool = False):
+    """
+    live=True: the mbox may still be appended to. The message
+    index is built under the mbox lock, so a delivery in progress
+    is never read half-written; later appends are picked up next run.
+    """
+    box = mailbox.mbox(path, create=False)
+
+    try:
+        if live:
+            try:
+                box.lock()
+            except (mailbox.ExternalClashError, OSError) as exc:
+                logger.warning("could not lock %s (%s); reading unlocked", path, exc)
+                live = False
+
+        try:
+            keys = box.keys()
+        finally:
+            if live:
+                box.unlock()
+
+        for i, key in enumerate(keys):
+            msg = box[key]
+            yield message_id(msg, f"{os.path.basename(path)}#{i}"), message_to_text(msg)
+    finally:
+        box.close()
+
+def iter_jsonl(path: str, live: bool = False):
+    """
+    One JSON object per line with a "text" field
+    and an optional "id" field.
+
+    live=True: an unterminated last line is still being written
+    and is skipped.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if live and not line.endswith("\n"):
+                break
+
+            line = line.strip()
+            if not line:
+                continue
+
+            record = json.loads(line)
+            yield str(record.get("id", line_no)), record["text"]
+
+def iter_emails(path: str, live: bool = False):
+    """
+    Pick a reader from the path: a directory, a .jsonl file,
+    or anything else is treated as an mbox file.
+    live=True: other processes may still be writing to path.
+    """
+    if os.path.isdir(path):
+        return iter_directory(path, live)
+
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        return iter_jsonl(path, live)
+
+    return iter_mbox(path, live)
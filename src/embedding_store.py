@@ -0,0 +1,310 @@
+"""
+Persistent sentence-embedding store.
+
+Templates, signatures and quoted replies repeat across a mailbox,
+so the same source sentences are encoded by MiniLM again and again.
+The store keeps every encoded sentence as a float32 row in an
+append-only file that readers memory-map (pages are shared between
+worker processes, nothing is copied), and an SQLite index mapping
+the hash of the whitespace-normalised sentence to its row.
+
+Appends are serialised by the index's write transaction: rows are
+written past the last committed row and become visible when the
+index commit lands, so a crashed writer leaves only unreferenced
+bytes that the next append overwrites.
+
+Vectors belong to one model version (model name and inference
+backend); on a mismatch the store starts over. Past max_rows it is
+compacted into a new vectors file keeping the most used rows.
+"""
+import os
+import re
+import threading
+
+import numpy as np
+
+from src import models
+from src.sqlite_util import ProcessConnection, hash64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (
+    hash INTEGER PRIMARY KEY,
+    row INTEGER NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+def model_version() -> str:
+    return f"{models.SENTENCE_MODEL}:{models.backend()}"
+
+def sentence_hash(sentence: str) -> int:
+    material = re.sub(r"\s+", " ", sentence).strip()
+    return hash64(material)
+
+class EmbeddingStore:
+
+    def __init__(self, directory: str, max_rows: int = 1_000_000):
+        self.directory = directory
+        self.max_rows = max_rows
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # the service's model thread is not the thread that opened it
+        self._db = ProcessConnection(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self._generation = None
+        self._dim = None
+        self._vectors = None
+        self._pending_hits = {}
+
+        self.lookups = 0
+        self.hits = 0
+
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        if not self._db.is_open():
+            # a new process maps the vectors afresh
+            self._vectors = None
+
+        return self._db.connect()
+
+    def _meta(self, conn) -> dict:
+        return dict(conn.execute("SELECT key, value FROM meta"))
+
+    def _vectors_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"vectors.{generation}.f32")
+
+    # ---------- version / generation ----------
+    def _follow(self, meta: dict):
+        """Follow resets and compactions made by other processes."""
+        generation = int(meta["generation"])
+        if generation != self._generation:
+            self._generation = generation
+            self._vectors = None
+        self._dim = int(meta["dim"]) if meta["dim"] else None
+
+    def _reset(self, conn, version: str):
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            meta = self._meta(conn)
+            # another process may have reset it meanwhile
+            if meta.get("version") == version:
+                return
+
+            generation = int(meta.get("generation", 0)) + 1
+            conn.execute("DELETE FROM rows")
+            conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                ("version", version),
+                ("generation", str(generation)),
+                ("dim", ""),
+                ("count", "0")
+            ])
+            open(self._vectors_path(generation), "wb").close()
+
+        self._retire(generation)
+
+    def _retire(self, generation: int):
+        """
+        Drop files older than the previous generation. The previous
+        one is kept, so a reader whose snapshot predates the switch
+        can still map it.
+        """
+        for name in os.listdir(self.directory):
+            match = re.fullmatch(r"vectors\.(\d+)\.f32", name)
+            if match and int(match.group(1)) < generation - 1:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def _map(self, needed_rows: int):
+        """Memory-map the vectors file, re-mapping once it has grown past what is mapped."""
+        if self._vectors is not None and len(self._vectors) >= needed_rows:
+            return self._vectors
+
+        path = self._vectors_path(self._generation)
+        rows = os.path.getsize(path) // (self._dim * 4)
+        self._vectors = np.memmap(path, dtype=np.float32, mode="r", shape=(rows, self._dim)) if rows else None
+
+        return self._vectors
+
+    # ---------- lookup / append ----------
+    def encode(self, sentences: list, encode_fn) -> np.ndarray:
+        """
+        Vectors for sentences: stored ones are read from the map,
+        the rest are encoded with encode_fn(list) in one call and
+        appended. Returns a (len(sentences), dim) float32 array.
+        """
+        with self._lock:
+            conn = self._connection()
+
+            if self._meta(conn).get("version") != model_version():
+                self._reset(conn, model_version())
+
+            hashes = [sentence_hash(s) for s in sentences]
+            vectors = {}
+
+            # meta and rows from one snapshot, so row numbers match the generation
+            conn.execute("BEGIN")
+            try:
+                self._follow(self._meta(conn))
+                found = self._rows(conn, set(hashes))
+
+                if found:
+                    stored = list(found.items())
+                    mapped = self._map(max(found.values()) + 1)
+                    rows = mapped[[row for _, row in stored]]
+                    vectors = {h: rows[i] for i, (h, _) in enumerate(stored)}
+            finally:
+                conn.execute("COMMIT")
+
+            self.lookups += len(sentences)
+            self.hits += sum(h in found for h in hashes)
+            for h in found:
+                self._pending_hits[h] = self._pending_hits.get(h, 0) + 1
+
+            misses = {}
+            for sentence, h in zip(sentences, hashes):
+                if h not in vectors:
+                    misses.setdefault(h, sentence)
+
+            if misses:
+                encoded = np.asarray(encode_fn(list(misses.values())), dtype=np.float32)
+                encoded = dict(zip(misses, encoded))
+                vectors.update(encoded)
+                self._append(conn, encoded)
+            elif len(self._pending_hits) >= 10_000:
+                self._append(conn, {})
+
+            if not sentences:
+                return np.zeros((0, self._dim or 0), dtype=np.float32)
+
+            return np.stack([vectors[h] for h in hashes])
+
+    def _rows(self, conn, hashes: set) -> dict:
+        found = {}
+        hashes = list(hashes)
+
+        for i in range(0, len(hashes), 500):
+            part = hashes[i:i + 500]
+            found.update(conn.execute(
+                f"SELECT hash, row FROM rows WHERE hash IN ({','.join('?' * len(part))})",
+                part
+            ))
+
+        return found
+
+    def _append(self, conn, encoded: dict):
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            meta = self._meta(conn)
+
+            if meta.get("version") != model_version() or int(meta["generation"]) != self._generation:
+                # reset or compacted by another process meanwhile; the next call follows it
+                return
+
+            # hashes stored meanwhile by others are skipped
+            fresh = [h for h in encoded if h not in self._rows(conn, set(encoded))]
+            count = int(meta["count"])
+
+            if fresh:
+                dim = len(encoded[fresh[0]])
+                if not meta["dim"]:
+                    conn.execute("UPDATE meta SET value = ? WHERE key = 'dim'", (str(dim),))
+                    self._dim = dim
+
+                block = np.stack([encoded[h] for h in fresh]).astype(np.float32)
+                fd = os.open(self._vectors_path(self._generation), os.O_WRONLY)
+                try:
+                    os.pwrite(fd, block.tobytes(), count * dim * 4)
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+
+                conn.executemany(
+                    "INSERT INTO rows (hash, row) VALUES (?, ?)",
+                    [(h, count + i) for i, h in enumerate(fresh)]
+                )
+                count += len(fresh)
+                conn.execute("UPDATE meta SET value = ? WHERE key = 'count'", (str(count),))
+
+            if self._pending_hits:
+                conn.executemany(
+                    "UPDATE rows SET hits = hits + ? WHERE hash = ?",
+                    [(n, h) for h, n in self._pending_hits.items()]
+                )
+                self._pending_hits = {}
+
+            if count > self.max_rows:
+                self._compact(conn, meta, count)
+
+    def _compact(self, conn, meta: dict, count: int):
+        """Copy the most used rows (a quarter below max_rows, for headroom) into a new file."""
+        keep = [
+            (h, row) for h, row in conn.execute(
+                "SELECT hash, row FROM rows ORDER BY hits DESC, row DESC LIMIT ?",
+                (self.max_rows * 3 // 4,)
+            )
+        ]
+        keep.sort(key=lambda item: item[1])
+
+        old = self._generation
+        generation = old + 1
+        vectors = np.memmap(self._vectors_path(old), dtype=np.float32, mode="r", shape=(count, self._dim))
+
+        with open(self._vectors_path(generation), "wb") as f:
+            for i in range(0, len(keep), 10_000):
+                rows = [row for _, row in keep[i:i + 10_000]]
+                f.write(np.ascontiguousarray(vectors[rows]).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        del vectors
+        conn.execute("DELETE FROM rows WHERE hash NOT IN (SELECT hash FROM rows ORDER BY hits DESC, row DESC LIMIT ?)",
+                     (self.max_rows * 3 // 4,))
+        conn.executemany("UPDATE rows SET row = ?, hits = 0 WHERE hash = ?",
+                         [(i, h) for i, (h, _) in enumerate(keep)])
+        conn.executemany("UPDATE meta SET value = ? WHERE key = ?", [
+            (str(generation), "generation"),
+            (str(len(keep)), "count")
+        ])
+
+        self._generation = generation
+        self._vectors = None
+        self._retire(generation)
+
+    def compact(self):
+        """Compact now (e.g. from a maintenance job), whatever the size."""
+        with self._lock:
+            conn = self._connection()
+
+            if self._meta(conn).get("version") != model_version():
+                self._reset(conn, model_version())
+
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                meta = self._meta(conn)
+                self._follow(meta)
+                if self._dim:
+                    self._compact(conn, meta, int(meta["count"]))
+
+    def stats(self) -> dict:
+        with self._lock:
+            meta = self._meta(self._connection())
+
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "rows": int(meta.get("count", 0)),
+            "max_rows": self.max_rows,
+            "version": meta.get("version")
+        }
+
+    def close(self):
+        self._db.close()
+        self._vectors = None
@@ -0,0 +1,135 @@
+"""
+Multi-pattern entity matcher.
+
+Fact retention, missing-entity injection and the near-duplicate
+check all ask whether an email's entity values occur in some text,
+comparing punctuation- and case-free forms ("$5,000" matches
+"5000"). EntityMatcher normalises every value once and compiles
+them into an Aho-Corasick automaton, so one scan over a text (or
+over a list of sentences) finds every value it contains.
+
+matcher_for() keeps the matchers of recent entity dicts, so the
+stages of one email share a single build.
+"""
+from collections import deque
+from functools import lru_cache
+
+from src.rules import normalize
+
+class EntityMatcher:
+
+    def __init__(self, entities: dict):
+        # (label, value, normalised value), in the dict's order
+        self.values = [
+            (label, value, normalize(value))
+            for label, values in entities.items()
+            for value in values
+        ]
+        self.patterns = list(dict.fromkeys(norm for _, _, norm in self.values if norm))
+        self._build()
+
+    # ---------- automaton ----------
+    def _build(self):
+        goto = [{}]
+        out = [[]]
+
+        for pid, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(pid)
+
+        # breadth first, so a state's fail target is final before it is used;
+        # the root's children fail to the root
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+
+                # a match here also ends every pattern matched at the fail state
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def _scan(self, norm: str, found: set):
+        """Add the ids of patterns occurring in a normalised text to found."""
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        root = goto[0]
+        wanted = len(self.patterns)
+        state = 0
+
+        for ch in norm:
+            # most characters start no pattern: stay at the root cheaply
+            if not state:
+                state = root.get(ch, 0)
+                if not state:
+                    continue
+            else:
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+
+            if out[state]:
+                found.update(out[state])
+                if len(found) == wanted:
+                    return
+
+    # ---------- queries ----------
+    def present(self, text: str) -> set:
+        """Normalised values occurring in text ("" always does)."""
+        found = set()
+        if self.patterns:
+            self._scan(normalize(text), found)
+
+        return {self.patterns[pid] for pid in found} | {""}
+
+    def retention(self, text: str) -> float:
+        """Share of the values occurring in text (1.0 without values)."""
+        if not self.values:
+            return 1.0
+
+        present = self.present(text)
+        return sum(norm in present for _, _, norm in self.values) / len(self.values)
+
+    def locate(self, sentences: list) -> dict:
+        """Normalised value → indices of the sentences containing it, in order."""
+        where = {}
+
+        for i, sent in enumerate(sentences):
+            found = set()
+            self._scan(normalize(sent), found)
+
+            for pid in found:
+                where.setdefault(self.patterns[pid], []).append(i)
+
+        return where
+
+def _entities_key(entities: dict) -> tuple:
+    return tuple((label, tuple(values)) for label, values in entities.items())
+
+@lru_cache(maxsize=256)
+def _cached_matcher(key: tuple) -> EntityMatcher:
+    return EntityMatcher(dict(key))
+
+def matcher_for(entities: dict) -> EntityMatcher:
+    """Shared matcher for an entity dict (built once per distinct dict)."""
+    return _cached_matcher(_entities_key(entities))
@@ -1,36 +1,18 @@
-import re
+from src.entity_matcher import matcher_for
+from src.rules import SUMMARY_SPLIT_RE
 
 # --------------------------------------------------
 # ✅ METRIC 1 — FACT RETENTION SCORE
 # --------------------------------------------------
-import re
-
-def normalize(text):
-    """Removes punctuation & spaces for robust matching"""
-    return re.sub(r'[^a-z0-9]', '', text.lower())
 
 def fact_retention_score(entities: dict, generated: str):
     """
     Measures how many extracted entities appear in the final summary.
     More robust to formatting & punctuation differences.
+    The email's entity values are normalised and compiled once
+    (src.entity_matcher) and reused by every call.
     """
-
-    total = 0
-    found = 0
-
-    gen_norm = normalize(generated)
-
-    for key, values in entities.items():
-        for v in values:
-            total += 1
-
-            if normalize(v) in gen_norm:
-                found += 1
-
-    if total == 0:
-        return 1.0
-
-    return found / total
+    return matcher_for(entities).retention(generated)
 
 # --------------------------------------------------
 # ✅ METRIC 2 — COMPRESSION RATIO
@@ -50,7 +32,7 @@ def compression_ratio(original: str, summary: str):
 def coverage_score(extractive: str, abstractive: str):
     ext_sents = [
         s.strip().lower()
-        for s in re.split(r'[.!?]\s+', extractive)
+        for s in SUMMARY_SPLIT_RE.split(extractive)
         if s.strip()
     ]
 
@@ -77,6 +59,31 @@ def coverage_score(extractive: str, abstractive: str):
 
     return matched / len(ext_sents)
 
+# --------------------------------------------------
+# ✅ ALL METRICS: BASELINE vs PIPELINE
+# --------------------------------------------------
+def compute_metrics(original,
+                    extractive_summary,
+                    pipeline_summary,
+                    entities):
+    """
+    Same numbers print_comparison shows, as a plain dict
+    (JSON-friendly, used by the batch runner).
+    """
+
+    return {
+        "baseline": {
+            "fact_retention": fact_retention_score(entities, extractive_summary),
+            "compression": compression_ratio(original, extractive_summary),
+            "coverage": 1.0   # extractive covers itself
+        },
+        "pipeline": {
+            "fact_retention": fact_retention_score(entities, pipeline_summary),
+            "compression": compression_ratio(original, pipeline_summary),
+            "coverage": coverage_score(extractive_summary, pipeline_summary)
+        }
+    }
+
 # --------------------------------------------------
 # ✅ COMPARISON: BASELINE vs PIPELINE
 # --------------------------------------------------
@@ -87,15 +94,20 @@ def print_comparison(original,
 
     print("\n📊 BASELINE vs PIPELINE EVALUATION\n")
 
+    metrics = compute_metrics(original,
+                              extractive_summary,
+                              pipeline_summary,
+                              entities)
+
     # ----- Baseline (Extractive Only)
-    base_fact = fact_retention_score(entities, extractive_summary)
-    base_comp = compression_ratio(original, extractive_summary)
-    base_cov = 1.0   # extractive covers itself
+    base_fact = metrics["baseline"]["fact_retention"]
+    base_comp = metrics["baseline"]["compression"]
+    base_cov = metrics["baseline"]["coverage"]
 
     # ----- Pipeline (Final Output)
-    pipe_fact = fact_retention_score(entities, pipeline_summary)
-    pipe_comp = compression_ratio(original, pipeline_summary)
-    pipe_cov = coverage_score(extractive_summary, pipeline_summary)
+    pipe_fact = metrics["pipeline"]["fact_retention"]
+    pipe_comp = metrics["pipeline"]["compression"]
+    pipe_cov = metrics["pipeline"]["coverage"]
 
     print("🔹 BASELINE (Extractive Only)")
     print(f"✔ Fact Retention Score : {base_fact:.2f}")
@@ -1,13 +1,31 @@
 import numpy as np
-import networkx as nx
-import spacy
 
-nlp = spacy.load("en_core_web_sm")
+from src.models import get_nlp, spacy_disable
+from src.ranking import rank
+from src.rules import sentence_features
+from src import profiling
+
+# Lemmas that mark an action item (boost / mandatory detection)
+BOOST_ACTION_VERBS = ["review", "complete", "send", "prepare", "approve", "submit"]
+
+ACTION_VERBS = [
+    "review", "complete", "send", "prepare",
+    "approve", "submit", "confirm", "provide",
+    "ensure", "kindly", "please", "must", "required"
+]
+
+def _parse(sentence: str):
+    profiling.count("spacy_parses")
+    return get_nlp()(sentence, disable=spacy_disable("extractive"))
+
+def _parse_many(sentences: list):
+    profiling.count("spacy_parses", len(sentences))
+    return get_nlp().pipe(sentences, disable=spacy_disable("extractive"))
 
 # ---------- Sentence Similarity ----------
 def sentence_similarity(sent1: str, sent2: str) -> float:
-    doc1 = nlp(sent1)
-    doc2 = nlp(sent2)
+    doc1 = _parse(sent1)
+    doc2 = _parse(sent2)
 
     vec1 = doc1.vector
     vec2 = doc2.vector
@@ -17,130 +35,207 @@ def sentence_similarity(sent1: str, sent2: str) -> float:
 
     return float(np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2)))
 
-# ---------- Similarity Matrix ----------
-def build_similarity_matrix(sentences: list) -> np.ndarray:
-    size = len(sentences)
-    sim_matrix = np.zeros((size, size))
+# ---------- Sentence Vectors ----------
+def sentence_vectors(sentences: list) -> np.ndarray:
+    """
+    Parse every sentence exactly once and stack
+    their vectors into a (n, dim) float array.
+    """
+    docs = list(_parse_many(sentences))
+
+    if not docs:
+        return np.zeros((0, 0))
+
+    return np.vstack([doc.vector for doc in docs]).astype(np.float64)
+
+# ---------- Cosine Matrix ----------
+@profiling.timed("similarity_matrix")
+def cosine_similarity_matrix(vectors: np.ndarray) -> np.ndarray:
+    """
+    All pairwise cosines from one matrix product.
+    Zero-norm rows get similarity 0 with everything,
+    and the diagonal is zeroed (no self-loops).
+    """
+    size = vectors.shape[0]
+
+    if size == 0:
+        return np.zeros((0, 0))
+
+    norms = np.linalg.norm(vectors, axis=1)
+    nonzero = norms > 0
+
+    unit = np.zeros_like(vectors)
+    unit[nonzero] = vectors[nonzero] / norms[nonzero, None]
 
-    for i in range(size):
-        for j in range(size):
-            if i != j:
-                sim_matrix[i][j] = sentence_similarity(sentences[i], sentences[j])
+    sim_matrix = unit @ unit.T
+    np.fill_diagonal(sim_matrix, 0.0)
 
     return sim_matrix
 
+# ---------- Sentence Analysis ----------
+def _sentence_record(sentence: str, span) -> dict:
+    return {
+        "text": sentence,
+        "span": span,
+        "lemmas": [token.lemma_.lower() for token in span],
+        "ents": [(ent.text, ent.label_) for ent in span.ents],
+        "vector": span.vector
+    }
+
+def analyze_sentence(sentence: str) -> dict:
+    return _sentence_record(sentence, _parse(sentence)[:])
+
+@profiling.timed("sentence_analysis")
+def analyze_sentences(sentences: list, doc=None) -> dict:
+    """
+    Parse an email's sentences once and keep everything
+    the heuristics need (span, lemmas, entities, vector).
+
+    If the preprocessing Doc is given, sentences are located
+    in it and sliced out instead of being parsed again; only
+    sentences that cannot be located are parsed on their own.
+
+    Returns {sentence: record}.
+    """
+    analysis = {}
+    missing = []
+    cursor = 0
+
+    for sent in sentences:
+        if sent in analysis:
+            continue
+
+        span = None
+
+        if doc is not None:
+            start = doc.text.find(sent, cursor)
+            if start < 0:
+                start = doc.text.find(sent)
+
+            if start >= 0:
+                end = start + len(sent)
+                span = doc.char_span(start, end, alignment_mode="expand")
+                cursor = end
+
+        if span is None or len(span) == 0:
+            missing.append(sent)
+            continue
+
+        analysis[sent] = _sentence_record(sent, span)
+
+    for sent, sent_doc in zip(missing, _parse_many(missing)):
+        analysis[sent] = _sentence_record(sent, sent_doc[:])
+
+    return analysis
+
+# ---------- Similarity Matrix ----------
+def build_similarity_matrix(sentences: list) -> np.ndarray:
+    return cosine_similarity_matrix(sentence_vectors(sentences))
+
 # ---------- Information Boost ----------
-def information_boost(sentence: str) -> float:
-    doc = nlp(sentence)
+@profiling.timed("information_boost")
+def information_boost(sentence: str, record: dict = None) -> float:
+    if record is None:
+        record = analyze_sentence(sentence)
+
     boost = 0.0
 
     # Named Entity Boost
-    for ent in doc.ents:
-        if ent.label_ in ["DATE", "TIME"]:
+    for _, label in record["ents"]:
+        if label in ["DATE", "TIME"]:
             boost += 0.3
-        elif ent.label_ == "MONEY":
+        elif label == "MONEY":
             boost += 0.3
-        elif ent.label_ in ["GPE", "ORG"]:
+        elif label in ["GPE", "ORG"]:
             boost += 0.3
 
     # Keyword Boost
-    keywords = [
-        "deadline", "due", "meeting", "schedule",
-        "submit", "payment", "budget", "action",
-        "required", "please", "kindly", "confirm"
-    ]
-    deadline_words = ["by", "before", "due", "deadline"]
-
-    for word in deadline_words:
-        if word in sentence.lower():
-           boost += 0.30
-
-    location_patterns = [" at ", " in "]
-
-    for pattern in location_patterns:
-        if pattern in sentence.lower():
-            boost += 0.30
-
-    for word in keywords:
-        if word in sentence.lower():
-            boost += 0.1
+    boost += keyword_boost(sentence)
 
     # Action Verb Boost
-    action_verbs = ["review", "complete", "send", "prepare", "approve","submit"]
-
-    for token in doc:
-        if token.lemma_.lower() in action_verbs:
+    for lemma in record["lemmas"]:
+        if lemma in BOOST_ACTION_VERBS:
             boost += 0.15
 
     return boost
 
-# ---------- Action Sentence Detector ----------
-def is_action_sentence(sentence: str) -> bool:
-    doc = nlp(sentence)
+# ---------- Keyword Boost (text only, no parse) ----------
+def keyword_boost(sentence: str) -> float:
+    """Deadline words, location markers and keywords (see src.rules.KEYWORD_WEIGHTS)."""
+    return sentence_features(sentence)["keyword_boost"]
 
-    action_verbs = [
-        "review", "complete", "send", "prepare",
-        "approve", "submit", "confirm", "provide",
-        "ensure", "kindly", "please","must","required"
-    ]
+# ---------- Action Sentence Detector ----------
+def is_action_sentence(sentence: str, record: dict = None) -> bool:
+    if record is None:
+        record = analyze_sentence(sentence)
 
-    for token in doc:
-        if token.lemma_.lower() in action_verbs:
+    for lemma in record["lemmas"]:
+        if lemma in ACTION_VERBS:
             return True
 
     return False
 
 
     # ---------- Mandatory Info Detector ----------
-def is_mandatory_sentence(sentence: str) -> bool:
-    doc = nlp(sentence)
+def is_mandatory_sentence(sentence: str, record: dict = None) -> bool:
+    if record is None:
+        record = analyze_sentence(sentence)
 
     # 🔹 1. Factual Entities (Date / Time / Money)
-    for ent in doc.ents:
-        if ent.label_ in ["DATE", "TIME", "MONEY"]:
+    for _, label in record["ents"]:
+        if label in ["DATE", "TIME", "MONEY"]:
             return True
 
     # 🔹 2. Action Sentences
-    if is_action_sentence(sentence):
+    if is_action_sentence(sentence, record):
         return True
 
     # 🔹 3. Critical Keywords
-    critical_patterns = [
-        "meeting details",
-        "date:",
-        "time:",
-        "budget",
-        "cost",
-        "$",
-        "am",
-        "pm",
-        "ist",
-        "deadline",
-        "submit",
-        "presentation"
-    ]
-
-    s = sentence.lower()
-    for p in critical_patterns:
-        if p in s:
-            return True
+    return has_critical_keyword(sentence)
 
-    return False
+# ---------- Critical Keywords (text only, no parse) ----------
+def has_critical_keyword(sentence: str) -> bool:
+    """Any of src.rules.CRITICAL_KEYWORDS, as a substring."""
+    return sentence_features(sentence)["critical_keyword"]
 
 
 
 # ---------- TextRank Extractive Summariser ----------
-def extractive_summarize(sentences: list, top_n: int = 3) -> str:
+@profiling.timed("extractive")
+def extractive_summarize(sentences: list,
+                         top_n: int = 3,
+                         doc=None,
+                         top_k: int = None,
+                         threshold: float = None,
+                         mode: str = "spacy") -> str:
+    """
+    top_k / threshold prune the sentence graph before PageRank
+    (each sentence keeps its top_k neighbours / edges >= threshold);
+    by default the full dense graph is ranked.
+
+    mode="fast" uses the parse-free scorer in src.fast_extractive
+    (hashed TF-IDF + regex cues) instead of spaCy.
+    """
+    if mode == "fast":
+        from src.fast_extractive import fast_extractive_summarize
+
+        return fast_extractive_summarize(sentences, top_n, top_k, threshold)
+
+    if mode != "spacy":
+        raise ValueError(f"unknown extractive mode: {mode}")
 
     if len(sentences) <= top_n:
         return " ".join(sentences)
 
+    # One parse per sentence (or none, if the preprocessing Doc is reused)
+    analysis = analyze_sentences(sentences, doc)
+
     # ---------- STEP 1: Collect mandatory sentences ----------
     mandatory = []
     remaining = []
 
     for s in sentences:
-        if is_mandatory_sentence(s):
+        if is_mandatory_sentence(s, analysis[s]):
             mandatory.append(s)
         else:
             remaining.append(s)
@@ -150,14 +245,10 @@ def extractive_summarize(sentences: list, top_n: int = 3) -> str:
         return " ".join(mandatory[:top_n])
 
     # ---------- STEP 2: Rank remaining sentences ----------
-    sim_matrix = build_similarity_matrix(remaining)
+    vectors = np.vstack([analysis[s]["vector"] for s in remaining]).astype(np.float64)
+    sim_matrix = cosine_similarity_matrix(vectors)
 
-    for i, sentence in enumerate(remaining):
-        base_score = scores[i]
-
-
-    graph = nx.from_numpy_array(sim_matrix)
-    scores = nx.pagerank(graph)
+    scores = rank(sim_matrix, top_k=top_k, threshold=threshold)
 
     ranked_sentences = []
 
@@ -165,7 +256,7 @@ def extractive_summarize(sentences: list, top_n: int = 3) -> str:
 
     for i, sentence in enumerate(remaining):
         base_score = scores[i]
-        boost = information_boost(sentence)
+        boost = information_boost(sentence, analysis[sentence])
         final_score = base_score + boost
         ranked_sentences.append((final_score, sentence))
 
@@ -176,8 +267,10 @@ def extractive_summarize(sentences: list, top_n: int = 3) -> str:
     needed = top_n - len(mandatory)
     selected = [s for (_, s) in ranked_sentences[:needed]]
 
-    final_summary = []
+    return assemble_summary(sentences, mandatory, selected)
 
+# ---------- Final Summary (original sentence order) ----------
+def assemble_summary(sentences: list, mandatory: list, selected: list) -> str:
     final_summary = []
     added = set()
 
@@ -186,6 +279,4 @@ def extractive_summarize(sentences: list, top_n: int = 3) -> str:
             final_summary.append(s)
             added.add(s)
 
-
-
     return " ".join(final_summary)
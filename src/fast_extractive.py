@@ -0,0 +1,146 @@
+"""
+Parse-free extractive scorer for triage workloads
+(notifications, search previews).
+
+Same selection logic as extractive_summarize, but no spaCy:
+sentence similarity comes from a hashed TF-IDF matrix, the
+entity and lemma signals are approximated with regexes, and the
+cue-word signals are the ones information_boost and
+is_mandatory_sentence already use. Ranking is the same PageRank.
+"""
+import re
+import zlib
+
+import numpy as np
+
+from src.extractive import (
+    ACTION_VERBS,
+    BOOST_ACTION_VERBS,
+    assemble_summary,
+    cosine_similarity_matrix,
+    has_critical_keyword,
+    keyword_boost
+)
+from src.ranking import rank
+from src import profiling
+
+HASH_DIM = 1 << 12
+
+WORD_RE = re.compile(r"[a-z0-9$]+")
+
+# ---------- Regex stand-ins for the spaCy entity labels ----------
+MONTHS = (
+    r"jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|"
+    r"aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?"
+)
+WEEKDAYS = r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|today|tomorrow"
+
+DATE_RE = re.compile(
+    rf"\b(?:(?:{MONTHS})\.?\s+\d{{1,2}}(?:st|nd|rd|th)?|\d{{1,2}}(?:st|nd|rd|th)?\s+(?:of\s+)?(?:{MONTHS})"
+    rf"|\d{{1,2}}/\d{{1,2}}(?:/\d{{2,4}})?|\d{{4}}-\d{{2}}-\d{{2}}|{WEEKDAYS}|q[1-4])\b",
+    re.IGNORECASE
+)
+TIME_RE = re.compile(r"\b\d{1,2}(?::\d{2})?\s?(?:am|pm)\b|\b\d{1,2}:\d{2}\b", re.IGNORECASE)
+MONEY_RE = re.compile(r"[$€£₹]\s?\d[\d,]*(?:\.\d+)?|\b\d[\d,]*(?:\.\d+)?\s?(?:dollars|usd|eur|inr)\b", re.IGNORECASE)
+
+# Location / organisation: "at|in|with <Capitalised Words>"
+PLACE_ORG_RE = re.compile(r"\b(?:at|in|with|from)\s+(?:the\s+)?[A-Z][\w&]*(?:\s+[A-Z][\w&]*)*")
+
+def _inflections(verbs: list) -> re.Pattern:
+    """Match the common inflected forms, standing in for lemma lookup."""
+    irregular = {"send": ["sent"]}
+    forms = set()
+
+    for verb in verbs:
+        stem = verb[:-1] if verb.endswith("e") else verb
+        forms.update([verb, verb + "s", stem + "ed", stem + "ing"])
+        if verb.endswith("t"):
+            forms.update([verb + "ted", verb + "ting"])
+        forms.update(irregular.get(verb, []))
+
+    return re.compile(r"\b(?:" + "|".join(sorted(forms, key=len, reverse=True)) + r")\b")
+
+BOOST_ACTION_RE = _inflections(BOOST_ACTION_VERBS)
+ACTION_RE = _inflections(ACTION_VERBS)
+
+# ---------- Sentence matrix ----------
+def hashed_tfidf(sentences: list, dim: int = HASH_DIM) -> np.ndarray:
+    """
+    (n, dim) TF-IDF matrix over hashed word features.
+    crc32 rather than hash() so features are stable across processes.
+    """
+    rows = []
+    cols = []
+
+    for row, sent in enumerate(sentences):
+        for word in WORD_RE.findall(sent.lower()):
+            rows.append(row)
+            cols.append(zlib.crc32(word.encode("utf-8")) % dim)
+
+    tf = np.zeros((len(sentences), dim))
+    np.add.at(tf, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1.0)
+
+    df = (tf > 0).sum(axis=0)
+    idf = np.log((1 + len(sentences)) / (1 + df)) + 1.0
+
+    return tf * idf
+
+# ---------- Signals ----------
+def fast_signals(sentence: str) -> dict:
+    """Counts that stand in for the spaCy entities and lemmas."""
+    lower = sentence.lower()
+
+    return {
+        "date_time": len(DATE_RE.findall(sentence)) + len(TIME_RE.findall(sentence)),
+        "money": len(MONEY_RE.findall(sentence)),
+        "place_org": len(PLACE_ORG_RE.findall(sentence)),
+        "boost_actions": len(BOOST_ACTION_RE.findall(lower)),
+        "is_action": ACTION_RE.search(lower) is not None
+    }
+
+def fast_information_boost(sentence: str, signals: dict) -> float:
+    boost = 0.3 * (signals["date_time"] + signals["money"] + signals["place_org"])
+    boost += keyword_boost(sentence)
+    boost += 0.15 * signals["boost_actions"]
+    return boost
+
+def fast_is_mandatory(sentence: str, signals: dict) -> bool:
+    return (
+        signals["date_time"] > 0
+        or signals["money"] > 0
+        or signals["is_action"]
+        or has_critical_keyword(sentence)
+    )
+
+# ---------- Summariser ----------
+@profiling.timed("fast_extractive")
+def fast_extractive_summarize(sentences: list,
+                              top_n: int = 3,
+                              top_k: int = None,
+                              threshold: float = None) -> str:
+
+    if len(sentences) <= top_n:
+        return " ".join(sentences)
+
+    signals = {s: fast_signals(s) for s in sentences}
+
+    mandatory = [s for s in sentences if fast_is_mandatory(s, signals[s])]
+
+    if len(mandatory) >= top_n:
+        return " ".join(mandatory[:top_n])
+
+    mandatory_set = set(mandatory)
+    remaining = [s for s in sentences if s not in mandatory_set]
+
+    sim_matrix = cosine_similarity_matrix(hashed_tfidf(remaining))
+    scores = rank(sim_matrix, top_k=top_k, threshold=threshold)
+
+    boosts = np.array([fast_information_boost(s, signals[s]) for s in remaining])
+    final_scores = scores + boosts
+
+    ranked = sorted(zip(final_scores.tolist(), remaining), reverse=True)
+
+    needed = top_n - len(mandatory)
+    selected = [s for _, s in ranked[:needed]]
+
+    return assemble_summary(sentences, mandatory, selected)
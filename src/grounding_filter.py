@@ -1,57 +1,137 @@
-from sentence_transformers import SentenceTransformer, util
-import re
-
-sim_model = SentenceTransformer('all-MiniLM-L6-v2')
-
-import re
-from sentence_transformers import SentenceTransformer, util
-
-# Load once (IMPORTANT)
-sim_model = SentenceTransformer('all-MiniLM-L6-v2')
+from functools import lru_cache
+
+import numpy as np
+
+from src.models import get_sentence_model
+from src import profiling
+from src.rules import sentence_features, split_sentences
+
+# Optional persistent embedding store (see use_embedding_store)
+_store = {"embeddings": None}
+
+def use_embedding_store(store):
+    """
+    Serve encode_sentences from a src.embedding_store.EmbeddingStore:
+    stored vectors are read back and only the misses are encoded.
+    None turns it off.
+    """
+    _store["embeddings"] = store
+    encode_source.cache_clear()
+
+def encode_sentences(sentences: list) -> np.ndarray:
+    """
+    Encode all sentences in one batched call.
+    Rows are L2-normalised, so a dot product is a cosine.
+    """
+    store = _store["embeddings"]
+
+    if store is not None:
+        return store.encode(list(sentences), _encode)
+
+    return _encode(sentences)
+
+def _encode(sentences: list) -> np.ndarray:
+    profiling.count("encode_calls")
+    profiling.count("encoded_sentences", len(sentences))
+
+    return get_sentence_model().encode(
+        list(sentences),
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
+
+@lru_cache(maxsize=64)
+def encode_source(source: str):
+    """
+    Split and encode a source email once.
+    Cached, so every grounding pass over the same
+    cleaned_text in a pipeline run reuses the embeddings.
+    """
+    src_sentences = split_sentences(source)
+
+    if not src_sentences:
+        return (), None
+
+    return tuple(src_sentences), encode_sentences(src_sentences)
 
 def contains_critical_info(sent: str) -> bool:
-    sent_lower = sent.lower()
-
-    critical_patterns = [
-        r"\$\s?\d+",                 # money
-        r"\d{1,2}:\d{2}",            # time
-        r"\b(am|pm)\b",
-        r"\b\d{1,2}(st|nd|rd|th)\b", # dates
-        r"\bbudget\b",
-        r"\bdeadline\b",
-        r"\bhall\b",
-        r"\bcampus\b",
-        r"\bconference\b"
-    ]
-
-    return any(re.search(p, sent_lower) for p in critical_patterns)
+    """Money, times, dates or critical words (see src.rules.CRITICAL_INFO_RE)."""
+    return sentence_features(sent)["critical_info"]
 
+@profiling.timed("grounding")
 def remove_ungrounded_lines(generated: str,
                             source: str,
-                            threshold: float = 0.55) -> str:
+                            threshold: float = 0.55,
+                            source_embeddings: np.ndarray = None) -> str:
+    """
+    Keep generated sentences that are close to some source
+    sentence (or carry critical info).
+
+    source_embeddings may be passed in (normalised, one row per
+    source sentence); otherwise they come from encode_source.
+    """
 
-    gen_sentences = re.split(r'(?<=[.!?])\s+|\n+', generated)
-    src_sentences = re.split(r'(?<=[.!?])\s+|\n+', source)
+    gen_sentences = split_sentences(generated)
 
-    gen_sentences = [s.strip() for s in gen_sentences if s.strip()]
-    src_sentences = [s.strip() for s in src_sentences if s.strip()]
+    if source_embeddings is None:
+        _, source_embeddings = encode_source(source)
 
-    if not gen_sentences or not src_sentences:
+    if not gen_sentences or source_embeddings is None or len(source_embeddings) == 0:
         return generated
 
-    src_embeddings = sim_model.encode(src_sentences, convert_to_tensor=True)
+    gen_embeddings = encode_sentences(gen_sentences)
+
+    return _keep_grounded(generated, gen_sentences, gen_embeddings, source_embeddings, threshold)
 
-    kept_sentences = []
+def _keep_grounded(generated: str,
+                   gen_sentences: list,
+                   gen_embeddings: np.ndarray,
+                   source_embeddings: np.ndarray,
+                   threshold: float) -> str:
 
-    for sent in gen_sentences:
-        emb = sim_model.encode(sent, convert_to_tensor=True)
-        scores = util.cos_sim(emb, src_embeddings)
+    # (n_generated, n_source) cosine matrix in one product
+    scores = gen_embeddings @ source_embeddings.T
+    best = scores.max(axis=1)
 
-        if scores.max().item() >= threshold or contains_critical_info(sent):
-            kept_sentences.append(sent)
+    kept_sentences = [
+        sent
+        for sent, score in zip(gen_sentences, best)
+        if score >= threshold or contains_critical_info(sent)
+    ]
 
     if not kept_sentences:
         return generated
 
     return " ".join(kept_sentences)
 
+@profiling.timed("grounding")
+def remove_ungrounded_lines_batch(pairs: list, threshold: float = 0.55) -> list:
+    """
+    remove_ungrounded_lines over many (generated, source) pairs,
+    with the generated sentences of all pairs encoded in one call.
+    """
+    split = [split_sentences(generated) for generated, _ in pairs]
+    sources = [encode_source(source)[1] for _, source in pairs]
+
+    flat = [
+        sent
+        for sentences, source_embeddings in zip(split, sources)
+        if source_embeddings is not None
+        for sent in sentences
+    ]
+    embeddings = encode_sentences(flat) if flat else None
+
+    results = []
+    offset = 0
+
+    for (generated, _), sentences, source_embeddings in zip(pairs, split, sources):
+        if not sentences or source_embeddings is None:
+            results.append(generated)
+            continue
+
+        rows = embeddings[offset:offset + len(sentences)]
+        offset += len(sentences)
+
+        results.append(_keep_grounded(generated, sentences, rows, source_embeddings, threshold))
+
+    return results
@@ -0,0 +1,136 @@
+"""
+Persistent manifest for incremental batch runs.
+
+Records, per email id, the hash of the content that was summarized
+and the fingerprint of the configuration (model versions, backend,
+pipeline parameters) it was summarized with. A later run only
+sends emails that are new, changed, or were processed under a
+different configuration.
+
+The output JSONL is the source of truth: an email is marked in the
+manifest only after its line has been flushed and fsynced, and on
+start-up reconcile() re-registers complete output lines the manifest
+missed (crash between write and mark) and drops a torn last line.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from src.cache import make_key
+from src.sqlite_util import ProcessConnection
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed (
+    email_id TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    config TEXT NOT NULL,
+    processed_at REAL NOT NULL
+);
+"""
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def config_fingerprint(params: dict) -> str:
+    """Changes whenever models, cache version or any given parameter change."""
+    return make_key("manifest", None, params)
+
+class Manifest:
+
+    def __init__(self, path: str):
+        self.path = path
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        # the pool's task-feeder thread reads while the driver marks
+        self._lock = threading.Lock()
+        self._db = ProcessConnection(path, check_same_thread=False)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        return self._db.connect()
+
+    def is_done(self, email_id: str, digest: str, config: str) -> bool:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT content_hash, config FROM processed WHERE email_id = ?",
+                (email_id,)
+            ).fetchone()
+
+        return row is not None and row == (digest, config)
+
+    def mark(self, entries: list, config: str):
+        """entries: (email_id, content_hash) pairs, committed together."""
+        now = time.time()
+
+        with self._lock:
+            conn = self._connection()
+
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?)",
+                    [(email_id, digest, config, now) for email_id, digest in entries]
+                )
+
+    def reconcile(self, output_path: str, config: str) -> int:
+        """
+        Truncate a torn last line off output_path and mark every
+        complete, successful line written under config.
+        Returns how many entries were (re-)marked.
+        """
+        if not os.path.exists(output_path):
+            return 0
+
+        entries = []
+
+        with open(output_path, "rb+") as f:
+            good_end = 0
+
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+
+                good_end += len(line)
+
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+
+                if "error" in record or record.get("config") != config:
+                    continue
+
+                if "content_hash" in record:
+                    entries.append((str(record["id"]), record["content_hash"]))
+
+            f.truncate(good_end)
+
+        if entries:
+            self.mark(entries, config)
+
+        return len(entries)
+
+    def iter_pending(self, emails, config: str, counts: dict):
+        """
+        Yield (email_id, text, content_hash) for the emails not yet
+        done with this content and config; the number skipped goes
+        into counts["skipped"]. The hash travels with each occurrence,
+        so an id sent twice in one run is marked with the content of
+        whichever copy its result came from.
+        """
+        for email_id, text in emails:
+            digest = content_hash(text)
+
+            if self.is_done(email_id, digest, config):
+                counts["skipped"] += 1
+                continue
+
+            yield email_id, text, digest
+
+    def close(self):
+        with self._lock:
+            self._db.close()
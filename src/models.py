@@ -0,0 +1,228 @@
+"""
+Central, lazy model registry.
+
+Every model is loaded on first use and shared by all modules,
+so importing the pipeline is cheap and an extractive-only run
+never imports transformers or loads BART.
+"""
+import os
+from functools import lru_cache
+
+SPACY_MODEL = "en_core_web_sm"
+SENTENCE_MODEL = "all-MiniLM-L6-v2"
+BART_MODEL = "facebook/bart-large-cnn"
+
+# BART is exported to ONNX once, into a directory per model name here
+ONNX_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "email-summarizer", "onnx")
+
+# Models set with override() are served instead of loading the real ones
+_overrides = {}
+
+# Inference backend for BART and MiniLM (see set_backend)
+BACKENDS = ("torch", "int8", "onnx")
+_backend = {"name": "torch", "threads": None}
+
+# spaCy components each stage can skip.
+# Preprocessing only needs NER; the extractive heuristics
+# need lemmas (tagger → attribute_ruler → lemmatizer) and
+# tok2vec vectors, but never the dependency parse.
+SPACY_DISABLE = {
+    "preprocess": ["parser", "tagger", "attribute_ruler", "lemmatizer"],
+    "extractive": ["parser"]
+}
+
+def spacy_disable(*stages) -> list:
+    """
+    Components that none of the given stages need.
+    A Doc meant to be reused by several stages must keep
+    everything any of them needs.
+    """
+    disabled = [set(SPACY_DISABLE.get(stage, [])) for stage in stages]
+
+    if not disabled:
+        return []
+
+    return sorted(set.intersection(*disabled))
+
+# --------------------------------------------------
+# ✅ Overrides (stubs for benchmarks, alternative models)
+# --------------------------------------------------
+def override(name: str, value):
+    """
+    Serve value instead of loading the real model.
+    name: "nlp", "sentence" or "bart" (a (tokenizer, model, device) tuple).
+    """
+    if name not in ("nlp", "sentence", "bart"):
+        raise ValueError(f"unknown model slot: {name}")
+
+    _overrides[name] = value
+
+def clear_overrides():
+    _overrides.clear()
+
+# --------------------------------------------------
+# ✅ Inference backend
+# --------------------------------------------------
+def set_backend(name: str = "torch", threads: int = None):
+    """
+    Choose how BART and MiniLM run on CPU:
+      "torch"  fp32 PyTorch (default)
+      "int8"   PyTorch with dynamic int8 quantisation of Linear layers
+      "onnx"   ONNX Runtime (needs optimum[onnxruntime]); BART is exported
+               on first use into ONNX_CACHE_DIR and loaded from there after
+    threads: intra-op threads for torch or the ONNX Runtime sessions.
+    Models already loaded under another backend are dropped, along
+    with the source embeddings grounding cached from them.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"unknown backend: {name} (expected one of {BACKENDS})")
+
+    if (name, threads) != (_backend["name"], _backend["threads"]):
+        from src.grounding_filter import encode_source
+
+        _load_sentence_model.cache_clear()
+        _load_bart.cache_clear()
+        # source embeddings of the old backend must not meet new ones
+        encode_source.cache_clear()
+
+    _backend["name"] = name
+    _backend["threads"] = threads
+
+    if threads and name != "onnx":
+        import torch
+
+        torch.set_num_threads(threads)
+
+def backend() -> str:
+    return _backend["name"]
+
+def _ort_session_options():
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    if _backend["threads"]:
+        options.intra_op_num_threads = _backend["threads"]
+        options.inter_op_num_threads = 1
+
+    return options
+
+def _onnx_bart_dir() -> str:
+    return os.path.join(ONNX_CACHE_DIR, BART_MODEL.replace("/", "--"))
+
+def _export_onnx_bart() -> str:
+    """Export BART once; concurrent workers wait for the first one's export."""
+    import fcntl
+
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    directory = _onnx_bart_dir()
+    done = os.path.join(directory, ".exported")
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        if not os.path.exists(done):
+            ORTModelForSeq2SeqLM.from_pretrained(BART_MODEL, export=True).save_pretrained(directory)
+            # written last: a crashed export is redone
+            open(done, "w").close()
+
+    return directory
+
+def _quantize(model):
+    import torch
+
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+# --------------------------------------------------
+# ✅ Accessors
+# --------------------------------------------------
+def get_nlp():
+    if "nlp" in _overrides:
+        return _overrides["nlp"]
+
+    return _load_nlp()
+
+def get_sentence_model():
+    if "sentence" in _overrides:
+        return _overrides["sentence"]
+
+    return _load_sentence_model()
+
+def get_bart():
+    """Returns (tokenizer, model, device)."""
+    if "bart" in _overrides:
+        return _overrides["bart"]
+
+    return _load_bart()
+
+def get_tokenizer():
+    """BART's tokenizer alone (cheap; does not load the model)."""
+    if "bart" in _overrides:
+        return _overrides["bart"][0]
+
+    return _load_tokenizer()
+
+@lru_cache(maxsize=None)
+def _load_nlp():
+    import spacy
+
+    return spacy.load(SPACY_MODEL)
+
+@lru_cache(maxsize=None)
+def _load_sentence_model():
+    from sentence_transformers import SentenceTransformer
+
+    if _backend["name"] == "onnx":
+        return SentenceTransformer(
+            SENTENCE_MODEL,
+            device="cpu",
+            backend="onnx",
+            model_kwargs={"session_options": _ort_session_options()}
+        )
+
+    if _backend["name"] == "int8":
+        return _quantize(SentenceTransformer(SENTENCE_MODEL, device="cpu"))
+
+    return SentenceTransformer(SENTENCE_MODEL)
+
+@lru_cache(maxsize=None)
+def _load_tokenizer():
+    from transformers import BartTokenizer
+
+    return BartTokenizer.from_pretrained(BART_MODEL)
+
+@lru_cache(maxsize=None)
+def _load_bart():
+    import torch
+    from transformers import BartForConditionalGeneration
+
+    tokenizer = _load_tokenizer()
+
+    if _backend["name"] == "onnx":
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+        model = ORTModelForSeq2SeqLM.from_pretrained(
+            _export_onnx_bart(),
+            session_options=_ort_session_options()
+        )
+        return tokenizer, model, torch.device("cpu")
+
+    model = BartForConditionalGeneration.from_pretrained(BART_MODEL)
+
+    if _backend["name"] == "int8":
+        # dynamic quantisation is CPU-only
+        return tokenizer, _quantize(model.eval()), torch.device("cpu")
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = model.to(device)
+
+    return tokenizer, model, device
+
+def warmup(abstractive: bool = True):
+    """Load everything a run will need up front (e.g. in a worker initializer)."""
+    get_nlp()
+
+    if abstractive:
+        get_sentence_model()
+        get_bart()
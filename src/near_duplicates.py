@@ -0,0 +1,230 @@
+"""
+Near-duplicate index for reusing summaries.
+
+Mass mailings and lightly edited resends differ by a greeting, a
+name or a line, so the exact-hash cache misses them. Each summarized
+email's cleaned_text is reduced to a MinHash signature over word
+5-gram shingles; LSH banding finds candidates in a few indexed
+lookups, and candidates are confirmed by the Jaccard estimate from
+the full signatures.
+
+The index is SQLite in WAL mode (safe for concurrent workers, one
+connection per process) and bounded: past max_docs the least
+recently used entries are dropped.
+"""
+import json
+import os
+import re
+import time
+import zlib
+
+import numpy as np
+
+from src.sqlite_util import ProcessConnection, hash64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    signature BLOB NOT NULL,
+    payload TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_last_used ON docs (last_used);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    doc_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, bucket);
+CREATE INDEX IF NOT EXISTS bands_doc ON bands (doc_id);
+"""
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+# universal hashing (a * x + b) mod P over 32-bit shingle hashes;
+# a, b < 2**32 keep a * x + b inside uint64
+_PRIME = np.uint64(4294967311)
+
+# --------------------------------------------------
+# ✅ MinHash
+# --------------------------------------------------
+def shingles(text: str, k: int = 5) -> np.ndarray:
+    """crc32 of every word k-gram (the whole text if shorter)."""
+    words = WORD_RE.findall(text.lower())
+
+    if len(words) <= k:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + k]) for i in range(len(words) - k + 1)]
+
+    return np.unique(np.array(
+        [zlib.crc32(g.encode("utf-8")) for g in grams],
+        dtype=np.uint64
+    ))
+
+def choose_bands(num_perm: int, threshold: float) -> tuple:
+    """(bands, rows) whose LSH S-curve midpoint (1/b)^(1/r) is nearest threshold, kept a bit below it."""
+    best = None
+
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        midpoint = (1 / bands) ** (1 / rows)
+
+        # candidates are verified afterwards, so err towards recall
+        if midpoint > threshold:
+            continue
+        if best is None or threshold - midpoint < threshold - best[2]:
+            best = (bands, rows, midpoint)
+
+    return (best[0], best[1]) if best else (num_perm, 1)
+
+class NearDuplicateIndex:
+
+    def __init__(self,
+                 path: str,
+                 threshold: float = 0.85,
+                 num_perm: int = 128,
+                 max_docs: int = 200_000,
+                 seed: int = 1):
+        """threshold: estimated Jaccard similarity of shingle sets needed for a match."""
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.max_docs = max_docs
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+        self._db = ProcessConnection(path, synchronous="NORMAL")
+        self.lookups = 0
+        self.hits = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        return self._db.connect()
+
+    def signature(self, text: str):
+        """MinHash signature (num_perm uint64), or None for an empty text."""
+        hashes = shingles(text)
+
+        if hashes.size == 0:
+            return None
+
+        # (num_perm, n_shingles) → min over shingles
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1)
+
+    def _buckets(self, signature: np.ndarray) -> list:
+        rows = signature.reshape(self.bands, self.rows)
+        return [hash64(row.tobytes()) for row in rows]
+
+    # ---------- lookup / insert ----------
+    def lookup(self, text: str):
+        """
+        Best stored entry with estimated similarity >= threshold.
+        Returns (doc_id, similarity, payload) or None.
+        """
+        signature = self.signature(text)
+        self.lookups += 1
+
+        if signature is None:
+            return None
+
+        conn = self._connection()
+        candidates = set()
+
+        for band, bucket in enumerate(self._buckets(signature)):
+            candidates.update(
+                doc_id for (doc_id,) in conn.execute(
+                    "SELECT doc_id FROM bands WHERE band = ? AND bucket = ?",
+                    (band, bucket)
+                )
+            )
+
+        best = None
+
+        for doc_id in candidates:
+            row = conn.execute("SELECT signature, payload FROM docs WHERE id = ?", (doc_id,)).fetchone()
+            if row is None:
+                continue
+
+            stored = np.frombuffer(row[0], dtype=np.uint64)
+            similarity = float((stored == signature).mean())
+
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (doc_id, similarity, row[1])
+
+        if best is None:
+            return None
+
+        conn.execute("UPDATE docs SET last_used = ? WHERE id = ?", (time.time(), best[0]))
+        self.hits += 1
+
+        return best[0], best[1], json.loads(best[2])
+
+    def add(self, text: str, payload: dict):
+        signature = self.signature(text)
+
+        if signature is None:
+            return None
+
+        conn = self._connection()
+
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+
+            doc_id = conn.execute(
+                "INSERT INTO docs (signature, payload, last_used) VALUES (?, ?, ?)",
+                (signature.tobytes(), json.dumps(payload, ensure_ascii=False), time.time())
+            ).lastrowid
+
+            conn.executemany(
+                "INSERT INTO bands VALUES (?, ?, ?)",
+                [(band, bucket, doc_id) for band, bucket in enumerate(self._buckets(signature))]
+            )
+
+            self._evict(conn)
+
+        return doc_id
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        excess = total - self.max_docs
+
+        if excess <= 0:
+            return
+
+        # a little headroom so eviction does not run on every insert
+        excess += self.max_docs // 20
+        oldest = [
+            doc_id for (doc_id,) in conn.execute(
+                "SELECT id FROM docs ORDER BY last_used LIMIT ?", (excess,)
+            )
+        ]
+
+        conn.executemany("DELETE FROM bands WHERE doc_id = ?", [(d,) for d in oldest])
+        conn.executemany("DELETE FROM docs WHERE id = ?", [(d,) for d in oldest])
+
+    def stats(self) -> dict:
+        docs = self._connection().execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "docs": docs,
+            "max_docs": self.max_docs,
+            "bands": self.bands,
+            "rows": self.rows
+        }
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,413 @@
+import time
+
+from src.preprocess import preprocess_emails
+from src.extractive import extractive_summarize
+from src.abstractive import abstractive_rewrite_detailed
+from src.grounding_filter import remove_ungrounded_lines
+from src.evaluation import compute_metrics, fact_retention_score
+from src.entity_matcher import matcher_for
+from src.cache import make_key
+from src import profiling
+
+# --------------------------------------------------
+# ✅ Cache helpers (no-ops when cache is None)
+# --------------------------------------------------
+def _cached(cache, stage: str, inputs, fn, params: dict = None):
+    if cache is None:
+        return fn()
+
+    return cache.get_or_compute(stage, inputs, fn, params)
+
+def _preprocess_many(texts: list, cache, keep_doc: bool, boilerplate, records: list) -> list:
+    """
+    Cache misses are parsed together through one nlp.pipe stream.
+    The Doc is kept on a fresh parse so TextRank can reuse it,
+    but never stored: cached results come back without one.
+    """
+    params = {"boilerplate": boilerplate.fingerprint()} if boilerplate is not None else None
+    keys = [None] * len(texts)
+    results = [None] * len(texts)
+    misses = []
+
+    for i, text in enumerate(texts):
+        if cache is not None:
+            keys[i] = make_key("preprocess", text, params)
+            found, value = cache.get("preprocess", keys[i])
+            if found:
+                results[i] = value
+                continue
+        misses.append(i)
+
+    if not misses:
+        return results
+
+    start = time.perf_counter()
+    with profiling.shared_stage("preprocess", [records[i] for i in misses]):
+        parsed = list(preprocess_emails(
+            [texts[i] for i in misses],
+            batch_size=max(1, len(misses)),
+            keep_docs=keep_doc,
+            boilerplate=boilerplate
+        ))
+    per_item = (time.perf_counter() - start) / len(misses)
+
+    for i, result in zip(misses, parsed):
+        if cache is not None:
+            doc = result.pop("doc", None)
+            cache.put("preprocess", keys[i], result, per_item)
+            if doc is not None:
+                result["doc"] = doc
+        results[i] = result
+
+    return results
+
+# rewrites that ran out of time say nothing about the next attempt
+_UNCACHED_PATHS = {"skipped", "timed_out"}
+
+def _reusable(rewrite: dict, budget_seconds: float) -> bool:
+    """
+    Whether a rewrite may be stored for later runs. Under a budget
+    only undegraded ones are ("greedy" may be the budget's doing),
+    so a stored rewrite is what an unbudgeted run would produce.
+    """
+    if rewrite["decode_path"] in _UNCACHED_PATHS:
+        return False
+
+    return budget_seconds is None or rewrite["decode_path"] in ("beam", "none")
+
+def _rewrite_batch(items: list, batch_size: int, chunked: bool, cache,
+                   router=None, budget_seconds: float = None) -> list:
+    """Only cache misses go to BART, still batched together."""
+    if cache is None:
+        return abstractive_rewrite_detailed(
+            items, batch_size, chunked, router=router, budget_seconds=budget_seconds
+        )
+
+    keys = [
+        make_key("abstractive", list(item), {"chunked": chunked, "routed": router is not None})
+        for item in items
+    ]
+    outputs = [None] * len(items)
+    misses = []
+
+    for i, key in enumerate(keys):
+        found, value = cache.get("abstractive", key)
+        if found:
+            outputs[i] = value
+        else:
+            misses.append(i)
+
+    if misses:
+        start = time.perf_counter()
+        rewrites = abstractive_rewrite_detailed(
+            [items[i] for i in misses],
+            batch_size,
+            chunked,
+            router=router,
+            budget_seconds=budget_seconds
+        )
+        per_item = (time.perf_counter() - start) / len(misses)
+
+        for i, rewrite in zip(misses, rewrites):
+            if _reusable(rewrite, budget_seconds):
+                cache.put("abstractive", keys[i], rewrite, per_item)
+            outputs[i] = rewrite
+
+    return outputs
+
+def _reuse_near_duplicate(near_duplicates, result: dict):
+    """
+    The stored summary of a near-duplicate, re-grounded against this
+    email, or None when there is no match or the summary does not fit:
+    it must keep as many of this email's entities as it kept of its
+    own, and mention no entity of the old email missing from this one.
+    """
+    match = near_duplicates.lookup(result["cleaned_text"])
+    if match is None:
+        return None
+
+    doc_id, similarity, payload = match
+    source = result["cleaned_text"]
+    summary = remove_ungrounded_lines(payload["final_summary"], source)
+
+    if fact_retention_score(result["entities"], summary) < payload["fact_retention"]:
+        return None
+
+    old = matcher_for(payload["entities"])
+    if old.present(summary) - old.present(source):
+        return None
+
+    return {
+        "summary": summary,
+        "of": payload["email_id"],
+        "similarity": similarity
+    }
+
+# --------------------------------------------------
+# ✅ Full pipeline for many emails
+# --------------------------------------------------
+def summarize_emails(texts: list,
+                     top_n: int = 3,
+                     batch_size: int = 8,
+                     abstractive: bool = True,
+                     chunked: bool = False,
+                     cache=None,
+                     ids: list = None,
+                     extractive_mode: str = "spacy",
+                     router=None,
+                     budget_seconds: float = None,
+                     threads=None,
+                     boilerplate=None,
+                     near_duplicates=None) -> list:
+    """
+    preprocess → extractive → abstractive → grounding → metrics,
+    with BART generation batched across all given emails.
+    Returns one result dict per email, in input order.
+
+    abstractive=False stops after the extractive stage
+    (final_summary is the extractive summary); MiniLM and
+    BART are then never loaded.
+
+    chunked=True rewrites long inputs in token-budgeted chunks
+    instead of truncating them at BART's window; either way each
+    result reports "input_coverage".
+
+    cache: optional src.cache.ResultCache; every stage output
+    is looked up there first and stored on a miss.
+
+    extractive_mode: "spacy" (default) or "fast", the parse-free
+    scorer for triage workloads (see src.fast_extractive).
+
+    router: optional src.routing.Router deciding per email whether
+    BART runs with beam search, greedy decoding or not at all;
+    results then report "route" and "bart_seconds_saved".
+
+    budget_seconds: optional latency budget for the batch's BART
+    generation (see src.budget). Every abstractive result reports
+    "decode_path" and "generate_seconds".
+
+    threads: optional src.threads.ThreadStore. Quoted history and
+    known forwards are then cut before preprocessing, so only each
+    message's new content is processed; results carry "thread_id",
+    "earlier_summaries" (stored summaries of the thread's earlier
+    messages) and "quoted_chars_skipped".
+
+    boilerplate: optional src.boilerplate.BoilerplateIndex; known
+    boilerplate is dropped before sentence splitting and results
+    report "boilerplate_removed".
+
+    near_duplicates: optional src.near_duplicates.NearDuplicateIndex.
+    An email close enough to one summarized before reuses its
+    summary (re-grounded and entity-checked against the new text)
+    instead of going through BART; such results report
+    "near_duplicate_of" and "similarity", with decode_path "reused".
+
+    ids: optional email ids, used to label profiling records and
+    stored with thread and near-duplicate entries (None there when
+    not given; profiling falls back to batch positions).
+    While src.profiling is enabled every result carries its
+    per-stage "timings" record.
+    """
+    # batch positions are no ids: the persistent stores get None
+    labels = ids if ids is not None else list(range(len(texts)))
+    ids = ids if ids is not None else [None] * len(texts)
+
+    views = None
+    if threads is not None:
+        views = [threads.prepare(text, email_id) for text, email_id in zip(texts, ids)]
+        texts = [view["text"] for view in views]
+    records = [profiling.new_record(label) for label in labels]
+    prepared = []
+
+    preprocessed = _preprocess_many(texts, cache, extractive_mode == "spacy", boilerplate, records)
+
+    for result, record in zip(preprocessed, records):
+        with profiling.activate(record):
+            doc = result.pop("doc", None)
+
+            extractive_summary = _cached(
+                cache,
+                "extractive",
+                result["sentences"],
+                lambda: extractive_summarize(
+                    result["sentences"],
+                    top_n=top_n,
+                    doc=doc,
+                    mode=extractive_mode
+                ),
+                {"top_n": top_n, "mode": extractive_mode}
+            )
+
+        prepared.append((result, extractive_summary))
+
+    if not abstractive:
+        outputs = [
+            {
+                "subject": result["subject"],
+                "extractive_summary": extractive_summary,
+                "final_summary": extractive_summary,
+                "metrics": compute_metrics(
+                    result["cleaned_text"],
+                    extractive_summary,
+                    extractive_summary,
+                    result["entities"]
+                )
+            }
+            for result, extractive_summary in prepared
+        ]
+        _attach_boilerplate(outputs, prepared)
+        return _attach_timings(_attach_threads(outputs, views, threads), records)
+
+    reused = {}
+    if near_duplicates is not None:
+        for i, (result, _) in enumerate(prepared):
+            with profiling.activate(records[i]):
+                reuse = _reuse_near_duplicate(near_duplicates, result)
+            if reuse is not None:
+                reused[i] = reuse
+
+    # one BART job for the rest of the batch; its cost is split over those emails
+    misses = [i for i in range(len(prepared)) if i not in reused]
+    with profiling.shared_stage("abstractive", [records[i] for i in misses]):
+        rewrites = dict(zip(misses, _rewrite_batch(
+            [
+                (prepared[i][1], prepared[i][0]["cleaned_text"], prepared[i][0]["entities"])
+                for i in misses
+            ],
+            batch_size,
+            chunked,
+            cache,
+            router,
+            budget_seconds
+        )))
+
+    outputs = []
+
+    for i, ((result, extractive_summary), record) in enumerate(zip(prepared, records)):
+        if i in reused:
+            outputs.append(_reused_output(result, extractive_summary, reused[i]))
+            continue
+
+        rewrite = rewrites[i]
+        abs_summary = rewrite["summary"]
+
+        if rewrite["route"] == "extractive":
+            # routed past BART: nothing new to ground
+            final_summary = abs_summary
+        else:
+            with profiling.activate(record):
+                final_summary = _cached(
+                    cache,
+                    "grounding",
+                    [abs_summary, result["cleaned_text"]],
+                    lambda: remove_ungrounded_lines(abs_summary, result["cleaned_text"])
+                )
+
+        output = {
+            "subject": result["subject"],
+            "extractive_summary": extractive_summary,
+            "final_summary": final_summary,
+            "input_coverage": rewrite["coverage"],
+            "decode_path": rewrite["decode_path"],
+            "generate_seconds": rewrite["generate_seconds"],
+            "metrics": compute_metrics(
+                result["cleaned_text"],
+                extractive_summary,
+                final_summary,
+                result["entities"]
+            )
+        }
+
+        if router is not None:
+            output["route"] = rewrite["route"]
+            output["bart_seconds_saved"] = rewrite["bart_seconds_saved"]
+
+        # budget fallbacks are not worth handing on
+        if near_duplicates is not None and _reusable(rewrite, budget_seconds):
+            near_duplicates.add(result["cleaned_text"], {
+                "email_id": None if ids[i] is None else str(ids[i]),
+                "final_summary": final_summary,
+                "entities": result["entities"],
+                "fact_retention": output["metrics"]["pipeline"]["fact_retention"]
+            })
+
+        outputs.append(output)
+
+    _attach_boilerplate(outputs, prepared)
+    return _attach_timings(_attach_threads(outputs, views, threads), records)
+
+def _reused_output(result: dict, extractive_summary: str, reuse: dict) -> dict:
+    return {
+        "subject": result["subject"],
+        "extractive_summary": extractive_summary,
+        "final_summary": reuse["summary"],
+        "input_coverage": 1.0,
+        "decode_path": "reused",
+        "generate_seconds": 0.0,
+        "near_duplicate_of": reuse["of"],
+        "similarity": reuse["similarity"],
+        "metrics": compute_metrics(
+            result["cleaned_text"],
+            extractive_summary,
+            reuse["summary"],
+            result["entities"]
+        )
+    }
+
+def _attach_boilerplate(outputs: list, prepared: list):
+    for output, (result, _) in zip(outputs, prepared):
+        if "boilerplate" in result:
+            output["boilerplate_removed"] = result["boilerplate"]
+
+def _attach_threads(outputs: list, views: list, threads) -> list:
+    """Report thread context and store each new summary for later replies."""
+    if views is None:
+        return outputs
+
+    for output, view in zip(outputs, views):
+        output["thread_id"] = view["thread_id"]
+        output["earlier_summaries"] = view["earlier"]
+        output["quoted_chars_skipped"] = view["skipped_chars"]
+
+        threads.record(view, {
+            "email_id": view["email_id"],
+            "subject": output["subject"],
+            "summary": output["final_summary"]
+        })
+
+    return outputs
+
+def _attach_timings(outputs: list, records: list) -> list:
+    for output, record in zip(outputs, records):
+        if record is not None:
+            profiling.finish(record)
+            output["timings"] = record
+
+    return outputs
+
+def summarize_email(text: str,
+                    top_n: int = 3,
+                    abstractive: bool = True,
+                    chunked: bool = False,
+                    cache=None,
+                    email_id=None,
+                    extractive_mode: str = "spacy",
+                    router=None,
+                    budget_seconds: float = None,
+                    threads=None,
+                    boilerplate=None,
+                    near_duplicates=None) -> dict:
+    return summarize_emails(
+        [text],
+        top_n=top_n,
+        abstractive=abstractive,
+        chunked=chunked,
+        cache=cache,
+        ids=[email_id],
+        extractive_mode=extractive_mode,
+        router=router,
+        budget_seconds=budget_seconds,
+        threads=threads,
+        boilerplate=boilerplate,
+        near_duplicates=near_duplicates
+    )[0]
@@ -1,24 +1,15 @@
-import re
-import spacy
+from functools import lru_cache
+
 from nltk.tokenize import sent_tokenize
 
-nlp = spacy.load("en_core_web_sm")
+from src.models import get_nlp, spacy_disable
+from src import profiling, rules
 
 def remove_signature(text: str):
     """
     Remove common email signature endings
     """
-    signature_patterns = [
-        r"Best,\s*\n.*",
-        r"Regards,\s*\n.*",
-        r"Thanks,\s*\n.*",
-        r"Sincerely,\s*\n.*"
-    ]
-
-    for pattern in signature_patterns:
-        text = re.sub(pattern, "", text, flags=re.IGNORECASE | re.DOTALL)
-
-    return text
+    return rules.SIGNATURE_RE.sub("", text)
 
 def separate_subject(text: str):
     """
@@ -26,16 +17,16 @@ def separate_subject(text: str):
     """
     subject = None
 
-    match = re.search(r"Subject:(.*)", text, re.IGNORECASE)
+    match = rules.SUBJECT_RE.search(text)
     if match:
         subject = match.group(1).strip()
 
     return subject
 
 def clean_email(text: str) -> str:
-    text = re.sub(r'\r', '', text)
-    text = re.sub(r'\n+', '\n', text)
-    text = re.sub(r'[ \t]+', ' ', text)
+    text = text.replace("\r", "")
+    text = rules.NEWLINES_RE.sub("\n", text)
+    text = rules.SPACES_RE.sub(" ", text)
     return text.strip()
 
 def split_sentences(text: str):
@@ -43,11 +34,13 @@ def split_sentences(text: str):
     Better segmentation:
     remove subject line first to avoid merging
     """
-    text = re.sub(r"Subject:.*\n", "", text, flags=re.IGNORECASE)
+    text = rules.SUBJECT_LINE_RE.sub("", text)
     return sent_tokenize(text)
 
-def extract_entities(text: str):
-    doc = nlp(text)
+def extract_entities(text: str, doc=None):
+    if doc is None:
+        profiling.count("spacy_parses")
+        doc = get_nlp()(text, disable=spacy_disable("preprocess"))
 
     entities = {
         "DATE": [],
@@ -70,20 +63,11 @@ def filter_noise_sentences(sentences):
     but keep the sentence if it contains useful info.
     """
 
-    greeting_patterns = [
-        r"^(dear\s+\w+,?\s*)",
-        r"^(hi\s+\w*,?\s*)",
-        r"^(hello\s+\w*,?\s*)"
-    ]
-
     cleaned_sentences = []
 
     for sent in sentences:
-        new_sent = sent.strip()
-
         # Remove greeting only at start
-        for pattern in greeting_patterns:
-            new_sent = re.sub(pattern, "", new_sent, flags=re.IGNORECASE)
+        new_sent = rules.GREETING_RE.sub("", sent.strip(), count=1)
 
         # Keep sentence if still meaningful
         if len(new_sent.split()) > 2:
@@ -98,40 +82,145 @@ def clean_injected_sentence(sentence: str) -> str:
     sentence = sentence.strip()
 
     # Remove label-only fragments like "Organization:"
-    sentence = re.sub(r"^(date|time|budget|organization|location)\s*:\s*$",
-                      "",
-                      sentence,
-                      flags=re.IGNORECASE)
+    sentence = rules.LABEL_ONLY_RE.sub("", sentence)
 
     # Remove salutation leakage
-    sentence = re.sub(r"\b(dear\s+\w+[,!]?)\b",
-                      "",
-                      sentence,
-                      flags=re.IGNORECASE)
+    sentence = rules.SALUTATION_RE.sub("", sentence)
 
     # Remove double spaces
-    sentence = re.sub(r"\s{2,}", " ", sentence)
+    sentence = rules.MULTI_SPACE_RE.sub(" ", sentence)
 
     return sentence.strip()
 
 
-def preprocess_email(text: str):
-
+def _prepare(text: str, boilerplate=None) -> tuple:
+    """Everything before spaCy: (subject, cleaned_text, boilerplate info or None)."""
+    _, text = rules.split_thread_headers(text)
     subject = separate_subject(text)
 
     text = remove_signature(text)
-    cleaned = clean_email(text)
-    sentences = split_sentences(cleaned)
-    sentences = filter_noise_sentences(sentences)
-    entities = extract_entities(cleaned)
+
+    removed = None
+    if boilerplate is not None:
+        text, removed = boilerplate.strip(text)
+
+    return subject, clean_email(text), removed
+
+def _result(subject: str, sentences: list, doc, removed, keep_doc: bool) -> dict:
+    cleaned = doc.text
+    entities = extract_entities(cleaned, doc)
     entities = clean_entities(entities)
 
-    return {
+    result = {
         "subject": subject,
         "cleaned_text": cleaned,
-        "sentences": sentences,
+        "sentences": filter_noise_sentences(sentences),
         "entities": entities
     }
+
+    if removed is not None:
+        result["boilerplate"] = removed
+
+    if keep_doc:
+        result["doc"] = doc
+
+    return result
+
+@profiling.timed("preprocess")
+def preprocess_email(text: str, keep_doc: bool = False, boilerplate=None):
+    """
+    keep_doc=True also returns the parsed spaCy Doc of
+    cleaned_text so later stages can reuse it.
+
+    boilerplate: optional src.boilerplate.BoilerplateIndex; known
+    disclaimers / footers / templates are dropped before sentence
+    splitting, and result["boilerplate"] says how much was removed.
+    """
+    subject, cleaned, removed = _prepare(text, boilerplate)
+
+    sentences = split_sentences(cleaned)
+    # A Doc handed on to the extractive stage needs its components too
+    stages = ("preprocess", "extractive") if keep_doc else ("preprocess",)
+    profiling.count("spacy_parses")
+    doc = get_nlp()(cleaned, disable=spacy_disable(*stages))
+
+    return _result(subject, sentences, doc, removed, keep_doc)
+
+# --------------------------------------------------
+# ✅ Many emails through one nlp.pipe stream
+# --------------------------------------------------
+SENTENCE_SOURCES = ("nltk", "doc")
+
+@lru_cache(maxsize=1)
+def _sentencizer():
+    from spacy.pipeline import Sentencizer
+    return Sentencizer()
+
+def doc_sentences(doc) -> list:
+    """
+    Sentences of a Doc from spaCy's rule-based sentencizer
+    (no second tokenization); the subject line is dropped
+    as in split_sentences.
+    """
+    doc = _sentencizer()(doc)
+    sentences = []
+
+    for sent in doc.sents:
+        text = rules.SUBJECT_SENTENCE_RE.sub("", sent.text).strip()
+        if text:
+            sentences.append(text)
+
+    return sentences
+
+def preprocess_emails(texts,
+                      batch_size: int = 64,
+                      n_process: int = 1,
+                      keep_docs: bool = False,
+                      boilerplate=None,
+                      sentence_source: str = "nltk"):
+    """
+    Stream emails through nlp.pipe and yield one preprocess_email
+    result per text, in input order. texts may be any iterable
+    and is consumed lazily.
+
+    Only the components preprocessing needs are run (plus the
+    extractive ones when keep_docs=True, so the returned "doc"
+    can be reused by TextRank). n_process > 1 parses in spaCy
+    worker processes.
+
+    sentence_source="nltk" splits sentences exactly like
+    preprocess_email, so results are identical; "doc" takes them
+    from the same Doc as the entities instead of a second NLTK
+    pass, which is cheaper but may split differently.
+    """
+    if sentence_source not in SENTENCE_SOURCES:
+        raise ValueError(f"unknown sentence_source {sentence_source!r}, expected one of {SENTENCE_SOURCES}")
+
+    stages = ("preprocess", "extractive") if keep_docs else ("preprocess",)
+
+    prepared = (
+        (cleaned, (subject, removed))
+        for subject, cleaned, removed in (_prepare(text, boilerplate) for text in texts)
+    )
+
+    docs = get_nlp().pipe(
+        prepared,
+        as_tuples=True,
+        batch_size=batch_size,
+        n_process=n_process,
+        disable=spacy_disable(*stages)
+    )
+
+    for doc, (subject, removed) in docs:
+        profiling.count("spacy_parses")
+
+        if sentence_source == "doc":
+            sentences = doc_sentences(doc)
+        else:
+            sentences = split_sentences(doc.text)
+
+        yield _result(subject, sentences, doc, removed, keep_docs)
+
 def clean_entities(entities):
     filtered = {}
 
@@ -0,0 +1,272 @@
+"""
+Per-email, per-stage instrumentation.
+
+Disabled by default, and then every hook is a cheap no-op.
+Once enabled, each email gets a record of wall time and counters
+(spaCy parses, encode/generate calls, token counts) per stage.
+Records are plain dicts, so they can be shipped back from worker
+processes, written as JSON lines and aggregated into a
+p50/p95/p99 report. A chosen fraction of emails can additionally
+be run under cProfile.
+"""
+import cProfile
+import functools
+import json
+import math
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_config = {
+    "enabled": False,
+    "profile_fraction": 0.0,
+    "profile_dir": None,
+    "rng": random.Random(0)
+}
+
+_current = ContextVar("profiling_record", default=None)
+_stack = ContextVar("profiling_stack", default=())
+_profilers = {}
+
+# --------------------------------------------------
+# ✅ Configuration
+# --------------------------------------------------
+def enable(profile_fraction: float = 0.0,
+           profile_dir: str = None,
+           seed: int = 0):
+    """
+    profile_fraction: share of emails run under cProfile;
+    their stats are dumped to profile_dir/<email id>.prof.
+    """
+    _config["enabled"] = True
+    _config["profile_fraction"] = profile_fraction
+    _config["profile_dir"] = profile_dir
+    _config["rng"] = random.Random(seed)
+
+    if profile_dir and profile_fraction > 0:
+        os.makedirs(profile_dir, exist_ok=True)
+
+def disable():
+    _config["enabled"] = False
+
+def is_enabled() -> bool:
+    return _config["enabled"]
+
+# --------------------------------------------------
+# ✅ Records
+# --------------------------------------------------
+def new_record(email_id=None):
+    """A fresh per-email record, or None while disabled."""
+    if not _config["enabled"]:
+        return None
+
+    profiled = (
+        _config["profile_fraction"] > 0
+        and _config["rng"].random() < _config["profile_fraction"]
+    )
+
+    return {
+        "id": email_id,
+        "total_seconds": 0.0,
+        "stages": {},
+        "counters": {},
+        "profiled": profiled
+    }
+
+@contextmanager
+def activate(record):
+    """Attribute every stage/count inside this block to record."""
+    if record is None:
+        yield
+        return
+
+    profiler = None
+    if record["profiled"]:
+        profiler = _profilers.setdefault(id(record), cProfile.Profile())
+        profiler.enable()
+
+    token = _current.set(record)
+    stack_token = _stack.set(())
+
+    try:
+        yield
+    finally:
+        _stack.reset(stack_token)
+        _current.reset(token)
+
+        if profiler is not None:
+            profiler.disable()
+
+def finish(record):
+    """Dump the cProfile stats of a sampled record, if any."""
+    if record is None:
+        return
+
+    profiler = _profilers.pop(id(record), None)
+
+    if profiler is not None and _config["profile_dir"]:
+        name = str(record["id"]).strip("<>").replace("/", "_") or "email"
+        path = os.path.join(_config["profile_dir"], f"{name}.prof")
+        profiler.dump_stats(path)
+        record["profile_path"] = path
+
+def _stage_entry(record, name):
+    return record["stages"].setdefault(name, {"seconds": 0.0, "calls": 0})
+
+# --------------------------------------------------
+# ✅ Hooks used by the pipeline stages
+# --------------------------------------------------
+@contextmanager
+def stage(name: str):
+    record = _current.get()
+
+    if record is None:
+        yield
+        return
+
+    parent = _stack.get()
+    token = _stack.set(parent + (name,))
+    start = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _stack.reset(token)
+
+        entry = _stage_entry(record, name)
+        entry["seconds"] += elapsed
+        entry["calls"] += 1
+
+        # nested stages are already inside their parent's time
+        if not parent:
+            record["total_seconds"] += elapsed
+
+def timed(name: str):
+    """Decorator form of stage() for whole functions."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name: str, n=1):
+    """Add n to a counter of the current email and its innermost stage."""
+    record = _current.get()
+
+    if record is None:
+        return
+
+    record["counters"][name] = record["counters"].get(name, 0) + n
+
+    stack = _stack.get()
+    if stack:
+        entry = _stage_entry(record, stack[-1])
+        entry[name] = entry.get(name, 0) + n
+
+@contextmanager
+def shared_stage(name: str, records: list):
+    """
+    A stage run once for a whole batch of emails (e.g. batched
+    BART generation). Its time and counters are split evenly
+    over the member records, which are marked with the batch size.
+    """
+    records = [r for r in records if r is not None]
+
+    if not records:
+        yield
+        return
+
+    batch = {
+        "id": None,
+        "total_seconds": 0.0,
+        "stages": {},
+        "counters": {},
+        "profiled": False
+    }
+
+    with activate(batch):
+        with stage(name):
+            yield
+
+    share = 1.0 / len(records)
+
+    for record in records:
+        record["total_seconds"] += batch["total_seconds"] * share
+
+        for stage_name, values in batch["stages"].items():
+            entry = _stage_entry(record, stage_name)
+            for key, value in values.items():
+                entry[key] = entry.get(key, 0) + value * share
+            entry["batched"] = len(records)
+
+        for key, value in batch["counters"].items():
+            record["counters"][key] = record["counters"].get(key, 0) + value * share
+
+# --------------------------------------------------
+# ✅ Export + aggregate report
+# --------------------------------------------------
+def write_jsonl(records, path: str, append: bool = False):
+    with open(path, "a" if append else "w", encoding="utf-8") as f:
+        for record in records:
+            if record is not None:
+                f.write(json.dumps(record) + "\n")
+
+def read_jsonl(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile (q in 0..100)."""
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def _summary(values: list) -> dict:
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0
+    }
+
+def aggregate(records) -> dict:
+    """
+    Report with p50/p95/p99 wall time per stage (over the emails
+    that ran it) and per email, plus counter totals per stage.
+    """
+    records = [r for r in records if r]
+    stage_seconds = {}
+    stage_counters = {}
+    totals = {}
+
+    for record in records:
+        for name, values in record["stages"].items():
+            stage_seconds.setdefault(name, []).append(values["seconds"])
+
+            counters = stage_counters.setdefault(name, {})
+            for key, value in values.items():
+                if key not in ("seconds", "batched"):
+                    counters[key] = counters.get(key, 0) + value
+
+        for key, value in record["counters"].items():
+            totals[key] = totals.get(key, 0) + value
+
+    return {
+        "emails": len(records),
+        "email_seconds": _summary([r["total_seconds"] for r in records]),
+        "stages": {
+            name: dict(_summary(values), counters=stage_counters[name])
+            for name, values in sorted(stage_seconds.items())
+        },
+        "counters": totals
+    }
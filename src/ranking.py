@@ -0,0 +1,98 @@
+"""
+TextRank ranking engine.
+
+PageRank as a vectorised power iteration over the row-normalised
+similarity matrix, following networkx.pagerank exactly (uniform
+start and teleport, dangling rows spread uniformly, same stopping
+rule), so rankings match the old nx.from_numpy_array + nx.pagerank
+path without building a Python object per edge.
+
+For long emails the graph can be pruned to each sentence's top-k
+neighbours and/or edges above a threshold, held as a SciPy sparse
+matrix.
+"""
+import numpy as np
+
+def sparsify(sim_matrix: np.ndarray, top_k: int = None, threshold: float = None):
+    """
+    Keep, per row, the top_k strongest edges and/or edges >= threshold.
+    The result stays symmetric (an edge survives if either end keeps
+    it), like the undirected graph networkx builds. Returns a CSR matrix.
+    """
+    from scipy import sparse
+
+    n = sim_matrix.shape[0]
+
+    # edge lists only: no n×n mask beyond the threshold comparison
+    if top_k is not None and top_k < n - 1:
+        # argpartition: the top_k largest per row, no full sort
+        cols = np.argpartition(-sim_matrix, top_k, axis=1)[:, :top_k].ravel()
+        rows = np.repeat(np.arange(n), top_k)
+
+        if threshold is not None:
+            strong = sim_matrix[rows, cols] >= threshold
+            rows, cols = rows[strong], cols[strong]
+    elif threshold is not None:
+        rows, cols = np.nonzero(sim_matrix >= threshold)
+    else:
+        rows, cols = np.nonzero(~np.eye(n, dtype=bool))
+
+    rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
+    off_diagonal = rows != cols
+    rows, cols = rows[off_diagonal], cols[off_diagonal]
+
+    # tocoo() after tocsr() drops the edges kept from both ends twice
+    edges = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n)).tocoo()
+    matrix = sparse.csr_matrix(
+        (sim_matrix[edges.row, edges.col], (edges.row, edges.col)),
+        shape=(n, n)
+    )
+    matrix.eliminate_zeros()
+
+    return matrix
+
+def pagerank(matrix,
+             damping: float = 0.85,
+             tol: float = 1e-6,
+             max_iter: int = 100) -> np.ndarray:
+    """
+    PageRank scores for a weighted adjacency matrix (dense ndarray
+    or SciPy sparse). Returns one score per row, summing to 1.
+    If it has not converged after max_iter, the last iterate is returned.
+    """
+    n = matrix.shape[0]
+
+    if n == 0:
+        return np.zeros(0)
+
+    out_weight = np.asarray(matrix.sum(axis=1), dtype=np.float64).ravel()
+    dangling = out_weight == 0
+
+    inv = np.zeros(n)
+    inv[~dangling] = 1.0 / out_weight[~dangling]
+
+    if isinstance(matrix, np.ndarray):
+        transition_t = (matrix * inv[:, None]).T
+    else:
+        from scipy import sparse
+
+        transition_t = (sparse.diags(inv) @ matrix).T.tocsr()
+
+    teleport = np.full(n, 1.0 / n)
+    x = teleport.copy()
+
+    for _ in range(max_iter):
+        x_last = x
+        x = damping * (transition_t @ x + x[dangling].sum() * teleport) + (1 - damping) * teleport
+
+        if np.abs(x - x_last).sum() < n * tol:
+            break
+
+    return x
+
+def rank(sim_matrix: np.ndarray, top_k: int = None, threshold: float = None) -> np.ndarray:
+    """PageRank over the dense graph, or over the pruned sparse one."""
+    if top_k is None and threshold is None:
+        return pagerank(sim_matrix)
+
+    return pagerank(sparsify(sim_matrix, top_k, threshold))
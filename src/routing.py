@@ -0,0 +1,242 @@
+"""
+Adaptive compute routing for the abstractive stage.
+
+BART is the most expensive part of the pipeline, and for some
+emails its output is thrown away anyway (fact-retention fallback)
+or could not improve on the extractive summary (very short or
+already compact inputs). The router looks at cheap features of
+each email and picks one of:
+
+    "full"        beam search (the default path)
+    "fast"        greedy decoding, for long or entity-heavy inputs
+    "extractive"  skip BART, the extractive summary is final
+
+Outcomes are fed back into an optional on-disk history keyed by a
+coarse feature bucket, so buckets that keep falling back stop being
+sent to the model. Every decision and the estimated BART time it
+saved are logged.
+"""
+import logging
+import math
+import os
+import threading
+
+from src.abstractive import (
+    collect_missing_entity_sentences,
+    count_tokens,
+    split_sentences
+)
+from src.sqlite_util import ProcessConnection
+
+logger = logging.getLogger(__name__)
+
+ROUTES = ("full", "fast", "extractive")
+
+# Prior generate() cost before any batch has been timed (CPU, bart-large).
+DEFAULT_SECONDS_PER_TOKEN = {"full": 0.004, "fast": 0.002}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS route_history (
+    bucket TEXT PRIMARY KEY,
+    runs INTEGER NOT NULL DEFAULT 0,
+    fallbacks INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# --------------------------------------------------
+# ✅ Fallback history (SQLite, shared by workers)
+# --------------------------------------------------
+class RouteHistory:
+
+    def __init__(self, path: str):
+        self.path = path
+        # opened on the main thread, used from the service's model
+        # thread or the streaming runner's stage threads
+        self._db = ProcessConnection(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        return self._db.connect()
+
+    def get(self, bucket: str) -> tuple:
+        """Returns (runs, fallbacks, skipped)."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT runs, fallbacks, skipped FROM route_history WHERE bucket = ?",
+                (bucket,)
+            ).fetchone()
+
+        return row or (0, 0, 0)
+
+    def record(self, bucket: str, runs: int = 0, fallbacks: int = 0, skipped: int = 0):
+        with self._lock:
+            conn = self._connection()
+
+            with conn:
+                conn.execute("INSERT OR IGNORE INTO route_history (bucket) VALUES (?)", (bucket,))
+                conn.execute(
+                    "UPDATE route_history SET runs = runs + ?, fallbacks = fallbacks + ?, "
+                    "skipped = skipped + ? WHERE bucket = ?",
+                    (runs, fallbacks, skipped, bucket)
+                )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+# --------------------------------------------------
+# ✅ Router
+# --------------------------------------------------
+class Router:
+
+    def __init__(self,
+                 history_path: str = None,
+                 min_tokens: int = 40,
+                 long_tokens: int = 512,
+                 max_injected: int = 3,
+                 dense_entities: float = 0.08,
+                 skip_fallback_rate: float = 0.7,
+                 min_history: int = 20,
+                 explore_every: int = 20):
+        """
+        min_tokens: rewrite inputs shorter than this stay extractive.
+        long_tokens / max_injected / dense_entities: past any of
+        these, decode greedily instead of with beam search.
+        skip_fallback_rate: once a bucket has min_history runs and
+        falls back at least this often, it is routed extractive;
+        one in explore_every such emails still runs so the history
+        keeps up with model or threshold changes.
+        """
+        self.history = RouteHistory(history_path) if history_path else None
+        self.min_tokens = min_tokens
+        self.long_tokens = long_tokens
+        self.max_injected = max_injected
+        self.dense_entities = dense_entities
+        self.skip_fallback_rate = skip_fallback_rate
+        self.min_history = min_history
+        self.explore_every = explore_every
+
+        self.seconds_per_token = dict(DEFAULT_SECONDS_PER_TOKEN)
+        self.routes = {route: 0 for route in ROUTES}
+        self.fallbacks = 0
+        self.saved_seconds = 0.0
+
+    # ---------- features ----------
+    def features(self,
+                 extractive_summary: str,
+                 original_email: str,
+                 entities: dict,
+                 full_input: str) -> dict:
+        tokens = count_tokens(full_input)
+        mentions = sum(len(values) for values in entities.values())
+        injected = len(collect_missing_entity_sentences(
+            extractive_summary,
+            original_email,
+            entities
+        ))
+
+        return {
+            "tokens": tokens,
+            "extractive_sentences": len(split_sentences(extractive_summary)),
+            "injected": injected,
+            "entity_density": mentions / tokens if tokens else 0.0
+        }
+
+    @staticmethod
+    def bucket(features: dict) -> str:
+        """Coarse key for the history: token octave, injected count, density step."""
+        tokens = int(math.log2(max(features["tokens"], 1)))
+        injected = min(features["injected"], 4)
+        density = min(int(features["entity_density"] * 20), 4)
+        return f"t{tokens}:i{injected}:d{density}"
+
+    # ---------- decision ----------
+    def decide(self, features: dict) -> tuple:
+        """Returns (route, reason)."""
+        if features["tokens"] < self.min_tokens:
+            route, reason = "extractive", "short input"
+        elif features["extractive_sentences"] <= 1 and features["injected"] == 0:
+            route, reason = "extractive", "compact extractive summary"
+        elif self._skip_by_history(features):
+            route, reason = "extractive", "bucket keeps falling back"
+        elif features["tokens"] > self.long_tokens:
+            route, reason = "fast", "long input"
+        elif features["injected"] >= self.max_injected:
+            route, reason = "fast", "many injected sentences"
+        elif features["entity_density"] >= self.dense_entities:
+            route, reason = "fast", "entity dense"
+        else:
+            route, reason = "full", "default"
+
+        saved = self.estimate_saved(features, route)
+        self.routes[route] += 1
+        self.saved_seconds += saved
+
+        logger.info(
+            "route=%s (%s) tokens=%d injected=%d entity_density=%.3f saved≈%.2fs",
+            route, reason, features["tokens"], features["injected"],
+            features["entity_density"], saved
+        )
+
+        return route, reason
+
+    def _skip_by_history(self, features: dict) -> bool:
+        if self.history is None:
+            return False
+
+        bucket = self.bucket(features)
+        runs, fallbacks, skipped = self.history.get(bucket)
+
+        if runs < self.min_history or fallbacks / runs < self.skip_fallback_rate:
+            return False
+
+        self.history.record(bucket, skipped=1)
+
+        # every explore_every-th skip is sent through anyway
+        return (skipped + 1) % self.explore_every != 0
+
+    # ---------- cost accounting ----------
+    def estimate_saved(self, features: dict, route: str) -> float:
+        """BART seconds not spent compared with the full path."""
+        full = self.seconds_per_token["full"] * features["tokens"]
+
+        if route == "extractive":
+            return full
+        if route == "fast":
+            return max(0.0, full - self.seconds_per_token["fast"] * features["tokens"])
+        return 0.0
+
+    def observe_speed(self, route: str, seconds: float, tokens: int, alpha: float = 0.2):
+        """EWMA of generate() seconds per input token for a route."""
+        if tokens <= 0 or route not in self.seconds_per_token:
+            return
+
+        rate = seconds / tokens
+        self.seconds_per_token[route] += alpha * (rate - self.seconds_per_token[route])
+
+    def observe(self, features: dict, route: str, fell_back: bool):
+        """Feed a model-routed email's outcome back into the history."""
+        if route == "extractive":
+            return
+
+        self.fallbacks += fell_back
+
+        if self.history is not None:
+            self.history.record(self.bucket(features), runs=1, fallbacks=int(fell_back))
+
+    def stats(self) -> dict:
+        model_runs = self.routes["full"] + self.routes["fast"]
+
+        return {
+            "routes": dict(self.routes),
+            "fallbacks": self.fallbacks,
+            "fallback_rate": self.fallbacks / model_runs if model_runs else 0.0,
+            "bart_seconds_saved": self.saved_seconds,
+            "seconds_per_token": dict(self.seconds_per_token)
+        }
@@ -0,0 +1,140 @@
+"""
+Compiled text rules shared by the heuristics.
+
+Every regex rule set is compiled once at import, and lists of
+alternatives are merged into one pattern, so a rule is a single
+search instead of a loop of searches. sentence_features() evaluates
+all sentence-level flags (keyword boost, critical keywords,
+critical info) from one lowercasing of the sentence and caches the
+record, since the same sentence is scored by several stages.
+
+The rules reproduce the behaviour of the loops they replace
+exactly; benchmarks/rules_bench.py checks that and times both.
+"""
+import re
+from functools import lru_cache
+
+# --------------------------------------------------
+# ✅ Shared helpers
+# --------------------------------------------------
+NON_ALNUM_RE = re.compile(r"[^a-z0-9]")
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+SUMMARY_SPLIT_RE = re.compile(r"[.!?]\s+")
+
+def normalize(text: str) -> str:
+    """Lowercase, punctuation and spaces removed (for robust matching)."""
+    return NON_ALNUM_RE.sub("", text.lower())
+
+def split_sentences(text: str) -> list:
+    """Split on sentence punctuation or line breaks (generated text, grounding)."""
+    return [s.strip() for s in SENTENCE_SPLIT_RE.split(text) if s.strip()]
+
+# --------------------------------------------------
+# ✅ Email cleaning (preprocess)
+# --------------------------------------------------
+# everything from the first sign-off on; the earliest one wins,
+# as it did when each pattern was applied in turn
+SIGNATURE_RE = re.compile(r"(?:Best|Regards|Thanks|Sincerely),\s*\n.*", re.IGNORECASE | re.DOTALL)
+
+SUBJECT_RE = re.compile(r"Subject:(.*)", re.IGNORECASE)
+SUBJECT_LINE_RE = re.compile(r"Subject:.*\n", re.IGNORECASE)
+SUBJECT_SENTENCE_RE = re.compile(r"Subject:.*(\n|$)", re.IGNORECASE)
+
+# threading headers email_sources writes under the subject line;
+# message ids are always <...>, so body lines never match
+THREAD_HEADER_RE = re.compile(r"^(message-id|in-reply-to|references):[ \t]*(<.*)$", re.IGNORECASE)
+MESSAGE_ID_RE = re.compile(r"<[^<>\s]+>")
+
+NEWLINES_RE = re.compile(r"\n+")
+SPACES_RE = re.compile(r"[ \t]+")
+
+# greetings stripped in this order, each from what the previous left
+GREETING_RE = re.compile(
+    r"^(?:dear\s+\w+,?\s*)?(?:hi\s+\w*,?\s*)?(?:hello\s+\w*,?\s*)?",
+    re.IGNORECASE
+)
+
+LABEL_ONLY_RE = re.compile(r"^(date|time|budget|organization|location)\s*:\s*$", re.IGNORECASE)
+SALUTATION_RE = re.compile(r"\b(dear\s+\w+[,!]?)\b", re.IGNORECASE)
+MULTI_SPACE_RE = re.compile(r"\s{2,}")
+
+def split_thread_headers(text: str) -> tuple:
+    """
+    Message-ID / In-Reply-To / References lines of the leading header
+    block (before the first blank line): (headers, text without them).
+    headers maps the lowercased name to the raw value.
+    """
+    lines = text.split("\n")
+    headers = {}
+    kept = []
+
+    for i, line in enumerate(lines):
+        if not line.strip():
+            kept.extend(lines[i:])
+            break
+
+        match = THREAD_HEADER_RE.match(line.strip())
+        if match:
+            headers[match.group(1).lower()] = match.group(2).strip()
+        else:
+            kept.append(line)
+
+    if not headers:
+        return headers, text
+
+    return headers, "\n".join(kept)
+
+# --------------------------------------------------
+# ✅ Sentence-level rules
+# --------------------------------------------------
+# (substring, weight) in the order keyword_boost adds them:
+# deadline words, location markers, then general keywords
+KEYWORD_WEIGHTS = (
+    [(word, 0.30) for word in ("by", "before", "due", "deadline")]
+    + [(pattern, 0.30) for pattern in (" at ", " in ")]
+    + [(word, 0.1) for word in (
+        "deadline", "due", "meeting", "schedule",
+        "submit", "payment", "budget", "action",
+        "required", "please", "kindly", "confirm"
+    )]
+)
+
+CRITICAL_KEYWORDS = (
+    "meeting details", "date:", "time:", "budget", "cost", "$",
+    "am", "pm", "ist", "deadline", "submit", "presentation"
+)
+
+# every substring any rule looks for, each tested once
+_SUBSTRINGS = tuple(dict.fromkeys([word for word, _ in KEYWORD_WEIGHTS] + list(CRITICAL_KEYWORDS)))
+
+# money, times, dates and critical words (grounding keeps such lines)
+CRITICAL_INFO_RE = re.compile(
+    r"\$\s?\d"
+    r"|\d{1,2}:\d{2}"
+    r"|\b(?:\d{1,2}(?:st|nd|rd|th)|am|pm|budget|deadline|hall|campus|conference)\b"
+)
+
+@lru_cache(maxsize=8192)
+def sentence_features(sentence: str) -> dict:
+    """
+    All rule flags of one sentence (treat the record as read-only,
+    it is cached):
+      keywords          substrings of the rule lists it contains
+      keyword_boost     extractive keyword boost
+      critical_keyword  a critical keyword occurs (mandatory sentence)
+      critical_info     money / time / date / critical word (grounding)
+    """
+    lowered = sentence.lower()
+    present = frozenset(word for word in _SUBSTRINGS if word in lowered)
+
+    boost = 0.0
+    for word, weight in KEYWORD_WEIGHTS:
+        if word in present:
+            boost += weight
+
+    return {
+        "keywords": present,
+        "keyword_boost": boost,
+        "critical_keyword": any(word in present for word in CRITICAL_KEYWORDS),
+        "critical_info": CRITICAL_INFO_RE.search(lowered) is not None
+    }
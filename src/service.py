@@ -0,0 +1,453 @@
+"""
+Local summarization service with dynamic micro-batching.
+
+An asyncio HTTP/1.1 server (TCP or Unix socket, stdlib only) in
+front of the pipeline:
+
+    preprocess + extractive   executor (process pool by default)
+    abstractive rewrite       micro-batched BART
+    grounding                 micro-batched MiniLM
+
+Requests waiting for a model are collected into a batch until
+either max_batch of them are queued or the first has waited
+max_wait seconds. Model batches run one at a time on a single
+dedicated thread. Queues are bounded: once full, new requests get
+503 with Retry-After instead of piling up.
+
+    POST /summarize   {"text": ..., "id": ...}   → result JSON
+    GET  /stats       queue depths, batch sizes, latency percentiles
+    GET  /health
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from src import profiling
+
+logger = logging.getLogger(__name__)
+
+class Overloaded(Exception):
+    """A queue is full; the client should retry later."""
+
+# --------------------------------------------------
+# ✅ CPU stage (runs in the preprocess executor)
+# --------------------------------------------------
+def _init_preprocess_worker():
+    from src import models
+
+    models.warmup(abstractive=False)
+
+def prepare(text: str, top_n: int, extractive_mode: str) -> dict:
+    """preprocess → extractive. Picklable in and out (the Doc is dropped)."""
+    from src.preprocess import preprocess_email
+    from src.extractive import extractive_summarize
+
+    result = preprocess_email(text, keep_doc=extractive_mode == "spacy")
+    doc = result.pop("doc", None)
+
+    result["extractive_summary"] = extractive_summarize(
+        result["sentences"],
+        top_n=top_n,
+        doc=doc,
+        mode=extractive_mode
+    )
+
+    return result
+
+# --------------------------------------------------
+# ✅ Micro-batcher
+# --------------------------------------------------
+class MicroBatcher:
+    """
+    Groups submit() calls into batches for fn(list) -> list.
+    fn runs on executor, one batch at a time.
+    """
+
+    def __init__(self, name: str, fn, executor,
+                 max_batch: int = 8,
+                 max_wait: float = 0.01,
+                 max_queue: int = 256):
+        self.name = name
+        self.fn = fn
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+        self.batches = 0
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+
+        try:
+            self.queue.put_nowait((item, future))
+        except asyncio.QueueFull:
+            raise Overloaded(f"{self.name} queue full ({self.queue.maxsize})")
+
+        return await future
+
+    async def _collect(self) -> list:
+        batch = [await self.queue.get()]
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+
+            start = time.perf_counter()
+            try:
+                outputs = await loop.run_in_executor(self.executor, self.fn, items)
+            except Exception as exc:
+                logger.exception("%s batch of %d failed", self.name, len(items))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            finally:
+                self.busy_seconds += time.perf_counter() - start
+
+            self.batches += 1
+            self.items += len(items)
+
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(output)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "max_queue": self.queue.maxsize,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "busy_seconds": self.busy_seconds
+        }
+
+# --------------------------------------------------
+# ✅ Service
+# --------------------------------------------------
+class SummarizationService:
+
+    def __init__(self,
+                 top_n: int = 3,
+                 max_batch: int = 8,
+                 max_wait: float = 0.01,
+                 max_queue: int = 256,
+                 preprocess_workers: int = 2,
+                 abstractive: bool = True,
+                 chunked: bool = False,
+                 extractive_mode: str = "spacy",
+                 router=None,
+                 budget_seconds: float = None):
+        """
+        preprocess_workers: processes for preprocess + extractive;
+        0 runs them on threads in this process instead.
+        max_queue bounds every queue (preprocess included), which
+        is where backpressure comes from.
+        budget_seconds: latency budget per BART micro-batch.
+        """
+        self.top_n = top_n
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.preprocess_workers = preprocess_workers
+        self.abstractive = abstractive
+        self.chunked = chunked
+        self.extractive_mode = extractive_mode
+        self.router = router
+        self.budget_seconds = budget_seconds
+
+        self.pending = 0
+        self.requests = 0
+        self.rejected = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=2048)
+
+        self._cpu = None
+        self._model = None
+        self.rewriter = None
+        self.grounder = None
+
+    # ---------- lifecycle ----------
+    async def start(self):
+        from src import models
+
+        if self.preprocess_workers > 0:
+            self._cpu = ProcessPoolExecutor(
+                max_workers=self.preprocess_workers,
+                initializer=_init_preprocess_worker
+            )
+        else:
+            self._cpu = ThreadPoolExecutor(max_workers=2)
+
+        # torch already spreads one batch over all cores
+        self._model = ThreadPoolExecutor(max_workers=1, thread_name_prefix="models")
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._model, models.warmup, self.abstractive)
+
+        if self.abstractive:
+            self.rewriter = MicroBatcher(
+                "abstractive", self._rewrite, self._model,
+                self.max_batch, self.max_wait, self.max_queue
+            )
+            self.grounder = MicroBatcher(
+                "grounding", self._ground, self._model,
+                self.max_batch, self.max_wait, self.max_queue
+            )
+            self.rewriter.start()
+            self.grounder.start()
+
+    async def stop(self):
+        for batcher in (self.rewriter, self.grounder):
+            if batcher is not None:
+                await batcher.stop()
+
+        for executor in (self._cpu, self._model):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    # ---------- batch functions (model thread) ----------
+    def _rewrite(self, items: list) -> list:
+        from src.abstractive import abstractive_rewrite_detailed
+
+        return abstractive_rewrite_detailed(
+            items,
+            batch_size=self.max_batch,
+            chunked=self.chunked,
+            router=self.router,
+            budget_seconds=self.budget_seconds
+        )
+
+    def _ground(self, pairs: list) -> list:
+        from src.grounding_filter import remove_ungrounded_lines_batch
+
+        return remove_ungrounded_lines_batch(pairs)
+
+    # ---------- one request ----------
+    async def summarize(self, text: str, email_id=None) -> dict:
+        from src.evaluation import compute_metrics
+
+        if self.pending >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(f"{self.pending} requests in flight")
+
+        self.pending += 1
+        self.requests += 1
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        try:
+            result = await loop.run_in_executor(
+                self._cpu, prepare, text, self.top_n, self.extractive_mode
+            )
+            extractive_summary = result["extractive_summary"]
+            output = {"id": email_id, "subject": result["subject"]}
+
+            if self.abstractive:
+                rewrite = await self.rewriter.submit(
+                    (extractive_summary, result["cleaned_text"], result["entities"])
+                )
+
+                if rewrite["route"] == "extractive":
+                    final_summary = rewrite["summary"]
+                else:
+                    final_summary = await self.grounder.submit(
+                        (rewrite["summary"], result["cleaned_text"])
+                    )
+
+                output["input_coverage"] = rewrite["coverage"]
+                output["decode_path"] = rewrite["decode_path"]
+                output["generate_seconds"] = rewrite["generate_seconds"]
+                if self.router is not None:
+                    output["route"] = rewrite["route"]
+            else:
+                final_summary = extractive_summary
+
+            output["extractive_summary"] = extractive_summary
+            output["final_summary"] = final_summary
+            output["metrics"] = compute_metrics(
+                result["cleaned_text"],
+                extractive_summary,
+                final_summary,
+                result["entities"]
+            )
+        except Overloaded:
+            self.rejected += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+
+        latency = time.perf_counter() - start
+        self.latencies.append(latency)
+        output["latency_seconds"] = latency
+
+        return output
+
+    def stats(self) -> dict:
+        latencies = list(self.latencies)
+
+        report = {
+            "in_flight": self.pending,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "latency_seconds": {
+                "p50": profiling.percentile(latencies, 50),
+                "p95": profiling.percentile(latencies, 95),
+                "p99": profiling.percentile(latencies, 99)
+            }
+        }
+
+        for batcher in (self.rewriter, self.grounder):
+            if batcher is not None:
+                report[batcher.name] = batcher.stats()
+
+        if self.router is not None:
+            report["routing"] = self.router.stats()
+
+        return report
+
+# --------------------------------------------------
+# ✅ Minimal HTTP/1.1 front end (keep-alive, Content-Length bodies)
+# --------------------------------------------------
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+            500: "Internal Server Error", 503: "Service Unavailable"}
+
+async def _read_request(reader):
+    """Returns (method, path, body, keep_alive) or None on a closed connection."""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+
+    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0))
+    body = await reader.readexactly(length) if length else b""
+
+    keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+
+    return method, path, body, keep_alive
+
+def _response(status: int, payload, extra_headers: dict = None) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = {
+        "Content-Type": "application/json",
+        "Content-Length": str(len(body)),
+        **(extra_headers or {})
+    }
+
+    head = f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+    head += "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+
+    return (head + "\r\n").encode("latin-1") + body
+
+async def _dispatch(service: SummarizationService, method: str, path: str, body: bytes) -> bytes:
+    if method == "GET" and path == "/health":
+        return _response(200, {"status": "ok"})
+
+    if method == "GET" and path == "/stats":
+        return _response(200, service.stats())
+
+    if method != "POST" or path != "/summarize":
+        return _response(404, {"error": f"no route for {method} {path}"})
+
+    try:
+        request = json.loads(body)
+        text = request["text"]
+    except (ValueError, KeyError, TypeError):
+        return _response(400, {"error": 'expected JSON body {"text": ..., "id": ...}'})
+
+    try:
+        result = await service.summarize(text, request.get("id"))
+    except Overloaded as exc:
+        return _response(503, {"error": str(exc)}, {"Retry-After": "1"})
+    except Exception as exc:
+        return _response(500, {"error": f"{type(exc).__name__}: {exc}"})
+
+    return _response(200, result)
+
+def make_handler(service: SummarizationService):
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError):
+                    writer.write(_response(400, {"error": "malformed request"}))
+                    break
+
+                if request is None:
+                    break
+
+                method, path, body, keep_alive = request
+                writer.write(await _dispatch(service, method, path, body))
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+async def start_server(service: SummarizationService,
+                       host: str = "127.0.0.1",
+                       port: int = 8080,
+                       unix_path: str = None):
+    """Start the service and listen on host:port or a Unix socket."""
+    await service.start()
+    handler = make_handler(service)
+
+    if unix_path:
+        return await asyncio.start_unix_server(handler, path=unix_path)
+
+    return await asyncio.start_server(handler, host, port)
@@ -0,0 +1,53 @@
+"""
+Helpers shared by the SQLite-backed stores (result cache, routing
+history, thread store, boilerplate, near-duplicate and embedding
+indexes).
+"""
+import hashlib
+import os
+import sqlite3
+
+def hash64(material) -> int:
+    """blake2b of str or bytes as a signed 64-bit int, so it fits an SQLite INTEGER."""
+    if isinstance(material, str):
+        material = material.encode("utf-8")
+
+    return int.from_bytes(hashlib.blake2b(material, digest_size=8).digest(), "big", signed=True)
+
+class ProcessConnection:
+    """
+    One autocommit WAL connection per process. A connection must not
+    cross a fork, so a worker process opens its own on first use.
+    check_same_thread=False for stores used from a thread other than
+    the one that opened them (the service's model thread).
+    """
+
+    def __init__(self, path: str, synchronous: str = None, check_same_thread: bool = True):
+        self.path = path
+        self.synchronous = synchronous
+        self.check_same_thread = check_same_thread
+        self._conn = None
+        self._pid = None
+
+    def is_open(self) -> bool:
+        return self._conn is not None and self._pid == os.getpid()
+
+    def connect(self) -> sqlite3.Connection:
+        if not self.is_open():
+            self._conn = sqlite3.connect(
+                self.path,
+                timeout=60,
+                isolation_level=None,
+                check_same_thread=self.check_same_thread
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            if self.synchronous:
+                self._conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._pid = os.getpid()
+
+        return self._conn
+
+    def close(self):
+        if self.is_open():
+            self._conn.close()
+        self._conn = None
@@ -0,0 +1,398 @@
+"""
+Streaming stage-parallel runner.
+
+The stages of main.py run concurrently, each on its own workers,
+linked by bounded queues:
+
+    source → prepare (process pool: preprocess + extractive)
+           → abstractive (batching consumer, BART)
+           → grounding   (batching consumer, MiniLM)
+           → evaluate    → results
+
+While BART works on one batch, the pool is already parsing the
+next emails. A full queue blocks the stage feeding it, so at most
+the queue capacities plus the emails being worked on are in
+memory, however large the input. Queue occupancy and per-stage
+busy time are sampled: the stage in front of the fullest queue,
+or the busiest one, is the bottleneck.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from src.service import _init_preprocess_worker, prepare
+
+logger = logging.getLogger(__name__)
+
+# end of stream marker, passed from stage to stage
+_DONE = object()
+
+# --------------------------------------------------
+# ✅ Stage
+# --------------------------------------------------
+class Stage:
+    """
+    workers threads taking batches of up to max_batch jobs from
+    inbox (waiting at most max_wait for a batch to fill), running
+    fn(list) -> list and putting the outputs on outbox.
+    Jobs carrying "error" are passed on untouched.
+    """
+
+    def __init__(self, name: str, fn, inbox: queue.Queue, outbox: queue.Queue,
+                 workers: int = 1,
+                 max_batch: int = 1,
+                 max_wait: float = 0.0):
+        self.name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.workers = workers
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+
+        self.items = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self._lock = threading.Lock()
+        self._finished = 0
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _collect(self) -> tuple:
+        """(batch, done): done once the end marker was taken."""
+        first = self.inbox.get()
+        if first is _DONE:
+            return [], True
+
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+
+            try:
+                job = self.inbox.get(timeout=remaining) if remaining > 0 else self.inbox.get_nowait()
+            except queue.Empty:
+                break
+
+            if job is _DONE:
+                return batch, True
+            batch.append(job)
+
+        return batch, False
+
+    def _process(self, batch: list) -> list:
+        todo = [job for job in batch if "error" not in job]
+        if not todo:
+            return batch
+
+        start = time.perf_counter()
+        try:
+            done = self.fn(todo)
+        except Exception as exc:
+            if len(todo) == 1:
+                done = [{"id": todo[0]["id"], "error": f"{type(exc).__name__}: {exc}"}]
+            else:
+                # one bad email must not take the whole batch down
+                logger.exception("%s batch of %d failed, retrying one by one", self.name, len(todo))
+                done = [self._one(job) for job in todo]
+
+        with self._lock:
+            self.busy_seconds += time.perf_counter() - start
+            self.items += len(todo)
+            self.batches += 1
+
+        outputs = iter(done)
+        return [job if "error" in job else next(outputs) for job in batch]
+
+    def _one(self, job: dict) -> dict:
+        try:
+            return self.fn([job])[0]
+        except Exception as exc:
+            return {"id": job["id"], "error": f"{type(exc).__name__}: {exc}"}
+
+    def _put(self, item):
+        start = time.perf_counter()
+        self.outbox.put(item)
+        waited = time.perf_counter() - start
+
+        with self._lock:
+            self.blocked_seconds += waited
+
+    def _run(self):
+        while True:
+            batch, done = self._collect()
+
+            for job in self._process(batch) if batch else []:
+                self._put(job)
+
+            if done:
+                break
+
+        with self._lock:
+            self._finished += 1
+            last = self._finished == self.workers
+
+        if last:
+            self.outbox.put(_DONE)
+        else:
+            # let the sibling workers see the end too
+            self.inbox.put(_DONE)
+
+    def stats(self, wall_seconds: float) -> dict:
+        capacity = wall_seconds * self.workers
+
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "batches": self.batches,
+            "mean_batch": self.items / self.batches if self.batches else 0.0,
+            "busy_seconds": self.busy_seconds,
+            "utilization": self.busy_seconds / capacity if capacity else 0.0,
+            "blocked_on_output_seconds": self.blocked_seconds
+        }
+
+# --------------------------------------------------
+# ✅ Runner
+# --------------------------------------------------
+class StreamingRunner:
+
+    def __init__(self,
+                 top_n: int = 3,
+                 prepare_workers: int = 2,
+                 max_batch: int = 8,
+                 max_wait: float = 0.05,
+                 queue_size: int = 64,
+                 abstractive: bool = True,
+                 chunked: bool = False,
+                 extractive_mode: str = "spacy",
+                 router=None,
+                 budget_seconds: float = None,
+                 sample_interval: float = 0.05):
+        """
+        prepare_workers: processes for preprocess + extractive
+        (0 runs them on one thread in this process).
+        max_batch / max_wait: batching of the BART and MiniLM stages.
+        queue_size: capacity of every queue between stages.
+        budget_seconds: latency budget per BART batch.
+        """
+        self.top_n = top_n
+        self.prepare_workers = prepare_workers
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue_size = queue_size
+        self.abstractive = abstractive
+        self.chunked = chunked
+        self.extractive_mode = extractive_mode
+        self.router = router
+        self.budget_seconds = budget_seconds
+        self.sample_interval = sample_interval
+
+        self.queues = {}
+        self.stages = []
+        self._occupancy = {}
+        self._samples = 0
+        self._started = None
+        self._finished = None
+        self._executor = None
+
+    # ---------- stage functions ----------
+    def _prepare(self, jobs: list) -> list:
+        job = jobs[0]
+        result = self._executor.submit(prepare, job["text"], self.top_n, self.extractive_mode).result()
+
+        return [{"id": job["id"], "prepared": result}]
+
+    def _rewrite(self, jobs: list) -> list:
+        from src.abstractive import abstractive_rewrite_detailed
+
+        rewrites = abstractive_rewrite_detailed(
+            [
+                (job["prepared"]["extractive_summary"], job["prepared"]["cleaned_text"], job["prepared"]["entities"])
+                for job in jobs
+            ],
+            batch_size=self.max_batch,
+            chunked=self.chunked,
+            router=self.router,
+            budget_seconds=self.budget_seconds
+        )
+
+        return [dict(job, rewrite=rewrite) for job, rewrite in zip(jobs, rewrites)]
+
+    def _ground(self, jobs: list) -> list:
+        from src.grounding_filter import remove_ungrounded_lines_batch
+
+        # routed past BART: nothing new to ground
+        todo = [job for job in jobs if job["rewrite"]["route"] != "extractive"]
+        grounded = iter(remove_ungrounded_lines_batch(
+            [(job["rewrite"]["summary"], job["prepared"]["cleaned_text"]) for job in todo]
+        ) if todo else [])
+
+        return [
+            dict(job, final_summary=job["rewrite"]["summary"] if job["rewrite"]["route"] == "extractive" else next(grounded))
+            for job in jobs
+        ]
+
+    def _evaluate(self, jobs: list) -> list:
+        from src.evaluation import compute_metrics
+
+        outputs = []
+
+        for job in jobs:
+            result = job["prepared"]
+            extractive_summary = result["extractive_summary"]
+            final_summary = job.get("final_summary", extractive_summary)
+
+            output = {
+                "id": job["id"],
+                "subject": result["subject"],
+                "extractive_summary": extractive_summary,
+                "final_summary": final_summary
+            }
+
+            if "rewrite" in job:
+                rewrite = job["rewrite"]
+                output["input_coverage"] = rewrite["coverage"]
+                output["decode_path"] = rewrite["decode_path"]
+                output["generate_seconds"] = rewrite["generate_seconds"]
+                if self.router is not None:
+                    output["route"] = rewrite["route"]
+                    output["bart_seconds_saved"] = rewrite["bart_seconds_saved"]
+
+            output["metrics"] = compute_metrics(
+                result["cleaned_text"],
+                extractive_summary,
+                final_summary,
+                result["entities"]
+            )
+            outputs.append(output)
+
+        return outputs
+
+    # ---------- running ----------
+    def _build(self):
+        names = ["prepare"] + (["abstractive", "grounding"] if self.abstractive else []) + ["evaluate"]
+        self.queues = {name: queue.Queue(maxsize=self.queue_size) for name in names + ["results"]}
+        self._occupancy = {name: [0, 0] for name in self.queues}
+
+        batching = {"max_batch": self.max_batch, "max_wait": self.max_wait}
+        specs = {
+            "prepare": (self._prepare, {"workers": max(1, self.prepare_workers)}),
+            "abstractive": (self._rewrite, batching),
+            "grounding": (self._ground, batching),
+            "evaluate": (self._evaluate, {"max_batch": self.max_batch})
+        }
+
+        self.stages = [
+            Stage(name, specs[name][0], self.queues[name], self.queues[following], **specs[name][1])
+            for name, following in zip(names, names[1:] + ["results"])
+        ]
+
+    def _feed(self, emails, errors: list):
+        inbox = self.queues["prepare"]
+
+        try:
+            for email_id, text in emails:
+                inbox.put({"id": email_id, "text": text})
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            inbox.put(_DONE)
+
+    def _sample(self, stop: threading.Event):
+        while not stop.wait(self.sample_interval):
+            for name, q in self.queues.items():
+                size = q.qsize()
+                entry = self._occupancy[name]
+                entry[0] += size
+                entry[1] = max(entry[1], size)
+            self._samples += 1
+
+    def run(self, emails):
+        """
+        Summarize (email_id, text) pairs from any iterable, yielding
+        one result dict per email (with "id") in completion order.
+        Failed emails yield {"id", "error"}.
+        """
+        from src import models
+
+        if self.prepare_workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.prepare_workers,
+                initializer=_init_preprocess_worker
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
+        models.warmup(abstractive=self.abstractive)
+
+        self._build()
+        self._samples = 0
+        self._started = time.perf_counter()
+        self._finished = None
+
+        errors = []
+        stop = threading.Event()
+        feeder = threading.Thread(target=self._feed, args=(emails, errors), name="feeder", daemon=True)
+        sampler = threading.Thread(target=self._sample, args=(stop,), name="sampler", daemon=True)
+
+        for stage in self.stages:
+            stage.start()
+        feeder.start()
+        sampler.start()
+
+        try:
+            results = self.queues["results"]
+            while True:
+                output = results.get()
+                if output is _DONE:
+                    break
+                yield output
+        finally:
+            stop.set()
+            self._finished = time.perf_counter()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+        for stage in self.stages:
+            stage.join()
+
+        if errors:
+            raise errors[0]
+
+    def stats(self) -> dict:
+        """Queue occupancy and per-stage load so far (callable while running)."""
+        if self._started is None:
+            return {}
+
+        wall = (self._finished or time.perf_counter()) - self._started
+        samples = max(1, self._samples)
+
+        stages = {stage.name: stage.stats(wall) for stage in self.stages}
+        queues = {
+            name: {
+                "capacity": q.maxsize,
+                "size": q.qsize(),
+                "mean_occupancy": self._occupancy[name][0] / samples / q.maxsize,
+                "max_size": self._occupancy[name][1]
+            }
+            for name, q in self.queues.items()
+        }
+
+        return {
+            "seconds": wall,
+            "queues": queues,
+            "stages": stages,
+            "bottleneck": max(stages, key=lambda name: stages[name]["utilization"]) if stages else None
+        }
@@ -0,0 +1,268 @@
+"""
+Thread-aware preprocessing: quoted replies and forwards.
+
+A reply usually carries every earlier message of its thread as
+quoted text. split_reply() separates the new content of a message
+from the quoted / forwarded part, so only the new content goes
+through sentence splitting, spaCy, TextRank and BART.
+
+ThreadStore links messages into threads (by the Message-ID,
+In-Reply-To and References headers, else by the quoted content
+matching a message already seen; never by subject alone, which
+would merge unrelated "Meeting" or "Invoice" emails) and keeps each
+message's summaries, so the summaries of earlier messages are read
+back instead of being recomputed from the quoted copy.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+
+from src.rules import MESSAGE_ID_RE, split_thread_headers
+from src.sqlite_util import ProcessConnection
+
+# --------------------------------------------------
+# ✅ Quote / forward detection
+# --------------------------------------------------
+QUOTE_RE = re.compile(r"^\s*>")
+ATTRIBUTION_RE = re.compile(r"^\s*on\b.{0,300}\bwrote:\s*$", re.IGNORECASE)
+ORIGINAL_RE = re.compile(r"^\s*-{2,}\s*original message\s*-{2,}\s*$", re.IGNORECASE)
+FORWARD_RE = re.compile(
+    r"^\s*(?:-{2,}\s*forwarded message\s*-{2,}|begin forwarded message:)\s*$",
+    re.IGNORECASE
+)
+HEADER_RE = re.compile(r"^\s*(?:from|sent|date|to|cc|bcc|subject|reply-to):\s", re.IGNORECASE)
+
+FROM_HEADER_RE = re.compile(r"^\s*from:\s.*(?:@|<[^>]+>)", re.IGNORECASE)
+SENT_HEADER_RE = re.compile(r"^\s*(?:sent|date):\s", re.IGNORECASE)
+TO_HEADER_RE = re.compile(r"^\s*(?:to|subject):\s", re.IGNORECASE)
+
+def _is_outlook_header(lines: list, i: int) -> bool:
+    """
+    An Outlook-style header block: a "From:" line carrying an address,
+    followed within a few lines by "Sent:"/"Date:" and "To:"/"Subject:".
+    A body line such as "From: 9 AM" is content, not a header.
+    """
+    if not FROM_HEADER_RE.match(lines[i]):
+        return False
+
+    following = lines[i + 1:i + 5]
+    return (
+        any(SENT_HEADER_RE.match(line) for line in following)
+        and any(TO_HEADER_RE.match(line) for line in following)
+    )
+
+def _unquote(lines: list) -> list:
+    """Strip one level of "> " quoting."""
+    return [re.sub(r"^\s*> ?", "", line, count=1) for line in lines]
+
+def _skip_headers(lines: list) -> list:
+    i = 0
+    while i < len(lines) and (HEADER_RE.match(lines[i]) or not lines[i].strip()):
+        i += 1
+    return lines[i:]
+
+def split_reply(body: str) -> dict:
+    """
+    Returns new (the message's own text), quoted (the earlier
+    message it quotes or forwards, one level unquoted, "" if none)
+    and kind ("reply", "forward" or None).
+
+    Inline replies interleaved with "> " quotes count as new text.
+    """
+    lines = body.replace("\r", "").split("\n")
+
+    for i, line in enumerate(lines):
+        two_lines = line + " " + lines[i + 1] if i + 1 < len(lines) else line
+
+        if FORWARD_RE.match(line):
+            return {
+                "new": "\n".join(lines[:i]).strip(),
+                "quoted": "\n".join(_skip_headers(lines[i + 1:])).strip(),
+                "kind": "forward"
+            }
+
+        if ORIGINAL_RE.match(line) or _is_outlook_header(lines, i):
+            start = i + 1 if ORIGINAL_RE.match(line) else i
+            return {
+                "new": "\n".join(lines[:i]).strip(),
+                "quoted": "\n".join(_skip_headers(lines[start:])).strip(),
+                "kind": "reply"
+            }
+
+        attribution = ATTRIBUTION_RE.match(line)
+        wrapped = not attribution and ATTRIBUTION_RE.match(two_lines)
+
+        if attribution or wrapped or QUOTE_RE.match(line):
+            start = i + 1 if attribution else i + 2 if wrapped else i
+            rest = lines[start:]
+
+            quoted = [l for l in rest if QUOTE_RE.match(l)]
+            inline = [l for l in rest if not QUOTE_RE.match(l) and l.strip()]
+
+            return {
+                "new": "\n".join(lines[:i] + inline).strip(),
+                "quoted": "\n".join(_unquote(quoted)).strip(),
+                "kind": "reply"
+            }
+
+    return {"new": body.strip(), "quoted": "", "kind": None}
+
+def content_key(text: str) -> str:
+    """Formatting-insensitive hash, so a quoted copy matches its original."""
+    material = re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+# --------------------------------------------------
+# ✅ Thread store (SQLite, shared by workers)
+# --------------------------------------------------
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    content_key TEXT PRIMARY KEY,
+    thread_id TEXT NOT NULL,
+    email_id TEXT,
+    summary TEXT NOT NULL,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_thread ON messages (thread_id, seen_at);
+CREATE TABLE IF NOT EXISTS message_ids (
+    message_id TEXT PRIMARY KEY,
+    thread_id TEXT NOT NULL
+);
+"""
+
+class ThreadStore:
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = ProcessConnection(path)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        return self._db.connect()
+
+    def _one(self, sql: str, args: tuple):
+        row = self._connection().execute(sql, args).fetchone()
+        return row[0] if row else None
+
+    # ---------- before the pipeline ----------
+    def prepare(self, text: str, email_id=None, message_id: str = None, references: list = None) -> dict:
+        """
+        Split one email into what the pipeline should process and
+        what is already known. Returns a view dict:
+          text           "Subject: ..." + the new content only
+          thread_id      thread the message belongs to
+          content_key    key the message's summary is stored under
+          earlier        stored summaries of earlier messages in the thread
+          skipped_chars  quoted / known characters not processed
+
+        Quoted or forwarded text is only dropped when the store
+        already has the message it quotes; otherwise (a parent never
+        processed, or processed in parallel) it is kept in text, as
+        its facts are nowhere else.
+        message_id / references: header values; by default read from
+        the text's header block (see email_sources.message_to_text).
+        """
+        headers, text = split_thread_headers(text)
+        message_id = message_id or headers.get("message-id")
+        if references is None:
+            references = MESSAGE_ID_RE.findall(headers.get("references", ""))
+            references += [
+                ref for ref in MESSAGE_ID_RE.findall(headers.get("in-reply-to", ""))
+                if ref not in references
+            ]
+
+        match = re.match(r"\s*subject:(.*)\n?", text, re.IGNORECASE)
+        subject = match.group(1).strip() if match else ""
+        body = text[match.end():] if match else text
+
+        parts = split_reply(body)
+        new = parts["new"]
+        skipped = len(parts["quoted"])
+        # the message's own text, whatever ends up processed
+        key = content_key(parts["new"])
+
+        quoted_key = None
+        if parts["quoted"]:
+            # the quoted message may itself quote older ones
+            quoted_key = content_key(split_reply(parts["quoted"])["new"])
+
+        quoted_known = quoted_key is not None and self._one(
+            "SELECT 1 FROM messages WHERE content_key = ?", (quoted_key,)
+        )
+
+        if parts["quoted"] and not quoted_known:
+            new = (new + "\n\n" + parts["quoted"]).strip()
+            skipped = 0
+
+        thread_id = (
+            self._thread_from_headers(message_id, references)
+            or (quoted_key and self._one("SELECT thread_id FROM messages WHERE content_key = ?", (quoted_key,)))
+            or (references[0] if references else None)
+            or message_id
+            or content_key(subject + "\n" + new)
+        )
+
+        earlier = [
+            json.loads(summary)
+            for (summary,) in self._connection().execute(
+                "SELECT summary FROM messages WHERE thread_id = ? AND content_key != ? ORDER BY seen_at",
+                (thread_id, key)
+            )
+        ]
+
+        return {
+            "text": (f"Subject: {subject}\n\n" if subject else "") + new,
+            "subject": subject,
+            "thread_id": thread_id,
+            "message_id": message_id,
+            "references": references,
+            "email_id": email_id,
+            "content_key": key,
+            "earlier": earlier,
+            "skipped_chars": skipped
+        }
+
+    def _thread_from_headers(self, message_id: str, references: list):
+        for ref in [message_id] + list(references or []):
+            if ref:
+                thread_id = self._one("SELECT thread_id FROM message_ids WHERE message_id = ?", (ref,))
+                if thread_id:
+                    return thread_id
+        return None
+
+    # ---------- after the pipeline ----------
+    def record(self, view: dict, summary: dict):
+        """Store a processed message's summary (JSON-serialisable dict)."""
+        conn = self._connection()
+
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?)",
+                (
+                    view["content_key"],
+                    view["thread_id"],
+                    None if view["email_id"] is None else str(view["email_id"]),
+                    json.dumps(summary, ensure_ascii=False),
+                    time.time()
+                )
+            )
+
+            # referenced ids too: a parent processed after its reply joins its thread
+            conn.executemany(
+                "INSERT OR IGNORE INTO message_ids VALUES (?, ?)",
+                [
+                    (ref, view["thread_id"])
+                    for ref in [view["message_id"]] + list(view.get("references") or [])
+                    if ref
+                ]
+            )
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,101 @@
+import argparse
+import json
+import sys
+import threading
+
+from src.email_sources import iter_emails
+from src.streaming import StreamingRunner
+
+def _report(runner: StreamingRunner, every: float, stop: threading.Event):
+    while not stop.wait(every):
+        stats = runner.stats()
+        if not stats:
+            continue
+
+        occupancy = " ".join(
+            f"{name} {values['size']}/{values['capacity']}"
+            for name, values in stats["queues"].items()
+        )
+        print(f"queues: {occupancy} | busiest: {stats['bottleneck']}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Summarize a mailbox with the stages running concurrently on bounded queues."
+    )
+    parser.add_argument("input", help="directory of emails, mbox file or .jsonl file")
+    parser.add_argument("output", help="output .jsonl (one result per email)")
+    parser.add_argument("--top-n", type=int, default=3)
+    parser.add_argument("--prepare-workers", type=int, default=2,
+                        help="processes for preprocess + extractive (0: one thread)")
+    parser.add_argument("--max-batch", type=int, default=8,
+                        help="largest BART / MiniLM batch")
+    parser.add_argument("--max-wait-ms", type=float, default=50.0,
+                        help="how long a model stage waits for its batch to fill")
+    parser.add_argument("--queue-size", type=int, default=64,
+                        help="capacity of every queue between stages")
+    parser.add_argument("--backend", choices=["torch", "int8", "onnx"], default="torch")
+    parser.add_argument("--threads", type=int, default=None, help="inference threads")
+    parser.add_argument("--extractive-only", action="store_true")
+    parser.add_argument("--extractive-mode", choices=["spacy", "fast"], default="spacy")
+    parser.add_argument("--chunked", action="store_true")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="latency budget per BART batch")
+    parser.add_argument("--route", action="store_true")
+    parser.add_argument("--route-history", default=None)
+    parser.add_argument("--embedding-store", default=None,
+                        help="directory of the shared sentence-embedding store used by grounding")
+    parser.add_argument("--embedding-store-max-rows", type=int, default=1_000_000)
+    parser.add_argument("--stats-every", type=float, default=0.0,
+                        help="print queue occupancy to stderr every this many seconds")
+    args = parser.parse_args()
+
+    from src import models
+
+    models.set_backend(args.backend, args.threads)
+    if args.embedding_store and not args.extractive_only:
+        from src.embedding_store import EmbeddingStore
+        from src.grounding_filter import use_embedding_store
+
+        use_embedding_store(EmbeddingStore(args.embedding_store, args.embedding_store_max_rows))
+
+    router = None
+    if args.route:
+        from src.routing import Router
+
+        router = Router(args.route_history)
+
+    runner = StreamingRunner(
+        top_n=args.top_n,
+        prepare_workers=args.prepare_workers,
+        max_batch=args.max_batch,
+        max_wait=args.max_wait_ms / 1000,
+        queue_size=args.queue_size,
+        abstractive=not args.extractive_only,
+        chunked=args.chunked,
+        extractive_mode=args.extractive_mode,
+        router=router,
+        budget_seconds=args.budget_ms / 1000 if args.budget_ms else None
+    )
+
+    stop = threading.Event()
+    if args.stats_every > 0:
+        threading.Thread(target=_report, args=(runner, args.stats_every, stop), daemon=True).start()
+
+    done = 0
+    failed = 0
+
+    try:
+        with open(args.output, "w", encoding="utf-8") as out:
+            for result in runner.run(iter_emails(args.input)):
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                done += 1
+                failed += "error" in result
+    finally:
+        stop.set()
+
+    stats = runner.stats()
+    stats.update(emails=done, errors=failed)
+    print(json.dumps(stats))
+
+if __name__ == "__main__":
+    main()
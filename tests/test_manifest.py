@@ -0,0 +1,48 @@
+import os
+
+from src.manifest import Manifest, config_fingerprint, content_hash
+
+CONFIG = config_fingerprint({"top_n": 3})
+
+def test_repeated_id_keeps_each_content_hash(tmp_path):
+    manifest = Manifest(str(tmp_path / "run.manifest"))
+    counts = {"skipped": 0}
+
+    pending = list(manifest.iter_pending([("a", "first copy"), ("a", "second copy")], CONFIG, counts))
+
+    assert [digest for _, _, digest in pending] == [content_hash("first copy"), content_hash("second copy")]
+
+    # the first copy finishes last: the manifest ends on its content
+    manifest.mark([("a", pending[1][2])], CONFIG)
+    manifest.mark([("a", pending[0][2])], CONFIG)
+
+    assert manifest.is_done("a", content_hash("first copy"), CONFIG)
+    assert not manifest.is_done("a", content_hash("second copy"), CONFIG)
+    manifest.close()
+
+def test_whitespace_change_is_new_content(tmp_path):
+    manifest = Manifest(str(tmp_path / "run.manifest"))
+    manifest.mark([("a", content_hash("Subject: Hi\n\nRoom 4."))], CONFIG)
+
+    counts = {"skipped": 0}
+    pending = list(manifest.iter_pending(
+        [("a", "Subject: Hi\n\nRoom 4."), ("a", "Subject:  Hi\n\nRoom 4.")], CONFIG, counts
+    ))
+
+    assert counts["skipped"] == 1
+    assert [text for _, text, _ in pending] == ["Subject:  Hi\n\nRoom 4."]
+    manifest.close()
+
+def test_connection_reopens_in_child_process(tmp_path):
+    manifest = Manifest(str(tmp_path / "run.manifest"))
+    manifest.mark([("a", "h")], CONFIG)
+
+    pid = os.fork()
+    if pid == 0:
+        # a forked worker must not reuse the parent's connection
+        os._exit(0 if manifest.is_done("a", "h", CONFIG) and manifest._db._pid == os.getpid() else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert manifest.is_done("a", "h", CONFIG)
+    manifest.close()
@@ -0,0 +1,46 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+nx = pytest.importorskip("networkx")
+pytest.importorskip("scipy")
+
+from src.ranking import pagerank, rank, sparsify
+
+def similarity(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.random((n, 16))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    sim = vectors @ vectors.T
+    np.fill_diagonal(sim, 0.0)
+    # an isolated sentence: a dangling node
+    sim[3, :] = sim[:, 3] = 0.0
+    return sim
+
+def nx_scores(matrix: np.ndarray) -> np.ndarray:
+    scores = nx.pagerank(nx.from_numpy_array(matrix))
+    return np.array([scores[i] for i in range(len(matrix))])
+
+def test_power_iteration_matches_networkx():
+    sim = similarity(25)
+
+    np.testing.assert_allclose(pagerank(sim), nx_scores(sim), atol=1e-6)
+
+@pytest.mark.parametrize("top_k, threshold", [(4, None), (None, 0.8), (4, 0.7), (30, None)])
+def test_sparse_graph_matches_networkx(top_k, threshold):
+    sim = similarity(25, seed=1)
+
+    # the pruned graph, built with dense masks as networkx would see it
+    keep = np.ones(sim.shape, dtype=bool)
+    if threshold is not None:
+        keep &= sim >= threshold
+    if top_k is not None and top_k < len(sim) - 1:
+        in_top = np.zeros(sim.shape, dtype=bool)
+        np.put_along_axis(in_top, np.argpartition(-sim, top_k, axis=1)[:, :top_k], True, axis=1)
+        keep &= in_top
+    keep |= keep.T
+    np.fill_diagonal(keep, False)
+    expected = np.where(keep, sim, 0.0)
+
+    np.testing.assert_array_equal(sparsify(sim, top_k, threshold).toarray(), expected)
+    np.testing.assert_allclose(rank(sim, top_k, threshold), nx_scores(expected), atol=1e-6)
@@ -0,0 +1,36 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+routing = pytest.importorskip("src.routing")
+
+FEATURES = {"tokens": 200, "extractive_sentences": 3, "injected": 1, "entity_density": 0.02}
+
+def test_router_history_used_from_worker_threads(tmp_path):
+    # opened here, used from other threads, as in serve.py and stream_summarize.py
+    router = routing.Router(str(tmp_path / "routes.sqlite"), min_history=5)
+
+    def run(_):
+        route, _ = router.decide(FEATURES)
+        router.observe(FEATURES, route, fell_back=True)
+        return threading.get_ident()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        threads = set(pool.map(run, range(40)))
+
+    assert threading.get_ident() not in threads
+
+    runs, fallbacks, skipped = router.history.get(router.bucket(FEATURES))
+    assert runs == fallbacks
+    assert runs + skipped >= 40
+    assert router.routes["extractive"] > 0
+
+def test_history_single_model_thread(tmp_path):
+    # the service's single "models" executor thread
+    router = routing.Router(str(tmp_path / "routes.sqlite"))
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="models") as pool:
+        route, reason = pool.submit(router.decide, FEATURES).result()
+
+    assert (route, reason) == ("full", "default")
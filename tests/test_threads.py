@@ -0,0 +1,109 @@
+from src.threads import split_reply
+
+def test_plain_message_has_no_quote():
+    assert split_reply("Meeting at 10 AM in Hall B.") == {
+        "new": "Meeting at 10 AM in Hall B.", "quoted": "", "kind": None
+    }
+
+def test_outlook_header_starts_quote():
+    body = (
+        "Sounds good, see you there.\n"
+        "\n"
+        "From: Anita Rao <anita@example.com>\n"
+        "Sent: Monday, March 3, 2025 9:12 AM\n"
+        "To: Team <team@example.com>\n"
+        "Subject: Budget review\n"
+        "\n"
+        "The budget review is on March 5th at 10:30 AM."
+    )
+    result = split_reply(body)
+
+    assert result["kind"] == "reply"
+    assert result["new"] == "Sounds good, see you there."
+    assert result["quoted"] == "The budget review is on March 5th at 10:30 AM."
+
+def test_from_line_in_meeting_details_is_content():
+    body = "Meeting details below.\nFrom: 9 AM\nDate: March 5\nPlease come."
+    result = split_reply(body)
+
+    assert result["kind"] is None
+    assert result["new"] == body
+    assert result["quoted"] == ""
+
+def test_outlook_header_needs_recipient_or_subject():
+    body = "Schedule:\nFrom: alice@example.com\nDate: March 5\nRoom 4 is booked."
+
+    assert split_reply(body)["kind"] is None
+
+def test_original_message_marker():
+    result = split_reply("Thanks!\n-----Original Message-----\nFrom: Bob <b@x.org>\nSee attached.")
+
+    assert result["new"] == "Thanks!"
+    assert result["quoted"] == "See attached."
+
+def test_inline_quotes_keep_replies():
+    result = split_reply("On Mon, Bob wrote:\n> Can we meet at 3?\nYes, 3 works.\n> Room?\nRoom 12.")
+
+    assert result["new"] == "Yes, 3 works.\nRoom 12."
+    assert result["quoted"] == "Can we meet at 3?\nRoom?"
+
+def test_forward():
+    result = split_reply("FYI\n---------- Forwarded message ---------\nFrom: a@b.c\nSubject: x\n\nBody here.")
+
+    assert result["kind"] == "forward"
+    assert result["new"] == "FYI"
+    assert result["quoted"] == "Body here."
+
+def test_unknown_quoted_history_is_kept(tmp_path):
+    from src.threads import ThreadStore
+
+    store = ThreadStore(str(tmp_path / "threads.sqlite"))
+    reply = "Subject: Re: Budget\n\nAgreed.\n\nOn Mon, Anita wrote:\n> The budget is $5,000."
+
+    # parent never processed: its facts must reach the pipeline
+    view = store.prepare(reply)
+    assert "$5,000" in view["text"]
+    assert view["skipped_chars"] == 0
+
+    # once the parent is stored, the quote is skipped
+    parent = store.prepare("Subject: Budget\n\nThe budget is $5,000.")
+    store.record(parent, {"summary": "Budget is $5,000."})
+
+    view = store.prepare(reply)
+    assert "$5,000" not in view["text"]
+    assert view["earlier"] == [{"summary": "Budget is $5,000."}]
+
+def test_threads_follow_headers_not_subjects(tmp_path):
+    from email import message_from_string, policy
+
+    from src.email_sources import message_to_text
+    from src.threads import ThreadStore
+
+    store = ThreadStore(str(tmp_path / "threads.sqlite"))
+
+    def mail(headers: str, body: str) -> str:
+        return message_to_text(message_from_string(headers + "\n\n" + body, policy=policy.default))
+
+    first = store.prepare(mail("Subject: Meeting\nMessage-ID: <a@x>", "Room 4 at 10 AM on Monday."))
+    store.record(first, {"summary": "Room 4, Monday 10 AM."})
+
+    # same subject, no headers linking it: a thread of its own
+    other = store.prepare(mail("Subject: Meeting\nMessage-ID: <b@y>", "Budget sync on Friday at 3 PM."))
+    assert other["thread_id"] != first["thread_id"]
+    assert other["earlier"] == []
+    assert "Message-ID" not in other["text"]
+
+    reply = store.prepare(mail(
+        "Subject: Re: Meeting\nMessage-ID: <c@x>\nIn-Reply-To: <a@x>\nReferences: <a@x>",
+        "I will bring the slides."
+    ))
+    assert reply["thread_id"] == first["thread_id"]
+    assert reply["earlier"] == [{"summary": "Room 4, Monday 10 AM."}]
+
+def test_thread_headers_are_not_content():
+    from src.rules import split_thread_headers
+
+    headers, text = split_thread_headers("Subject: Hi\nMessage-ID: <a@x>\nReferences: <r@x> <s@x>\n\nReferences: <z@x> stay")
+
+    assert headers == {"message-id": "<a@x>", "references": "<r@x> <s@x>"}
+    assert text == "Subject: Hi\n\nReferences: <z@x> stay"